@@ -1,26 +1,57 @@
+import inspect
 from functools import wraps
-from .redis_config import cache_manager
+from typing import Iterable, List
+from .redis_config import cache_manager, async_cache_manager
 import hashlib
 
-def cache_result(ttl_type: str = 'frequent_data', key_prefix: str = ""):
-    """Decorator para cachear resultados de funciones específicas de tu dominio"""
+
+def _build_cache_key(func, key_prefix: str, args, kwargs) -> str:
+    """Genera clave única basada en función y parámetros"""
+    func_name = func.__name__
+    args_str = str(args) + str(sorted(kwargs.items()))
+    key_hash = hashlib.md5(args_str.encode()).hexdigest()[:8]
+    return f"{key_prefix}:{func_name}:{key_hash}"
+
+
+def _resolve_tags(tags: Iterable[str], kwargs) -> List[str]:
+    """Formatea plantillas de tags con los kwargs de la llamada (ej. 'curso:{curso_id}')"""
+    return [tag.format(**kwargs) for tag in tags]
+
+
+def cache_result(ttl_type: str = 'frequent_data', key_prefix: str = "", use_local: bool = True,
+                 tags: Iterable[str] = ()):
+    """
+    Decorator para cachear resultados de funciones específicas de tu dominio.
+    Soporta funciones sync y async (en async se cachea el resultado ya esperado).
+    use_local=True sirve los hits desde el L1 del proceso (sin ir a Redis).
+    tags registra la clave para invalidarla con invalidate_tags (ej. 'catalogo').
+    """
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key = _build_cache_key(func, key_prefix, args, kwargs)
+                # Un solo recálculo por miss, compartido entre llamadores y workers
+                return await async_cache_manager.get_or_set(
+                    cache_key, lambda: func(*args, **kwargs), ttl_type,
+                    use_local=use_local, tags=_resolve_tags(tags, kwargs)
+                )
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Genera clave única basada en función y parámetros
-            func_name = func.__name__
-            args_str = str(args) + str(sorted(kwargs.items()))
-            key_hash = hashlib.md5(args_str.encode()).hexdigest()[:8]
-            cache_key = f"{key_prefix}:{func_name}:{key_hash}"
+            cache_key = _build_cache_key(func, key_prefix, args, kwargs)
 
             # Intenta obtener del cache
-            cached_result = cache_manager.get_cache(cache_key)
+            cached_result = cache_manager.get_cache(cache_key, ttl_type=ttl_type, use_local=use_local)
             if cached_result is not None:
                 return cached_result
 
             # Si no existe, ejecuta función y guarda resultado
             result = func(*args, **kwargs)
-            cache_manager.set_cache(cache_key, result, ttl_type)
+            cache_manager.set_cache(
+                cache_key, result, ttl_type, use_local=use_local, tags=_resolve_tags(tags, kwargs)
+            )
             return result
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,167 @@
+# app/cache/circuit_breaker.py
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto: no se intenta la llamada a Redis"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker para el acceso a Redis (compartido por cache y rate limiter).
+    - closed: las llamadas pasan; tras `failure_threshold` fallos seguidos se abre
+    - open: las llamadas fallan al instante (fail-open: el llamador usa su fallback)
+    - half_open: pasado `recovery_timeout`, deja pasar `half_open_max_calls` sondas;
+      si responden se cierra, si fallan vuelve a abrirse; una sonda cancelada libera
+      su plaza y, si ninguna informa en `recovery_timeout`, se admiten sondas nuevas
+    Cada llamada async se corta a los `call_timeout` segundos.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 5.0,
+                 half_open_max_calls: int = 1, call_timeout: float = 0.25):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.call_timeout = call_timeout
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._half_open_at = 0.0
+        self._lock = threading.Lock()   # la fachada síncrona puede usarse desde threads
+
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "timeouts": 0, "opened": 0}
+        self.last_error: Optional[str] = None
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    self.stats["rejected"] += 1
+                    return False
+                self._enter_half_open()
+            elif (self._probes >= self.half_open_max_calls
+                  and time.monotonic() - self._half_open_at >= self.recovery_timeout):
+                self._enter_half_open()   # sondas sin resultado (colgadas o perdidas)
+            if self._probes >= self.half_open_max_calls:
+                self.stats["rejected"] += 1
+                return False
+            self._probes += 1
+            return True
+
+    def _enter_half_open(self):
+        self.state = self.HALF_OPEN
+        self._probes = 0
+        self._half_open_at = time.monotonic()
+
+    def release_probe(self):
+        """La llamada terminó sin resultado (p. ej. cancelada): libera su plaza de sonda"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self._failures = 0
+            if self.state != self.CLOSED:
+                print(f"Circuito '{self.name}' cerrado: Redis responde de nuevo")
+                self.state = self.CLOSED
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.stats["opened"] += 1
+                    print(f"Circuito '{self.name}' abierto tras {self._failures} fallos: {self.last_error}")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    async def call(self, awaitable: Awaitable) -> Any:
+        """Ejecuta una llamada async a Redis con timeout; CircuitOpenError si está abierto"""
+        if not self.allow_request():
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()   # evita el warning de corrutina nunca esperada
+            raise CircuitOpenError(self.name)
+        try:
+            result = await asyncio.wait_for(awaitable, self.call_timeout)
+        except asyncio.TimeoutError as e:
+            self.stats["timeouts"] += 1
+            self.record_failure(e)
+            raise
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            self.release_probe()   # CancelledError: desconexión del cliente o wait_for externo
+            raise
+        self.record_success()
+        return result
+
+    def call_sync(self, fn: Callable, *args, **kwargs) -> Any:
+        """Versión síncrona (el timeout lo aplica el socket_timeout del pool)"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            self.release_probe()
+            raise
+        self.record_success()
+        return result
+
+    def reset(self):
+        """Vuelve a cerrado y limpia contadores (tests y operación manual)"""
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._opened_at = 0.0
+            self._probes = 0
+            self._half_open_at = 0.0
+            self.stats = dict.fromkeys(self.stats, 0)
+            self.last_error = None
+
+    def get_state(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = round(max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at)), 2)
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+            "call_timeout": self.call_timeout,
+            "retry_in": retry_in,
+            "last_error": self.last_error,
+            **self.stats,
+        }
+
+
+def build_redis_breaker() -> CircuitBreaker:
+    """Breaker de Redis del proceso (REDIS_BREAKER_* ajustan umbral, recuperación y timeout)"""
+    return CircuitBreaker(
+        "redis",
+        failure_threshold=int(os.getenv('REDIS_BREAKER_FAILURES', 5)),
+        recovery_timeout=float(os.getenv('REDIS_BREAKER_RECOVERY', 5.0)),
+        call_timeout=float(os.getenv('REDIS_BREAKER_CALL_TIMEOUT', 0.25)),
+    )
+
+
+# Breaker compartido: si Redis cae, cache y rate limiter degradan a la vez
+redis_breaker = build_redis_breaker()
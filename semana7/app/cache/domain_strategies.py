@@ -1,32 +1,85 @@
-from .redis_config import cache_manager
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Tuple
+from .redis_config import async_cache_manager
+
+
+class CacheStrategy(NamedTuple):
+    """Entrada cacheable de una estrategia: clave, TTL, tags y cómo recalcularla"""
+    key: str
+    ttl_type: str
+    loader: Callable[[], Awaitable[Any]]
+    tags: Tuple[str, ...] = ()
+
+
+# Fuentes de datos (simulan la consulta a la base de datos de la academia)
+
+async def load_grupos_frecuentes():
+    return [
+        {"id": 1, "nombre": "Inglés A1", "descripcion": "Curso para principiantes de inglés"},
+        {"id": 2, "nombre": "Inglés A2", "descripcion": "Curso para nivel intermedio bajo"},
+        {"id": 3, "nombre": "Inglés B1", "descripcion": "Curso para nivel intermedio alto"},
+    ]
+
+
+async def load_catalogo_cursos():
+    return [
+        {"id": 1, "curso": "Inglés A1", "duracion": "3 meses", "descripcion": "Curso de inglés para principiantes"},
+        {"id": 2, "curso": "Inglés A2", "duracion": "3 meses", "descripcion": "Curso de inglés para nivel básico"},
+        {"id": 3, "curso": "Inglés B1", "duracion": "3 meses", "descripcion": "Curso de inglés para nivel intermedio"},
+    ]
+
+
+async def load_reporte_mensual():
+    return {"mes": "Septiembre", "total_estudiantes": 120, "ingresos": 2500.00}
+
+
+async def load_configuracion_niveles():
+    return {"niveles_disponibles": ["A1", "A2", "B1", "B2", "C1", "C2"]}
+
+
+# Tipo A: grupos de cursos más solicitados, TTL de 5 minutos (frequent_data)
+STRATEGY_GRUPOS_FRECUENTES = CacheStrategy(
+    async_cache_manager.get_cache_key("grupos", "frecuentes"), "frequent_data",
+    load_grupos_frecuentes, ("grupos",)
+)
+# Tipo B: catálogo de cursos, TTL de 24 horas (reference_data)
+STRATEGY_CATALOGO_CURSOS = CacheStrategy(
+    async_cache_manager.get_cache_key("catalogo", "cursos"), "reference_data",
+    load_catalogo_cursos, ("catalogo",)
+)
+# Tipo C: reporte mensual, TTL de 1 hora (stable_data)
+STRATEGY_REPORTE_MENSUAL = CacheStrategy(
+    async_cache_manager.get_cache_key("reportes", "mensual"), "stable_data",
+    load_reporte_mensual, ("reportes",)
+)
+# Tipo D: configuración de niveles, TTL de 1 día (reference_data)
+STRATEGY_CONFIGURACION_NIVELES = CacheStrategy(
+    async_cache_manager.get_cache_key("configuracion", "niveles"), "reference_data",
+    load_configuracion_niveles, ("config",)
+)
+
+# Estrategias registradas por dominio (se precargan juntas al arrancar)
+DOMAIN_STRATEGIES: Dict[str, List[CacheStrategy]] = {
+    "lang_": [STRATEGY_GRUPOS_FRECUENTES, STRATEGY_CATALOGO_CURSOS, STRATEGY_CONFIGURACION_NIVELES],
+    "fin_": [STRATEGY_REPORTE_MENSUAL],
+}
+
 
 class DomainSpecificCaching:
 
+    @staticmethod
+    async def _cache_strategy(strategy: CacheStrategy):
+        return await async_cache_manager.get_or_set(
+            strategy.key, strategy.loader, strategy.ttl_type, tags=strategy.tags
+        )
+
     @staticmethod
     async def cache_for_domain_type_a(domain_prefix: str):
         """Estrategias para dominios tipo A (alta frecuencia de consultas)"""
         # Cache registros principales por usuario/cliente
         # Cache datos de configuración estándar
         # Cache información de referencia
-        
-        # Ejemplo de caching de datos frecuentes de grupos de curso
-        # (como en el caso de "grupos de cursos más solicitados")
-        cache_key = cache_manager.get_cache_key("grupos", "frecuentes")
-        cached_data = await cache_manager.get_cache(cache_key)
-        
-        if not cached_data:
-            # Simulando una consulta a la base de datos
-            grupos_frecuentes = [
-                {"id": 1, "nombre": "Inglés A1", "descripcion": "Curso para principiantes de inglés"},
-                {"id": 2, "nombre": "Inglés A2", "descripcion": "Curso para nivel intermedio bajo"},
-                {"id": 3, "nombre": "Inglés B1", "descripcion": "Curso para nivel intermedio alto"},
-            ]
-            
-            # Almacenar en caché con un TTL de 5 minutos (frequent_data)
-            await cache_manager.set_cache(cache_key, grupos_frecuentes, ttl_type="frequent_data")
-            return grupos_frecuentes
-        
-        return cached_data
+        return await DomainSpecificCaching._cache_strategy(STRATEGY_GRUPOS_FRECUENTES)
 
     @staticmethod
     async def cache_for_domain_type_b(domain_prefix: str):
@@ -34,24 +87,7 @@ class DomainSpecificCaching:
         # Cache catálogos por categoría
         # Cache disponibilidad de recursos
         # Cache información de productos/servicios
-        
-        # Ejemplo de caching de catálogo de cursos
-        cache_key = cache_manager.get_cache_key("catalogo", "cursos")
-        cached_data = await cache_manager.get_cache(cache_key)
-        
-        if not cached_data:
-            # Simulando la consulta al catálogo de cursos
-            catalogo_cursos = [
-                {"id": 1, "curso": "Inglés A1", "duracion": "3 meses", "descripcion": "Curso de inglés para principiantes"},
-                {"id": 2, "curso": "Inglés A2", "duracion": "3 meses", "descripcion": "Curso de inglés para nivel básico"},
-                {"id": 3, "curso": "Inglés B1", "duracion": "3 meses", "descripcion": "Curso de inglés para nivel intermedio"},
-            ]
-            
-            # Almacenar en caché con un TTL de 24 horas (reference_data)
-            await cache_manager.set_cache(cache_key, catalogo_cursos, ttl_type="reference_data")
-            return catalogo_cursos
-        
-        return cached_data
+        return await DomainSpecificCaching._cache_strategy(STRATEGY_CATALOGO_CURSOS)
 
     @staticmethod
     async def cache_for_domain_type_c(domain_prefix: str):
@@ -59,20 +95,7 @@ class DomainSpecificCaching:
         # Cache resultados de cálculos complejos
         # Cache agregaciones de datos
         # Cache reportes generados
-        
-        # Ejemplo de caching de reporte generado (por ejemplo, reporte mensual)
-        cache_key = cache_manager.get_cache_key("reportes", "mensual")
-        cached_data = await cache_manager.get_cache(cache_key)
-        
-        if not cached_data:
-            # Simulando la generación de un reporte complejo
-            reporte_mensual = {"mes": "Septiembre", "total_estudiantes": 120, "ingresos": 2500.00}
-            
-            # Almacenar en caché con un TTL de 1 hora (stable_data)
-            await cache_manager.set_cache(cache_key, reporte_mensual, ttl_type="stable_data")
-            return reporte_mensual
-        
-        return cached_data
+        return await DomainSpecificCaching._cache_strategy(STRATEGY_REPORTE_MENSUAL)
 
     @staticmethod
     async def cache_for_domain_type_d(domain_prefix: str):
@@ -80,20 +103,26 @@ class DomainSpecificCaching:
         # Cache datos maestros del sistema
         # Cache configuraciones de negocio
         # Cache información estática
-        
-        # Ejemplo de caching de configuraciones de la academia (por ejemplo, tipos de niveles)
-        cache_key = cache_manager.get_cache_key("configuracion", "niveles")
-        cached_data = await cache_manager.get_cache(cache_key)
-        
-        if not cached_data:
-            # Simulando la obtención de configuraciones de la academia
-            configuracion_niveles = {"niveles_disponibles": ["A1", "A2", "B1", "B2", "C1", "C2"]}
-            
-            # Almacenar en caché con un TTL de 1 día (reference_data)
-            await cache_manager.set_cache(cache_key, configuracion_niveles, ttl_type="reference_data")
-            return configuracion_niveles
-        
-        return cached_data
+        return await DomainSpecificCaching._cache_strategy(STRATEGY_CONFIGURACION_NIVELES)
+
+    @staticmethod
+    async def warm_up(domain_prefix: str) -> Dict[str, int]:
+        """
+        Precarga todas las estrategias del dominio en un solo lote:
+        un MGET para ver qué falta, cálculo concurrente de lo faltante
+        y un único pipeline para escribirlo.
+        """
+        strategies = DOMAIN_STRATEGIES.get(domain_prefix, [])
+        if not strategies:
+            return {"strategies": 0, "cached": 0, "loaded": 0}
+
+        cached = await async_cache_manager.get_many([s.key for s in strategies])
+        missing = [s for s in strategies if s.key not in cached]
+        values = await asyncio.gather(*(s.loader() for s in missing))
+        await async_cache_manager.set_entries(
+            (s.key, value, s.ttl_type, s.tags) for s, value in zip(missing, values)
+        )
+        return {"strategies": len(strategies), "cached": len(cached), "loaded": len(missing)}
 
     # Personaliza este método para TU dominio específico
     @staticmethod
@@ -102,19 +131,8 @@ class DomainSpecificCaching:
         Implementa caching específico según el dominio
         DEBES personalizar completamente para TU contexto específico
         """
-        # Analiza TU dominio y determina qué tipo se adapta mejor
-        # Luego implementa la estrategia específica para TU negocio
-
-        # Ejemplo de personalización (REEMPLAZA completamente):
-        if domain_prefix == "lang_":  # Aquí puedes personalizar el prefijo del dominio
+        # Las estrategias de cada dominio se registran en DOMAIN_STRATEGIES:
+        # lang_ (Academia Idiomas) usa tipos A, B y D; fin_ usa tipo C (reportes)
+        if domain_prefix == "lang_":
             print(f"Implementando caché para dominio de tipo 'Academia Idiomas' (prefijo: {domain_prefix})")
-            
-            # Supongamos que tu dominio tiene características como 'consultas_frecuentes' y 'catalogo_productos'
-            await DomainSpecificCaching.cache_for_domain_type_a(domain_prefix)  # Estrategia tipo A
-            await DomainSpecificCaching.cache_for_domain_type_b(domain_prefix)  # Estrategia tipo B
-            await DomainSpecificCaching.cache_for_domain_type_d(domain_prefix)  # Estrategia tipo D (datos estáticos)
-        
-        # Si tu dominio tuviera otro prefijo, implementarías otras estrategias.
-        # Ejemplo:
-        elif domain_prefix == "fin_":
-            await DomainSpecificCaching.cache_for_domain_type_c(domain_prefix)  # Estrategia tipo C (para reportes)
+        return await DomainSpecificCaching.warm_up(domain_prefix)
@@ -1,31 +1,40 @@
 # app/cache/invalidation.py
+import os
 from fastapi import APIRouter
-from .redis_config import cache_manager
+from .redis_config import async_cache_manager
 
 router = APIRouter(prefix="/invalidate", tags=["Cache Invalidation"])
 
+# Claves escritas antes de los tags (sin tag set) viven hasta 24 h (reference_data):
+# mientras puedan existir se invalidan también por patrón con SCAN.
+# Desactivar con CACHE_LEGACY_PATTERNS=false una vez vencido ese TTL.
+LEGACY_PATTERNS = os.getenv('CACHE_LEGACY_PATTERNS', "true").lower() == "true"
+
+
+async def _invalidate_legacy(*patterns: str):
+    if LEGACY_PATTERNS:
+        for pattern in patterns:
+            await async_cache_manager.invalidate_cache(pattern)
+
 class AcademiaCacheInvalidation:
 
     @staticmethod
     async def on_curso_update(curso_id: str):
         """Invalida el cache relacionado a un curso específico"""
-        patterns = [
-            f"*curso*{curso_id}*",
-            f"*catalogo_cursos*",
-            f"*grupos_frecuentes*"
-        ]
-        for pattern in patterns:
-            cache_manager.invalidate_cache(pattern)
+        await async_cache_manager.invalidate_tags(f"curso:{curso_id}", "catalogo", "grupos")
+        await _invalidate_legacy(f"*curso*{curso_id}*", "*catalogo_cursos*", "*grupos_frecuentes*")
 
     @staticmethod
     async def on_catalogo_update():
         """Invalida cache del catálogo completo"""
-        cache_manager.invalidate_cache("*catalogo_cursos*")
+        await async_cache_manager.invalidate_tags("catalogo")
+        await _invalidate_legacy("*catalogo_cursos*")
 
     @staticmethod
     async def on_config_update():
         """Invalida configuraciones"""
-        cache_manager.invalidate_cache("*config*")
+        await async_cache_manager.invalidate_tags("config")
+        await _invalidate_legacy("*config*")
 
 # Endpoint de ejemplo para invalidar al actualizar curso
 @router.put("/curso/{curso_id}")
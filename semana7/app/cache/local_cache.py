@@ -0,0 +1,103 @@
+# app/cache/local_cache.py
+import fnmatch
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+
+class LocalLRUCache:
+    """
+    Cache L1 en memoria del proceso (delante de Redis).
+    Acotado por número de entradas, con TTL por tipo de dato y expulsión LRU.
+    Los valores se devuelven por referencia: no mutar lo que retorna.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_by_type: Optional[Dict[str, int]] = None):
+        self.max_entries = max_entries
+        # TTL en L1 por tipo de dato (0 = ese tipo no se guarda en L1).
+        # Son más cortos que en Redis: acotan lo desactualizado si se pierde una invalidación
+        self.ttl_by_type = ttl_by_type if ttl_by_type is not None else {
+            'frequent_data': 15,
+            'stable_data': 120,
+            'reference_data': 600,
+            'temp_data': 0,
+        }
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def accepts(self, ttl_type: Optional[str]) -> bool:
+        """Indica si un tipo de dato se guarda en L1"""
+        return bool(ttl_type) and self.ttl_by_type.get(ttl_type, 0) > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl_type: str, tags: Iterable[str] = ()):
+        ttl = self.ttl_by_type.get(ttl_type, 0)
+        if ttl <= 0 or value is None:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, pattern: str) -> int:
+        """Expulsa las entradas que coinciden con un patrón glob (mismo formato que Redis)"""
+        with self._lock:
+            if not any(ch in pattern for ch in "*?["):
+                return 1 if self._entries.pop(pattern, None) is not None else 0
+            matched = [k for k in self._entries if fnmatch.fnmatchcase(k, pattern)]
+            for key in matched:
+                del self._entries[key]
+            return len(matched)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Expulsa las entradas asociadas a cualquiera de los tags"""
+        tags = set(tags)
+        with self._lock:
+            matched = [k for k, (_, _, entry_tags) in self._entries.items() if entry_tags & tags]
+            for key in matched:
+                del self._entries[key]
+            return len(matched)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def build_local_cache() -> Optional[LocalLRUCache]:
+    """Crea el L1 del proceso si está habilitado (CACHE_L1_ENABLED=0 lo desactiva)"""
+    if os.getenv('CACHE_L1_ENABLED', '1') == '0':
+        return None
+    return LocalLRUCache(max_entries=int(os.getenv('CACHE_L1_MAX_ENTRIES', 1024)))
@@ -1,34 +1,197 @@
 # app/cache/metrics.py
+"""
+Métricas del cache con bajo costo por acceso.
+
+Cada lectura/escritura solo actualiza contadores en memoria del proceso
+(un lock y unas sumas, sin I/O). Los acumulados se publican de dos formas:
+- flush periódico a Redis en un único pipeline (agregado entre workers)
+- export directo al registry de Prometheus (ver monitoring/metrics.py)
+Las series se agrupan por prefijo de clave y ttl_type.
+"""
+import asyncio
+import bisect
+import threading
 import time
-from .redis_config import cache_manager
+from typing import Any, Dict, List, Optional, Tuple
+
+# Límites superiores (segundos) del histograma de latencia de lectura
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# Resultado de cada lectura
+OUTCOMES = ("hit_local", "hit_redis", "stale", "miss")
+
+# Tope de series (prefijo, ttl_type); el resto se agrupa en "other"
+MAX_SERIES = 256
+
+
+def _new_series() -> Dict[str, Any]:
+    return {
+        **{outcome: 0 for outcome in OUTCOMES},
+        "sets": 0,
+        "bytes_read": 0,
+        "bytes_written": 0,
+        "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),   # el último es +Inf
+        "latency_sum": 0.0,
+    }
+
 
 class CacheMetrics:
+    """Acumula hits/misses, bytes y latencias por (prefijo de clave, ttl_type)"""
 
-    @staticmethod
-    def _get_time_bucket() -> int:
-        """Retorna el bucket de 5 minutos para agrupar métricas"""
-        return int(time.time() // 300)
+    def __init__(self, domain_prefix: str = "lang_", bucket_seconds: int = 300,
+                 retention_seconds: int = 3600):
+        self.domain_prefix = domain_prefix
+        self.bucket_seconds = bucket_seconds        # ventana de agregación en Redis
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._totals: Dict[Tuple[str, str], Dict[str, Any]] = {}    # acumulado del proceso
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}   # pendiente de flush a Redis
 
-    @staticmethod
-    def track_cache_hit(key: str):
+    def key_prefix(self, key: str) -> str:
+        """Primer segmento de la clave sin el prefijo del dominio (ej. 'grupos', 'get_niveles')"""
+        parts = [p for p in key.split(":") if p and p != self.domain_prefix]
+        return parts[0] if parts else "root"
+
+    def _series(self, store: Dict, prefix: str, ttl_type: Optional[str]) -> Dict[str, Any]:
+        label = (prefix, ttl_type or "unknown")
+        series = store.get(label)
+        if series is None:
+            if len(store) >= MAX_SERIES:
+                label = ("other", label[1])
+                series = store.get(label)
+            if series is None:
+                series = store[label] = _new_series()
+        return series
+
+    def record_get(self, key: str, ttl_type: Optional[str], outcome: str,
+                   nbytes: int = 0, latency: float = 0.0):
+        """Registra una lectura: outcome es uno de OUTCOMES"""
+        prefix = self.key_prefix(key)
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, latency)
+        with self._lock:
+            for store in (self._totals, self._pending):
+                series = self._series(store, prefix, ttl_type)
+                series[outcome] += 1
+                series["bytes_read"] += nbytes
+                series["latency_buckets"][bucket] += 1
+                series["latency_sum"] += latency
+
+    def record_set(self, key: str, ttl_type: Optional[str], nbytes: int):
+        """Registra una escritura y el tamaño del payload guardado"""
+        prefix = self.key_prefix(key)
+        with self._lock:
+            for store in (self._totals, self._pending):
+                series = self._series(store, prefix, ttl_type)
+                series["sets"] += 1
+                series["bytes_written"] += nbytes
+
+    # Compatibilidad con la API anterior (sin ttl_type ni latencia)
+    def track_cache_hit(self, key: str, ttl_type: Optional[str] = None):
         """Registra un hit de cache"""
-        bucket = CacheMetrics._get_time_bucket()
-        metric_key = f"metrics:cache_hits:{bucket}"
-        cache_manager.redis_client.incr(metric_key)
-        cache_manager.redis_client.expire(metric_key, 3600)  # expira en 1h
+        self.record_get(key, ttl_type, "hit_redis")
 
-    @staticmethod
-    def track_cache_miss(key: str):
+    def track_cache_miss(self, key: str, ttl_type: Optional[str] = None):
         """Registra un miss de cache"""
-        bucket = CacheMetrics._get_time_bucket()
-        metric_key = f"metrics:cache_misses:{bucket}"
-        cache_manager.redis_client.incr(metric_key)
-        cache_manager.redis_client.expire(metric_key, 3600)
+        self.record_get(key, ttl_type, "miss")
+
+    def snapshot(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Copia de los acumulados del proceso (para Prometheus y el endpoint de monitoreo)"""
+        with self._lock:
+            return {
+                label: {**series, "latency_buckets": list(series["latency_buckets"])}
+                for label, series in self._totals.items()
+            }
+
+    def get_summary(self) -> List[Dict[str, Any]]:
+        """Hit ratio, bytes y latencia media por prefijo y ttl_type"""
+        summary = []
+        for (prefix, ttl_type), series in sorted(self.snapshot().items()):
+            hits = series["hit_local"] + series["hit_redis"] + series["stale"]
+            reads = hits + series["miss"]
+            summary.append({
+                "prefix": prefix,
+                "ttl_type": ttl_type,
+                **{outcome: series[outcome] for outcome in OUTCOMES},
+                "hit_ratio": round(hits / reads, 3) if reads else 0.0,
+                "sets": series["sets"],
+                "bytes_read": series["bytes_read"],
+                "bytes_written": series["bytes_written"],
+                "avg_latency_ms": round(series["latency_sum"] / reads * 1000, 3) if reads else 0.0,
+            })
+        return summary
+
+    def _time_bucket(self) -> int:
+        return int(time.time() // self.bucket_seconds)
+
+    def _metrics_key(self, bucket: int) -> str:
+        return f"metrics:{self.domain_prefix}:cache:{bucket}"
+
+    def _drain(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    async def flush(self, redis_client) -> int:
+        """
+        Vuelca lo pendiente a un hash de Redis por ventana de tiempo, en un solo pipeline.
+        Si falla, los contadores se reincorporan para el siguiente flush.
+        """
+        pending = self._drain()
+        if not pending:
+            return 0
+        metrics_key = self._metrics_key(self._time_bucket())
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for (prefix, ttl_type), series in pending.items():
+                    field = f"{prefix}|{ttl_type}"
+                    for name in (*OUTCOMES, "sets", "bytes_read", "bytes_written"):
+                        if series[name]:
+                            pipe.hincrby(metrics_key, f"{field}|{name}", series[name])
+                    if series["latency_sum"]:
+                        pipe.hincrbyfloat(metrics_key, f"{field}|latency_sum", series["latency_sum"])
+                pipe.expire(metrics_key, self.retention_seconds)
+                await pipe.execute()
+            return len(pending)
+        except Exception as e:
+            print(f"Error enviando métricas de cache a Redis: {e}")
+            self._merge_pending(pending)
+            return 0
+
+    def _merge_pending(self, pending: Dict[Tuple[str, str], Dict[str, Any]]):
+        with self._lock:
+            for label, series in pending.items():
+                current = self._series(self._pending, *label)
+                for name, value in series.items():
+                    if name == "latency_buckets":
+                        current[name] = [a + b for a, b in zip(current[name], value)]
+                    else:
+                        current[name] += value
+
+    async def run_flusher(self, client_factory, interval: float = 10.0):
+        """Tarea de fondo: flush periódico y uno final al cancelarse"""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.flush(client_factory())
+        except asyncio.CancelledError:
+            await self.flush(client_factory())
+            raise
+
+    async def get_custom_metrics(self, redis_client) -> Dict[str, Any]:
+        """Contadores agregados de todos los workers en la ventana actual"""
+        bucket = self._time_bucket()
+        raw = await redis_client.hgetall(self._metrics_key(bucket))
+        series: Dict[str, Dict[str, float]] = {}
+        for field, value in raw.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            prefix, ttl_type, name = field.split("|")
+            series.setdefault(f"{prefix}|{ttl_type}", {})[name] = float(value)
+        return {"time_bucket": bucket, "series": series}
 
     @staticmethod
-    def get_cache_stats():
+    async def get_cache_stats(redis_client) -> Dict[str, Any]:
         """Obtiene estadísticas básicas de Redis"""
-        info = cache_manager.redis_client.info()
+        info = await redis_client.info()
         return {
             "connected_clients": info.get("connected_clients", 0),
             "used_memory": info.get("used_memory_human", "0B"),
@@ -36,15 +199,6 @@ class CacheMetrics:
             "keyspace_misses": info.get("keyspace_misses", 0),
         }
 
-    @staticmethod
-    def get_custom_metrics():
-        """Obtiene los contadores de hits/misses agrupados por buckets"""
-        bucket = CacheMetrics._get_time_bucket()
-        hits = cache_manager.redis_client.get(f"metrics:cache_hits:{bucket}") or 0
-        misses = cache_manager.redis_client.get(f"metrics:cache_misses:{bucket}") or 0
 
-        return {
-            "time_bucket": bucket,
-            "hits": int(hits),
-            "misses": int(misses),
-        }
+# Métricas del cache del dominio Academia Idiomas (compartidas por los backends sync y async)
+cache_metrics = CacheMetrics("lang_")
@@ -1,18 +1,101 @@
 # app/cache/redis_config.py
 import redis
+import redis.asyncio as aioredis
+import asyncio
 import json
-from typing import Optional, Any
+import math
+import random
+import time
+from typing import Optional, Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Tuple
 import os
+from .local_cache import LocalLRUCache, build_local_cache
+from .metrics import CacheMetrics, cache_metrics
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, redis_breaker
+from .serialization import CacheSerializer, build_serializer
+from .single_flight import SingleFlight
 
-class DomainCacheConfig:
-    def __init__(self, domain_prefix: str):
+# Configuración del pool compartido de conexiones (ajustable por entorno)
+REDIS_POOL_SETTINGS = {
+    "host": os.getenv('REDIS_HOST', 'localhost'),
+    "port": int(os.getenv('REDIS_PORT', 6379)),
+    "db": 0,
+    "max_connections": int(os.getenv('REDIS_MAX_CONNECTIONS', 50)),
+    "timeout": float(os.getenv('REDIS_POOL_TIMEOUT', 1.0)),             # espera por conexión libre
+    "socket_timeout": float(os.getenv('REDIS_SOCKET_TIMEOUT', 0.5)),
+    "socket_connect_timeout": float(os.getenv('REDIS_CONNECT_TIMEOUT', 0.5)),
+    "health_check_interval": 30,
+    "decode_responses": False,   # el cache guarda payloads binarios (ver serialization.py)
+}
+
+# Tamaño de lote para SCAN/SSCAN + UNLINK al invalidar (evita bloquear Redis)
+INVALIDATION_BATCH_SIZE = 500
+
+_sync_pool: Optional[redis.BlockingConnectionPool] = None
+_async_pool: Optional[aioredis.BlockingConnectionPool] = None
+_async_pool_loop = None
+
+
+def get_sync_pool() -> redis.BlockingConnectionPool:
+    """Pool síncrono compartido por todo el proceso"""
+    global _sync_pool
+    if _sync_pool is None:
+        _sync_pool = redis.BlockingConnectionPool(**REDIS_POOL_SETTINGS)
+    return _sync_pool
+
+
+def get_async_pool() -> aioredis.BlockingConnectionPool:
+    """Pool asíncrono compartido (uno por event loop, las conexiones no se comparten entre loops)"""
+    global _async_pool, _async_pool_loop
+    loop = asyncio.get_running_loop()
+    if _async_pool is None or _async_pool_loop is not loop:
+        _async_pool = aioredis.BlockingConnectionPool(**REDIS_POOL_SETTINGS)
+        _async_pool_loop = loop
+    return _async_pool
+
+
+async def close_redis_pools():
+    """Cierra los pools compartidos (llamar al apagar la aplicación)"""
+    global _sync_pool, _async_pool, _async_pool_loop
+    if _async_pool is not None:
+        await _async_pool.disconnect()
+        _async_pool = None
+        _async_pool_loop = None
+    if _sync_pool is not None:
+        _sync_pool.disconnect()
+        _sync_pool = None
+
+
+class CacheEntry(NamedTuple):
+    """Valor cacheado con su expiración lógica y el costo de recalcularlo"""
+    value: Any
+    expires_at: float   # epoch; después de esto el valor está "stale"
+    delta: float = 0.0  # segundos que tomó calcularlo (para XFetch)
+    tags: Tuple[str, ...] = ()   # tags con los que se escribió (para el L1 de quien la lee)
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+# (clave, valor, ttl_type, tags) para escrituras en lote
+CacheWrite = Tuple[str, Any, str, Iterable[str]]
+
+
+class _DomainCacheBase:
+    """Configuración común (prefijo, claves y TTLs) de los backends de cache"""
+
+    def __init__(self, domain_prefix: str, local_cache: Optional[LocalLRUCache] = None,
+                 serializer: Optional[CacheSerializer] = None,
+                 metrics: Optional[CacheMetrics] = None,
+                 breaker: Optional[CircuitBreaker] = None):
         self.domain_prefix = domain_prefix  # Prefijo específico para el dominio
-        self.redis_client = redis.Redis(
-            host=os.getenv('REDIS_HOST', 'localhost'),
-            port=os.getenv('REDIS_PORT', 6379),
-            db=0,
-            decode_responses=True
-        )
+        self.local_cache = local_cache      # L1 opcional en memoria del proceso
+        self.serializer = serializer or build_serializer()
+        self.metrics = metrics              # contadores en memoria (ver metrics.py)
+        # Con el circuito abierto las lecturas son miss y las escrituras se omiten (bypass)
+        self.breaker = breaker or CircuitBreaker("redis")
+        # Canal pub/sub para que todos los workers expulsen sus entradas L1
+        self.invalidation_channel = f"{domain_prefix}:cache:invalidate"
 
         # TTL específicos por tipo de dato en el dominio
         self.cache_ttl = {
@@ -22,49 +105,550 @@ class DomainCacheConfig:
             'temp_data': 60           # 1 minuto para datos temporales
         }
 
+        # Políticas por tipo de dato:
+        # - stale_ttl: segundos extra en los que se sirve el valor vencido mientras
+        #   se refresca en segundo plano (stale-while-revalidate). 0 = desactivado
+        # - xfetch_beta: recálculo probabilístico anticipado (XFetch). 0 = desactivado,
+        #   valores > 1 adelantan más el recálculo
+        self.cache_policies = {
+            'frequent_data': {'stale_ttl': 60, 'xfetch_beta': 1.0},
+            'stable_data': {'stale_ttl': 300, 'xfetch_beta': 1.0},
+            'reference_data': {'stale_ttl': 3600, 'xfetch_beta': 0.0},
+            'temp_data': {'stale_ttl': 0, 'xfetch_beta': 0.0},
+        }
+
     def get_cache_key(self, category: str, identifier: str) -> str:
         """Genera claves de cache específicas para tu dominio"""
         return f"{self.domain_prefix}:{category}:{identifier}"
 
-    def set_cache(self, key: str, value: Any, ttl_type: str = 'frequent_data') -> bool:
-        """Almacena datos en cache con TTL específico"""
+    def get_tag_key(self, tag: str) -> str:
+        """Set de Redis con las claves de cache asociadas a un tag (ej. curso:12, catalogo)"""
+        return self.get_cache_key("tag", tag)
+
+    def _tag_ttl(self) -> int:
+        """Los sets de tags viven lo que la entrada más larga del dominio"""
+        return max(
+            ttl + self._policy(ttl_type)['stale_ttl'] for ttl_type, ttl in self.cache_ttl.items()
+        )
+
+    def _policy(self, ttl_type: Optional[str]) -> dict:
+        return self.cache_policies.get(ttl_type, {'stale_ttl': 0, 'xfetch_beta': 0.0})
+
+    def allows_stale(self, ttl_type: Optional[str]) -> bool:
+        return self._policy(ttl_type)['stale_ttl'] > 0
+
+    def should_refresh_early(self, entry: CacheEntry, ttl_type: Optional[str]) -> bool:
+        """XFetch: decide al azar recalcular antes de expirar, más probable cuanto más cerca"""
+        beta = self._policy(ttl_type)['xfetch_beta']
+        if beta <= 0 or entry.delta <= 0 or math.isinf(entry.expires_at):
+            return False
+        return time.time() - entry.delta * beta * math.log(1.0 - random.random()) >= entry.expires_at
+
+    def _serialize_entry(self, key: str, value: Any, ttl_type: str, delta: float,
+                         tags: Iterable[str] = ()):
+        """Envuelve el valor con su expiración lógica; devuelve (payload, ttl físico en Redis)"""
+        ttl = self.cache_ttl.get(ttl_type, 300)
+        data = {"__v": value, "__exp": time.time() + ttl, "__d": round(delta, 4)}
+        if tags:
+            # Los tags viajan con el valor: otro worker que lo suba a su L1 debe poder
+            # expulsarlo al recibir la invalidación por tags
+            data["__t"] = list(tags)
+        payload = self.serializer.dumps(data)
+        if self.metrics is not None:
+            self.metrics.record_set(key, ttl_type, len(payload))
+        return payload, ttl + self._policy(ttl_type)['stale_ttl']
+
+    def _deserialize_entry(self, raw) -> CacheEntry:
+        data = self.serializer.loads(raw)
+        if isinstance(data, dict) and "__v" in data and "__exp" in data:
+            return CacheEntry(data["__v"], data["__exp"], data.get("__d", 0.0), tuple(data.get("__t", ())))
+        # Formato anterior (valor plano): se considera vigente hasta su TTL de Redis
+        return CacheEntry(data, math.inf)
+
+    @staticmethod
+    def _report(message: str, error: Exception):
+        """Imprime el error salvo que sea el circuito abierto (evita un print por request)"""
+        if not isinstance(error, CircuitOpenError):
+            print(f"{message}: {error}")
+
+    def _record_get(self, key: str, ttl_type: Optional[str], outcome: str,
+                    nbytes: int = 0, started: float = 0.0):
+        if self.metrics is not None:
+            self.metrics.record_get(key, ttl_type, outcome, nbytes, time.perf_counter() - started)
+
+    def _get_local(self, cache_key: str, use_local: bool) -> Optional[Any]:
+        if self.local_cache is None or not use_local:
+            return None
+        return self.local_cache.get(cache_key)
+
+    def _set_local(self, cache_key: str, value: Any, ttl_type: Optional[str], use_local: bool,
+                   tags: Iterable[str] = ()):
+        if self.local_cache is not None and use_local and self.local_cache.accepts(ttl_type):
+            self.local_cache.set(cache_key, value, ttl_type, tags)
+
+    def _queue_set(self, pipe, key: str, value: Any, ttl_type: str,
+                   tags: Iterable[str] = (), delta: float = 0.0):
+        """Encola en un pipeline el SET de una entrada y su registro en los tags"""
+        cache_key = self.get_cache_key("data", key)
+        tags = list(tags)
+        serialized_value, ttl = self._serialize_entry(key, value, ttl_type, delta, tags)
+        pipe.set(cache_key, serialized_value, ex=ttl)
+        for tag in tags:
+            pipe.sadd(self.get_tag_key(tag), cache_key)
+            pipe.expire(self.get_tag_key(tag), self._tag_ttl())
+
+    def _collect_many(self, keys: List[str], raws: List[Any], ttl_type: Optional[str],
+                      use_local: bool, found: Dict[str, Any], started: float) -> Dict[str, Any]:
+        """Procesa la respuesta de MGET: solo valores vigentes, y los sube al L1"""
+        for key, raw in zip(keys, raws):
+            if not raw:
+                self._record_get(key, ttl_type, "miss", started=started)
+                continue
+            entry = self._deserialize_entry(raw)
+            if entry.is_fresh:
+                cache_key = self.get_cache_key("data", key)
+                self._set_local(cache_key, entry.value, ttl_type, use_local, entry.tags)
+                found[key] = entry.value
+                self._record_get(key, ttl_type, "hit_redis", len(raw), started)
+            else:
+                self._record_get(key, ttl_type, "miss", len(raw), started)
+        return found
+
+    def _split_local(self, keys: Iterable[str], ttl_type: Optional[str], use_local: bool):
+        """Separa las claves servidas por el L1 de las que hay que pedir a Redis"""
+        found, missing = {}, []
+        for key in keys:
+            started = time.perf_counter()
+            local_value = self._get_local(self.get_cache_key("data", key), use_local)
+            if local_value is not None:
+                found[key] = local_value
+                self._record_get(key, ttl_type, "hit_local", started=started)
+            else:
+                missing.append(key)
+        return found, missing
+
+    def _invalidation_pattern(self, pattern: Optional[str]) -> str:
+        """Patrón completo de Redis que se invalida (y se publica a los demás workers)"""
+        if pattern:
+            return self.get_cache_key("data", pattern)
+        return f"{self.domain_prefix}:*"
+
+    def _evict_local(self, full_pattern: str):
+        if self.local_cache is not None:
+            self.local_cache.invalidate(full_pattern)
+
+    def _evict_local_tags(self, tags: Iterable[str]):
+        if self.local_cache is not None:
+            self.local_cache.invalidate_tags(tags)
+
+    def _handle_invalidation_message(self, data: str):
+        """Aplica al L1 un mensaje de invalidación publicado por otro worker"""
+        if not data.startswith("{"):
+            self._evict_local(data)  # mensajes antiguos: patrón plano
+            return
+        message = json.loads(data)
+        if "pattern" in message:
+            self._evict_local(message["pattern"])
+        if "tags" in message:
+            self._evict_local_tags(message["tags"])
+        for cache_key in message.get("keys", ()):
+            self._evict_local(cache_key)
+
+
+class AsyncDomainCacheConfig(_DomainCacheBase):
+    """Backend asíncrono: no bloquea el event loop y usa el pool compartido"""
+
+    def __init__(self, domain_prefix: str, redis_client: Optional[aioredis.Redis] = None,
+                 local_cache: Optional[LocalLRUCache] = None,
+                 metrics: Optional[CacheMetrics] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        super().__init__(domain_prefix, local_cache, metrics=metrics, breaker=breaker)
+        self._redis_client = redis_client
+        # Coalescencia de misses (lock local + lock en Redis con lease corto)
+        self.single_flight = SingleFlight(
+            self, lock_lease_ms=int(os.getenv('CACHE_LOCK_LEASE_MS', 5000))
+        )
+
+    @property
+    def redis_client(self) -> aioredis.Redis:
+        if self._redis_client is not None:
+            return self._redis_client
+        return aioredis.Redis(connection_pool=get_async_pool())
+
+    def _pubsub_client(self) -> aioredis.Redis:
+        """Conexión dedicada para pub/sub: sin socket_timeout, la suscripción queda inactiva largo rato"""
+        if self._redis_client is not None:
+            return self._redis_client
+        return aioredis.Redis(
+            host=REDIS_POOL_SETTINGS["host"],
+            port=REDIS_POOL_SETTINGS["port"],
+            db=REDIS_POOL_SETTINGS["db"],
+            socket_connect_timeout=REDIS_POOL_SETTINGS["socket_connect_timeout"],
+            decode_responses=True,
+        )
+
+    async def set_cache(self, key: str, value: Any, ttl_type: str = 'frequent_data',
+                        use_local: bool = True, delta: float = 0.0,
+                        tags: Iterable[str] = ()) -> bool:
+        """Almacena datos en cache con TTL específico y los registra en sus tags"""
         try:
             cache_key = self.get_cache_key("data", key)
-            serialized_value = json.dumps(value)
-            ttl = self.cache_ttl.get(ttl_type, 300)
-            return self.redis_client.setex(cache_key, ttl, serialized_value)
+            tags = list(tags)
+            if tags:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    self._queue_set(pipe, key, value, ttl_type, tags, delta)
+                    stored = (await self.breaker.call(pipe.execute()))[0]
+            else:
+                serialized_value, ttl = self._serialize_entry(key, value, ttl_type, delta)
+                stored = await self.breaker.call(self.redis_client.set(cache_key, serialized_value, ex=ttl))
+            self._set_local(cache_key, value, ttl_type, use_local, tags)
+            return stored
         except Exception as e:
-            print(f"Error setting cache: {e}")
+            self._report("Error setting cache", e)
             return False
 
-    def get_cache(self, key: str) -> Optional[Any]:
-        """Recupera datos del cache"""
+    async def get_entry(self, key: str, ttl_type: Optional[str] = None,
+                        use_local: bool = True) -> Optional[CacheEntry]:
+        """Recupera la entrada completa (incluye valores stale dentro de su ventana)"""
         try:
+            started = time.perf_counter()
             cache_key = self.get_cache_key("data", key)
-            cached_value = self.redis_client.get(cache_key)
+            local_value = self._get_local(cache_key, use_local)
+            if local_value is not None:
+                self._record_get(key, ttl_type, "hit_local", started=started)
+                return CacheEntry(local_value, math.inf)
+            cached_value = await self.breaker.call(self.redis_client.get(cache_key))
             if cached_value:
-                return json.loads(cached_value)
+                entry = self._deserialize_entry(cached_value)
+                if entry.is_fresh:
+                    self._set_local(cache_key, entry.value, ttl_type, use_local, entry.tags)
+                outcome = "hit_redis" if entry.is_fresh else "stale"
+                self._record_get(key, ttl_type, outcome, len(cached_value), started)
+                return entry
+            self._record_get(key, ttl_type, "miss", started=started)
             return None
         except Exception as e:
-            print(f"Error getting cache: {e}")
+            self._report("Error getting cache", e)
             return None
 
-    def invalidate_cache(self, pattern: str = None):
-        """Invalida cache específico o por patrón"""
+    async def get_cache(self, key: str, ttl_type: Optional[str] = None,
+                        use_local: bool = True) -> Optional[Any]:
+        """Recupera datos vigentes del cache (primero L1, luego Redis)"""
+        entry = await self.get_entry(key, ttl_type=ttl_type, use_local=use_local)
+        if entry is not None and entry.is_fresh:
+            return entry.value
+        return None
+
+    async def get_many(self, keys: Iterable[str], ttl_type: Optional[str] = None,
+                       use_local: bool = True) -> Dict[str, Any]:
+        """Lee varias claves con un solo MGET (las servidas por L1 no van a Redis)"""
+        found, missing = self._split_local(keys, ttl_type, use_local)
+        if not missing:
+            return found
         try:
-            if pattern:
-                cache_pattern = self.get_cache_key("data", pattern)
-                keys = self.redis_client.keys(cache_pattern)
-                if keys:
-                    self.redis_client.delete(*keys)
+            started = time.perf_counter()
+            raws = await self.breaker.call(
+                self.redis_client.mget([self.get_cache_key("data", k) for k in missing])
+            )
+            return self._collect_many(missing, raws, ttl_type, use_local, found, started)
+        except Exception as e:
+            self._report("Error getting many from cache", e)
+            return found
+
+    async def set_entries(self, entries: Iterable[CacheWrite], use_local: bool = True) -> bool:
+        """Escribe entradas con distinto ttl_type/tags en un único pipeline"""
+        entries = list(entries)
+        if not entries:
+            return True
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, value, ttl_type, tags in entries:
+                    self._queue_set(pipe, key, value, ttl_type, tags)
+                await self.breaker.call(pipe.execute())
+            for key, value, ttl_type, tags in entries:
+                self._set_local(self.get_cache_key("data", key), value, ttl_type, use_local, tags)
+            return True
+        except Exception as e:
+            self._report("Error setting many in cache", e)
+            return False
+
+    async def set_many(self, items: Dict[str, Any], ttl_type: str = 'frequent_data',
+                       use_local: bool = True, tags: Iterable[str] = ()) -> bool:
+        """Escribe varias claves con el mismo ttl_type en un único pipeline"""
+        tags = list(tags)
+        return await self.set_entries(
+            ((key, value, ttl_type, tags) for key, value in items.items()), use_local=use_local
+        )
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """Borra varias claves con un solo UNLINK y avisa a los L1 de los demás workers"""
+        cache_keys = [self.get_cache_key("data", k) for k in keys]
+        if not cache_keys:
+            return 0
+        for cache_key in cache_keys:
+            self._evict_local(cache_key)
+        try:
+            client = self.redis_client
+            deleted = await self.breaker.call(client.unlink(*cache_keys))
+            if self.local_cache is not None:
+                await self.breaker.call(
+                    client.publish(self.invalidation_channel, json.dumps({"keys": cache_keys}))
+                )
+            return deleted
+        except Exception as e:
+            self._report("Error deleting many from cache", e)
+            return 0
+
+    async def get_or_set(self, key: str, loader: Callable[[], Awaitable[Any]],
+                         ttl_type: str = 'frequent_data', use_local: bool = True,
+                         tags: Iterable[str] = ()) -> Any:
+        """Lee del cache o recalcula con `loader`; un solo recálculo por clave y miss"""
+        return await self.single_flight.get_or_compute(key, loader, ttl_type, use_local, tags)
+
+    async def _unlink_scanned(self, client, scan: Callable[[int], Awaitable]) -> int:
+        """
+        Recorre SCAN/SSCAN página a página (`scan(cursor)`) y borra cada página con UNLINK.
+        Cada comando pasa por el breaker: con Redis caído se corta al primer fallo.
+        """
+        deleted, cursor = 0, 0
+        while True:
+            cursor, keys = await self.breaker.call(scan(cursor))
+            if keys:
+                deleted += await self.breaker.call(client.unlink(*keys))
+            if not int(cursor):
+                return deleted
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Invalida solo las claves registradas en los tags (Redis + L1 de todos los workers)"""
+        tags = list(tags)
+        if not tags:
+            return 0
+        self._evict_local_tags(tags)
+        deleted = 0
+        try:
+            client = self.redis_client
+            for tag in tags:
+                tag_key = self.get_tag_key(tag)
+                deleted += await self._unlink_scanned(
+                    client, lambda cursor: client.sscan(tag_key, cursor, count=INVALIDATION_BATCH_SIZE)
+                )
+                await self.breaker.call(client.unlink(tag_key))
+            if self.local_cache is not None:
+                await self.breaker.call(client.publish(self.invalidation_channel, json.dumps({"tags": tags})))
+        except Exception as e:
+            self._report("Error invalidating tags", e)
+        return deleted
+
+    async def invalidate_cache(self, pattern: str = None):
+        """Invalida por patrón usando SCAN (para claves sin tags); preferir invalidate_tags"""
+        full_pattern = self._invalidation_pattern(pattern)
+        self._evict_local(full_pattern)
+        try:
+            client = self.redis_client
+            await self._unlink_scanned(
+                client, lambda cursor: client.scan(cursor, match=full_pattern, count=INVALIDATION_BATCH_SIZE)
+            )
+            if self.local_cache is not None:
+                await self.breaker.call(
+                    client.publish(self.invalidation_channel, json.dumps({"pattern": full_pattern}))
+                )
+        except Exception as e:
+            self._report("Error invalidating cache", e)
+
+    async def listen_invalidations(self, retry_delay: float = 1.0):
+        """
+        Escucha el canal de invalidación y expulsa entradas L1 en este worker.
+        Pensado para correr como tarea de fondo durante la vida de la app.
+        """
+        if self.local_cache is None:
+            return
+        client = self._pubsub_client()
+        while True:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.invalidation_channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._handle_invalidation_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error en listener de invalidación: {e}")
+                # Pudimos perder mensajes mientras no estábamos suscritos
+                self.local_cache.clear()
+                await asyncio.sleep(retry_delay)
+            finally:
+                await pubsub.aclose()
+
+
+class DomainCacheConfig(_DomainCacheBase):
+    """Fachada síncrona para los llamadores existentes (scripts, tests, código no async)"""
+
+    def __init__(self, domain_prefix: str, redis_client: Optional[redis.Redis] = None,
+                 local_cache: Optional[LocalLRUCache] = None,
+                 metrics: Optional[CacheMetrics] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        super().__init__(domain_prefix, local_cache, metrics=metrics, breaker=breaker)
+        self.redis_client = redis_client or redis.Redis(connection_pool=get_sync_pool())
+
+    def set_cache(self, key: str, value: Any, ttl_type: str = 'frequent_data',
+                  use_local: bool = True, delta: float = 0.0,
+                  tags: Iterable[str] = ()) -> bool:
+        """Almacena datos en cache con TTL específico y los registra en sus tags"""
+        try:
+            cache_key = self.get_cache_key("data", key)
+            tags = list(tags)
+            if tags:
+                with self.redis_client.pipeline(transaction=False) as pipe:
+                    self._queue_set(pipe, key, value, ttl_type, tags, delta)
+                    stored = self.breaker.call_sync(pipe.execute)[0]
             else:
-                # Invalida todo el cache de tu dominio
-                domain_keys = self.redis_client.keys(f"{self.domain_prefix}:*")
-                if domain_keys:
-                    self.redis_client.delete(*domain_keys)
+                serialized_value, ttl = self._serialize_entry(key, value, ttl_type, delta)
+                stored = self.breaker.call_sync(self.redis_client.set, cache_key, serialized_value, ex=ttl)
+            self._set_local(cache_key, value, ttl_type, use_local, tags)
+            return stored
+        except Exception as e:
+            self._report("Error setting cache", e)
+            return False
+
+    def get_cache(self, key: str, ttl_type: Optional[str] = None,
+                  use_local: bool = True) -> Optional[Any]:
+        """Recupera datos vigentes del cache (primero L1, luego Redis)"""
+        try:
+            started = time.perf_counter()
+            cache_key = self.get_cache_key("data", key)
+            local_value = self._get_local(cache_key, use_local)
+            if local_value is not None:
+                self._record_get(key, ttl_type, "hit_local", started=started)
+                return local_value
+            cached_value = self.breaker.call_sync(self.redis_client.get, cache_key)
+            if cached_value:
+                entry = self._deserialize_entry(cached_value)
+                if not entry.is_fresh:
+                    self._record_get(key, ttl_type, "miss", len(cached_value), started)
+                    return None
+                self._set_local(cache_key, entry.value, ttl_type, use_local, entry.tags)
+                self._record_get(key, ttl_type, "hit_redis", len(cached_value), started)
+                return entry.value
+            self._record_get(key, ttl_type, "miss", started=started)
+            return None
+        except Exception as e:
+            self._report("Error getting cache", e)
+            return None
+
+    def get_many(self, keys: Iterable[str], ttl_type: Optional[str] = None,
+                 use_local: bool = True) -> Dict[str, Any]:
+        """Lee varias claves con un solo MGET (las servidas por L1 no van a Redis)"""
+        found, missing = self._split_local(keys, ttl_type, use_local)
+        if not missing:
+            return found
+        try:
+            started = time.perf_counter()
+            raws = self.breaker.call_sync(
+                self.redis_client.mget, [self.get_cache_key("data", k) for k in missing]
+            )
+            return self._collect_many(missing, raws, ttl_type, use_local, found, started)
+        except Exception as e:
+            self._report("Error getting many from cache", e)
+            return found
+
+    def set_entries(self, entries: Iterable[CacheWrite], use_local: bool = True) -> bool:
+        """Escribe entradas con distinto ttl_type/tags en un único pipeline"""
+        entries = list(entries)
+        if not entries:
+            return True
+        try:
+            with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, value, ttl_type, tags in entries:
+                    self._queue_set(pipe, key, value, ttl_type, tags)
+                self.breaker.call_sync(pipe.execute)
+            for key, value, ttl_type, tags in entries:
+                self._set_local(self.get_cache_key("data", key), value, ttl_type, use_local, tags)
+            return True
+        except Exception as e:
+            self._report("Error setting many in cache", e)
+            return False
+
+    def set_many(self, items: Dict[str, Any], ttl_type: str = 'frequent_data',
+                 use_local: bool = True, tags: Iterable[str] = ()) -> bool:
+        """Escribe varias claves con el mismo ttl_type en un único pipeline"""
+        tags = list(tags)
+        return self.set_entries(
+            ((key, value, ttl_type, tags) for key, value in items.items()), use_local=use_local
+        )
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Borra varias claves con un solo UNLINK y avisa a los L1 de los demás workers"""
+        cache_keys = [self.get_cache_key("data", k) for k in keys]
+        if not cache_keys:
+            return 0
+        for cache_key in cache_keys:
+            self._evict_local(cache_key)
+        try:
+            deleted = self.breaker.call_sync(self.redis_client.unlink, *cache_keys)
+            if self.local_cache is not None:
+                self.breaker.call_sync(
+                    self.redis_client.publish, self.invalidation_channel, json.dumps({"keys": cache_keys})
+                )
+            return deleted
+        except Exception as e:
+            self._report("Error deleting many from cache", e)
+            return 0
+
+    def _unlink_scanned(self, scan: Callable[[int], Any]) -> int:
+        """SCAN/SSCAN página a página y UNLINK de cada página, todo a través del breaker"""
+        deleted, cursor = 0, 0
+        while True:
+            cursor, keys = self.breaker.call_sync(scan, cursor)
+            if keys:
+                deleted += self.breaker.call_sync(self.redis_client.unlink, *keys)
+            if not int(cursor):
+                return deleted
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """Invalida solo las claves registradas en los tags (Redis + L1 de todos los workers)"""
+        tags = list(tags)
+        if not tags:
+            return 0
+        self._evict_local_tags(tags)
+        deleted = 0
+        try:
+            for tag in tags:
+                tag_key = self.get_tag_key(tag)
+                deleted += self._unlink_scanned(
+                    lambda cursor: self.redis_client.sscan(tag_key, cursor, count=INVALIDATION_BATCH_SIZE)
+                )
+                self.breaker.call_sync(self.redis_client.unlink, tag_key)
+            if self.local_cache is not None:
+                self.breaker.call_sync(
+                    self.redis_client.publish, self.invalidation_channel, json.dumps({"tags": tags})
+                )
+        except Exception as e:
+            self._report("Error invalidating tags", e)
+        return deleted
+
+    def invalidate_cache(self, pattern: str = None):
+        """Invalida por patrón usando SCAN (para claves sin tags); preferir invalidate_tags"""
+        full_pattern = self._invalidation_pattern(pattern)
+        self._evict_local(full_pattern)
+        try:
+            self._unlink_scanned(
+                lambda cursor: self.redis_client.scan(cursor, match=full_pattern, count=INVALIDATION_BATCH_SIZE)
+            )
+            if self.local_cache is not None:
+                self.breaker.call_sync(
+                    self.redis_client.publish, self.invalidation_channel, json.dumps({"pattern": full_pattern})
+                )
         except Exception as e:
-            print(f"Error invalidating cache: {e}")
+            self._report("Error invalidating cache", e)
 
-# Instancia específica para "Academia Idiomas"
+# Instancias específicas para "Academia Idiomas"
 # Reemplaza "lang_" como prefijo, con el enfoque en niveles y grupos de curso
-cache_manager = DomainCacheConfig("lang_")
+# Ambas comparten el mismo L1, las métricas y el circuit breaker de Redis del proceso
+local_cache = build_local_cache()
+cache_manager = DomainCacheConfig(
+    "lang_", local_cache=local_cache, metrics=cache_metrics, breaker=redis_breaker
+)  # fachada síncrona
+async_cache_manager = AsyncDomainCacheConfig(
+    "lang_", local_cache=local_cache, metrics=cache_metrics, breaker=redis_breaker
+)  # backend async
@@ -0,0 +1,153 @@
+# app/cache/serialization.py
+"""
+Codecs para los valores del cache.
+
+Cada payload lleva un byte de cabecera versionado:
+    bits 7-6: versión de cabecera (0b10 = v1)
+    bits 5-3: codec (json, orjson, msgpack)
+    bits 2-0: compresión (ninguna, zlib, lz4)
+Un byte 0x80-0xBF nunca inicia un texto UTF-8, así que los valores antiguos
+(JSON plano sin cabecera) se siguen leyendo sin necesidad de vaciar Redis.
+"""
+import json
+import os
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack es opcional
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # lz4 es opcional
+    lz4_frame = None
+
+HEADER_V1 = 0b10 << 6
+HEADER_VERSION_MASK = 0b11 << 6
+
+CODEC_IDS = {"json": 1, "orjson": 2, "msgpack": 3}
+COMPRESSION_NONE, COMPRESSION_ZLIB, COMPRESSION_LZ4 = 0, 1, 2
+
+# Tipos de extensión msgpack para conservar fechas al ida y vuelta
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+
+
+def _default(value: Any):
+    """Tipos no nativos de JSON (fechas de ProductService, usuarios_db, etc.)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Tipo no serializable en cache: {type(value).__name__}")
+
+
+def _msgpack_default(value: Any):
+    if isinstance(value, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, value.isoformat().encode())
+    if isinstance(value, date):
+        return msgpack.ExtType(_EXT_DATE, value.isoformat().encode())
+    return _default(value)
+
+
+def _msgpack_ext_hook(code: int, data: bytes):
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    if code == _EXT_DATE:
+        return date.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def _json_encode(value: Any) -> bytes:
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+
+def _build_codecs() -> Dict[str, tuple]:
+    """(encode, decode) por nombre de codec, solo los disponibles en el entorno"""
+    codecs = {"json": (_json_encode, json.loads)}
+    if orjson is not None:
+        codecs["orjson"] = (
+            lambda value: orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS),
+            orjson.loads,
+        )
+    if msgpack is not None:
+        codecs["msgpack"] = (
+            lambda value: msgpack.packb(value, default=_msgpack_default, use_bin_type=True),
+            lambda raw: msgpack.unpackb(raw, raw=False, ext_hook=_msgpack_ext_hook, strict_map_key=False),
+        )
+    return codecs
+
+
+CODECS = _build_codecs()
+_CODECS_BY_ID = {CODEC_IDS[name]: codec for name, codec in CODECS.items()}
+
+_COMPRESSORS: Dict[int, tuple] = {COMPRESSION_ZLIB: (lambda b: zlib.compress(b, 1), zlib.decompress)}
+if lz4_frame is not None:
+    _COMPRESSORS[COMPRESSION_LZ4] = (lz4_frame.compress, lz4_frame.decompress)
+
+COMPRESSION_IDS = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "lz4": COMPRESSION_LZ4}
+
+
+class CacheSerializer:
+    """Serializa valores con el codec elegido y comprime los que superan el umbral"""
+
+    def __init__(self, codec: str = "orjson", compression: str = "zlib",
+                 compress_threshold: int = 1024):
+        if codec not in CODECS:
+            codec = "json"
+        if compression != "none" and COMPRESSION_IDS.get(compression) not in _COMPRESSORS:
+            compression = "zlib"  # lz4 no instalado o valor desconocido
+        self.codec = codec
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self._encode: Callable[[Any], bytes] = CODECS[codec][0]
+        self._codec_id = CODEC_IDS[codec]
+        self._compression_id = COMPRESSION_IDS[compression]
+
+    def dumps(self, value: Any) -> bytes:
+        payload = self._encode(value)
+        compression_id = COMPRESSION_NONE
+        if self._compression_id != COMPRESSION_NONE and len(payload) >= self.compress_threshold:
+            payload = _COMPRESSORS[self._compression_id][0](payload)
+            compression_id = self._compression_id
+        return bytes((HEADER_V1 | (self._codec_id << 3) | compression_id,)) + payload
+
+    @staticmethod
+    def loads(raw) -> Any:
+        """Decodifica cualquier formato conocido, sin importar el codec configurado"""
+        if isinstance(raw, str):
+            return json.loads(raw)
+        header = raw[0]
+        if header & HEADER_VERSION_MASK != HEADER_V1:
+            return json.loads(raw)  # valor antiguo: JSON plano sin cabecera
+        codec_id = (header >> 3) & 0b111
+        compression_id = header & 0b111
+        payload = raw[1:]
+        if compression_id != COMPRESSION_NONE:
+            if compression_id not in _COMPRESSORS:
+                raise ValueError(f"Compresión {compression_id} no disponible en este worker")
+            payload = _COMPRESSORS[compression_id][1](payload)
+        if codec_id not in _CODECS_BY_ID:
+            raise ValueError(f"Codec {codec_id} no disponible en este worker")
+        return _CODECS_BY_ID[codec_id][1](payload)
+
+
+def build_serializer() -> CacheSerializer:
+    """Serializer del proceso (CACHE_CODEC, CACHE_COMPRESSION, CACHE_COMPRESS_THRESHOLD)"""
+    return CacheSerializer(
+        codec=os.getenv('CACHE_CODEC', 'orjson'),
+        compression=os.getenv('CACHE_COMPRESSION', 'zlib'),
+        compress_threshold=int(os.getenv('CACHE_COMPRESS_THRESHOLD', 1024)),
+    )
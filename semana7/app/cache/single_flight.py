@@ -0,0 +1,161 @@
+# app/cache/single_flight.py
+import asyncio
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+# Libera el lock solo si sigue siendo nuestro (el lease pudo expirar y otro tomarlo)
+RELEASE_LOCK_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Coalescencia de misses de cache: solo un llamador recalcula cada clave.
+    - En el proceso: los concurrentes esperan la misma tarea en curso.
+    - Entre workers: lock en Redis con lease corto (SET NX PX); el resto espera
+      a que aparezca el valor en cache.
+    - Según la política del ttl_type, sirve valores vencidos mientras se refrescan
+      (stale-while-revalidate) o los refresca antes de expirar (XFetch).
+    """
+
+    def __init__(self, cache, lock_lease_ms: int = 5000, wait_timeout: float = 5.0,
+                 poll_interval: float = 0.05):
+        self.cache = cache  # AsyncDomainCacheConfig
+        self.lock_lease_ms = lock_lease_ms
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}   # refrescos en segundo plano
+
+        self.stats = {
+            "computations": 0,         # recálculos ejecutados por este worker
+            "local_coalesced": 0,      # esperas sobre un cálculo en curso del proceso
+            "remote_coalesced": 0,     # esperas sobre el lock de otro worker
+            "remote_reused": 0,        # esperas remotas que terminaron con el valor del líder
+            "lock_wait_timeouts": 0,   # esperas que agotaron wait_timeout
+            "stale_served": 0,         # valores vencidos servidos (stale-while-revalidate)
+            "early_refreshes": 0,      # recálculos anticipados disparados por XFetch
+            "background_refreshes": 0, # refrescos en segundo plano ejecutados
+        }
+
+    async def get_or_compute(self, key: str, loader: Callable[[], Awaitable[Any]],
+                             ttl_type: str = 'frequent_data', use_local: bool = True,
+                             tags: Iterable[str] = ()) -> Any:
+        entry = await self.cache.get_entry(key, ttl_type=ttl_type, use_local=use_local)
+        if entry is not None:
+            if entry.is_fresh:
+                if self.cache.should_refresh_early(entry, ttl_type):
+                    self.stats["early_refreshes"] += 1
+                    self.refresh_in_background(key, loader, ttl_type, use_local, tags)
+                return entry.value
+            if self.cache.allows_stale(ttl_type):
+                # Vencido pero dentro de la ventana stale: se sirve y se refresca aparte
+                self.stats["stale_served"] += 1
+                self.refresh_in_background(key, loader, ttl_type, use_local, tags)
+                return entry.value
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader, ttl_type, use_local, tags))
+            self._in_flight[key] = task
+            task.add_done_callback(
+                lambda t: self._in_flight.pop(key, None) if self._in_flight.get(key) is t else None
+            )
+        else:
+            self.stats["local_coalesced"] += 1
+        # shield: si un llamador se cancela no se cancela el cálculo compartido
+        return await asyncio.shield(task)
+
+    def refresh_in_background(self, key: str, loader, ttl_type: str, use_local: bool = True,
+                              tags: Iterable[str] = ()):
+        """Agenda un refresco de la clave si no hay ya uno en curso en este proceso"""
+        if key in self._in_flight or key in self._refreshing:
+            return
+        task = asyncio.ensure_future(
+            self._load(key, loader, ttl_type, use_local, tags, background=True)
+        )
+        self._refreshing[key] = task
+
+        def _done(t: asyncio.Task):
+            if self._refreshing.get(key) is t:
+                self._refreshing.pop(key, None)
+            if not t.cancelled() and t.exception() is not None:
+                print(f"Error refrescando cache '{key}': {t.exception()}")
+        task.add_done_callback(_done)
+
+    async def refresh(self, key: str, loader, ttl_type: str, use_local: bool = True,
+                      tags: Iterable[str] = ()) -> Optional[Any]:
+        """Refresca ya la clave; None si otro worker tiene el lock de refresco"""
+        return await self._load(key, loader, ttl_type, use_local, tags, background=True)
+
+    async def _load(self, key: str, loader, ttl_type: str, use_local: bool,
+                    tags: Iterable[str] = (), background: bool = False) -> Any:
+        client = self.cache.redis_client
+        lock_key = self.cache.get_cache_key("lock", key)
+        token = uuid.uuid4().hex
+
+        acquired = await self._acquire(client, lock_key, token)
+        if acquired is False:
+            if background:
+                return None  # otro worker ya está refrescando esta clave
+            value = await self._wait_for_leader(client, lock_key, key, ttl_type, use_local)
+            if value is not None:
+                return value
+
+        try:
+            self.stats["computations"] += 1
+            if background:
+                self.stats["background_refreshes"] += 1
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            result = await loader()
+            await self.cache.set_cache(
+                key, result, ttl_type, use_local=use_local, delta=loop.time() - started, tags=tags
+            )
+            return result
+        finally:
+            if acquired:
+                await self._release(client, lock_key, token)
+
+    async def _acquire(self, client, lock_key: str, token: str) -> Optional[bool]:
+        """True si tomamos el lock, False si lo tiene otro, None si Redis no responde"""
+        try:
+            return bool(await self.cache.breaker.call(
+                client.set(lock_key, token, nx=True, px=self.lock_lease_ms)
+            ))
+        except Exception as e:
+            self.cache._report("Error adquiriendo lock de cache", e)
+            return None
+
+    async def _release(self, client, lock_key: str, token: str):
+        try:
+            await self.cache.breaker.call(client.eval(RELEASE_LOCK_LUA, 1, lock_key, token))
+        except Exception as e:
+            self.cache._report("Error liberando lock de cache", e)
+
+    async def _wait_for_leader(self, client, lock_key: str, key: str,
+                               ttl_type: str, use_local: bool) -> Optional[Any]:
+        """Espera a que el worker que tiene el lock publique el valor"""
+        self.stats["remote_coalesced"] += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            value = await self.cache.get_cache(key, ttl_type=ttl_type, use_local=use_local)
+            if value is not None:
+                self.stats["remote_reused"] += 1
+                return value
+            try:
+                if not await self.cache.breaker.call(client.exists(lock_key)):
+                    return None  # el líder terminó sin valor o falló: recalculamos
+            except Exception:
+                return None
+        self.stats["lock_wait_timeouts"] += 1
+        return None
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "in_flight": len(self._in_flight), "refreshing": len(self._refreshing)}
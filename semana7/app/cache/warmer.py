@@ -0,0 +1,149 @@
+# app/cache/warmer.py
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+from .domain_strategies import CacheStrategy, DOMAIN_STRATEGIES
+from .redis_config import AsyncDomainCacheConfig, async_cache_manager
+
+
+class CacheRefreshScheduler:
+    """
+    Refresca proactivamente las estrategias registradas antes de que expire su TTL.
+    - refresh_ratio: fracción del TTL tras la cual se refresca (0.8 = al 80%)
+    - jitter_ratio: adelanto aleatorio para que las claves no se refresquen a la vez
+    - max_concurrency: refrescos simultáneos contra la fuente de datos
+    - Si la fuente falla o supera loader_timeout, reintenta con backoff exponencial
+    """
+
+    def __init__(self, cache: AsyncDomainCacheConfig, strategies: List[CacheStrategy],
+                 refresh_ratio: float = 0.8, jitter_ratio: float = 0.1,
+                 max_concurrency: int = 4, loader_timeout: float = 10.0,
+                 base_backoff: float = 1.0, max_backoff: float = 300.0, tick: float = 1.0):
+        self.cache = cache
+        self.strategies = {s.key: s for s in strategies}
+        self.refresh_ratio = refresh_ratio
+        self.jitter_ratio = jitter_ratio
+        self.max_concurrency = max_concurrency
+        self.loader_timeout = loader_timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.tick = tick
+
+        self._task: Optional[asyncio.Task] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self.state: Dict[str, Dict[str, Any]] = {
+            key: {
+                "ttl_type": s.ttl_type,
+                "next_run_in": None,
+                "last_success": None,
+                "last_duration": None,
+                "last_error": None,
+                "failures": 0,
+                "refreshes": 0,
+                "skipped": 0,   # otro worker tenía el lock de refresco
+            }
+            for key, s in self.strategies.items()
+        }
+        self._next_run: Dict[str, float] = {}
+
+    def _refresh_interval(self, strategy: CacheStrategy) -> float:
+        ttl = self.cache.cache_ttl.get(strategy.ttl_type, 300)
+        interval = ttl * self.refresh_ratio
+        return interval * (1 - random.uniform(0, self.jitter_ratio))
+
+    def _backoff(self, failures: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (failures - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _initial_schedule(self):
+        """Programa cada clave según el tiempo que le queda en cache (o ya, si falta)"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        for key, strategy in self.strategies.items():
+            entry = await self.cache.get_entry(key, ttl_type=strategy.ttl_type, use_local=False)
+            if entry is None or not entry.is_fresh:
+                self._next_run[key] = now
+                continue
+            ttl = self.cache.cache_ttl.get(strategy.ttl_type, 300)
+            remaining = entry.expires_at - time.time()
+            self._next_run[key] = now + max(0.0, remaining - ttl * (1 - self.refresh_ratio))
+
+    async def _refresh(self, strategy: CacheStrategy):
+        state = self.state[strategy.key]
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            started = loop.time()
+            try:
+                result = await asyncio.wait_for(
+                    self.cache.single_flight.refresh(
+                        strategy.key, strategy.loader, strategy.ttl_type, tags=strategy.tags
+                    ),
+                    timeout=self.loader_timeout,
+                )
+            except Exception as e:
+                state["failures"] += 1
+                state["last_error"] = f"{type(e).__name__}: {e}"
+                self._next_run[strategy.key] = loop.time() + self._backoff(state["failures"])
+                return
+
+            state["last_duration"] = round(loop.time() - started, 4)
+            if result is None:
+                state["skipped"] += 1
+            else:
+                state["refreshes"] += 1
+                state["failures"] = 0
+                state["last_error"] = None
+                state["last_success"] = time.time()
+            self._next_run[strategy.key] = loop.time() + self._refresh_interval(strategy)
+
+    async def run(self):
+        """Bucle principal: lanza los refrescos vencidos respetando la concurrencia"""
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        await self._initial_schedule()
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            for key, next_run in list(self._next_run.items()):
+                if next_run <= now and key not in self._running:
+                    task = asyncio.create_task(self._refresh(self.strategies[key]))
+                    self._running[key] = task
+                    task.add_done_callback(lambda t, k=key: self._running.pop(k, None))
+            upcoming = [t for k, t in self._next_run.items() if k not in self._running]
+            sleep_for = min(upcoming) - loop.time() if upcoming else self.tick
+            await asyncio.sleep(min(max(sleep_for, 0.05), self.tick))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        tasks = [t for t in [self._task, *self._running.values()] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def get_state(self) -> Dict[str, Any]:
+        """Estado para el endpoint de monitoreo"""
+        loop_time = asyncio.get_running_loop().time()
+        keys = {}
+        for key, state in self.state.items():
+            next_run = self._next_run.get(key)
+            keys[key] = {
+                **state,
+                "next_run_in": round(next_run - loop_time, 2) if next_run is not None else None,
+                "running": key in self._running,
+            }
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "max_concurrency": self.max_concurrency,
+            "refresh_ratio": self.refresh_ratio,
+            "in_progress": len(self._running),
+            "strategies": keys,
+        }
+
+
+# Scheduler del dominio Academia Idiomas (se arranca en el lifespan de la app)
+cache_refresh_scheduler = CacheRefreshScheduler(async_cache_manager, DOMAIN_STRATEGIES["lang_"])
@@ -1,10 +1,15 @@
+import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 # Ajusta la URL de la base de datos según tu configuración
-SQLALCHEMY_DATABASE_URL = "sqlite:///./app.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -13,3 +18,39 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async: las consultas no bloquean el event loop (asyncpg en Postgres, aiosqlite en local)
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def to_async_url(url: str) -> str:
+    """sqlite:///./app.db -> sqlite+aiosqlite:///./app.db, postgresql://... -> postgresql+asyncpg://..."""
+    scheme, _, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+def build_async_engine(url: str):
+    if url.startswith("sqlite"):
+        return create_async_engine(url)
+    connect_args = {}
+    if "+asyncpg" in url:
+        # asyncpg prepara cada sentencia en el servidor y la reutiliza por conexión
+        connect_args["prepared_statement_cache_size"] = int(os.getenv("DB_PREPARED_CACHE_SIZE", 256))
+    return create_async_engine(
+        url,
+        pool_size=int(os.getenv("DB_POOL_SIZE", 10)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        pool_pre_ping=True,
+        connect_args=connect_args,
+    )
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(SQLALCHEMY_DATABASE_URL))
+
+async_engine = build_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    db: AsyncSession = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -1,6 +1,6 @@
 # app/database/indexes.py
 from sqlalchemy import text
-from app.database import engine
+from app.database.get_db import engine
 
 class DomainIndexes:
     """Índices específicos para optimizar consultas de Academia Idiomas"""
@@ -12,9 +12,13 @@ class DomainIndexes:
         Foco en: curso (entidad principal), niveles y grupos.
         """
         indexes = [
-            # Búsquedas frecuentes de cursos por nivel y estado
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lang_curso_nivel_estado "
-            "ON lang_curso(nivel, estado);",
+            # Cursos por nivel y estado, ya ordenados por la clave keyset (nombre, id)
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lang_curso_nivel_estado_nombre "
+            "ON lang_curso(nivel, estado, nombre, id);",
+
+            # Cursos por nivel sin filtro de estado: misma clave de orden
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lang_curso_nivel_nombre "
+            "ON lang_curso(nivel, nombre, id);",
 
             # Consultas por grupo y curso
             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lang_grupo_curso "
@@ -24,6 +28,10 @@ class DomainIndexes:
             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lang_curso_nombre_duracion "
             "ON lang_curso(nombre, duracion);",
 
+            # Inscripciones por curso en el orden keyset (fecha_inscripcion DESC, id DESC)
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lang_inscripcion_curso_fecha "
+            "ON lang_inscripcion(curso_id, fecha_inscripcion DESC, id DESC);",
+
             # Consultas frecuentes de inscripciones por curso y estudiante
             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lang_inscripcion_curso_estudiante "
             "ON lang_inscripcion(curso_id, estudiante_id, fecha_inscripcion DESC);",
@@ -56,7 +64,8 @@ class DomainIndexes:
         """Crea índices específicos para el dominio Academia Idiomas"""
         indexes = DomainIndexes.get_domain_indexes(domain_prefix)
 
-        with engine.connect() as connection:
+        # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
             for index_sql in indexes:
                 try:
                     connection.execute(text(index_sql))
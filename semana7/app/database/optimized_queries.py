@@ -1,5 +1,6 @@
 # app/database/optimized_queries.py
-from typing import Dict
+from typing import Dict, Tuple
+from sqlalchemy.types import Date, DateTime, Integer, String, TypeEngine
 
 class DomainOptimizedQueries:
     """Consultas optimizadas específicas para el dominio Academia Idiomas"""
@@ -11,25 +12,71 @@ class DomainOptimizedQueries:
         Foco en: cursos, niveles, grupos, profesores y estudiantes.
         """
         return {
-            # Catálogo de cursos por nivel y estado
+            # Catálogo de cursos por nivel y estado (keyset por (nombre, id), sin OFFSET)
             "cursos_por_nivel": """
                 SELECT c.id, c.nombre, c.nivel, c.estado, c.duracion, p.nombre as profesor
                 FROM lang_curso c
                 LEFT JOIN profesores p ON c.profesor_id = p.id
                 WHERE c.nivel = :nivel
                 AND (:estado IS NULL OR c.estado = :estado)
-                ORDER BY c.nombre
-                LIMIT :limit OFFSET :offset
+                ORDER BY c.nombre, c.id
+                LIMIT :limit
+            """,
+            "cursos_por_nivel_after": """
+                SELECT c.id, c.nombre, c.nivel, c.estado, c.duracion, p.nombre as profesor
+                FROM lang_curso c
+                LEFT JOIN profesores p ON c.profesor_id = p.id
+                WHERE c.nivel = :nivel
+                AND (:estado IS NULL OR c.estado = :estado)
+                AND (c.nombre, c.id) > (:cursor_nombre, :cursor_id)
+                ORDER BY c.nombre, c.id
+                LIMIT :limit
+            """,
+            "cursos_por_nivel_before": """
+                SELECT c.id, c.nombre, c.nivel, c.estado, c.duracion, p.nombre as profesor
+                FROM lang_curso c
+                LEFT JOIN profesores p ON c.profesor_id = p.id
+                WHERE c.nivel = :nivel
+                AND (:estado IS NULL OR c.estado = :estado)
+                AND (c.nombre, c.id) < (:cursor_nombre, :cursor_id)
+                ORDER BY c.nombre DESC, c.id DESC
+                LIMIT :limit
             """,
 
-            # Estudiantes inscritos en un curso específico
+            # Estudiantes inscritos en un curso específico (keyset por (fecha_inscripcion, id) descendente)
             "inscripciones_por_curso": """
                 SELECT i.id, e.nombre, e.apellido, i.fecha_inscripcion, i.estado
                 FROM lang_inscripcion i
                 JOIN estudiantes e ON i.estudiante_id = e.id
                 WHERE i.curso_id = :curso_id
-                ORDER BY i.fecha_inscripcion DESC
-                LIMIT :limit OFFSET :offset
+                ORDER BY i.fecha_inscripcion DESC, i.id DESC
+                LIMIT :limit
+            """,
+            "inscripciones_por_curso_after": """
+                SELECT i.id, e.nombre, e.apellido, i.fecha_inscripcion, i.estado
+                FROM lang_inscripcion i
+                JOIN estudiantes e ON i.estudiante_id = e.id
+                WHERE i.curso_id = :curso_id
+                AND (i.fecha_inscripcion, i.id) < (:cursor_fecha_inscripcion, :cursor_id)
+                ORDER BY i.fecha_inscripcion DESC, i.id DESC
+                LIMIT :limit
+            """,
+            "inscripciones_por_curso_before": """
+                SELECT i.id, e.nombre, e.apellido, i.fecha_inscripcion, i.estado
+                FROM lang_inscripcion i
+                JOIN estudiantes e ON i.estudiante_id = e.id
+                WHERE i.curso_id = :curso_id
+                AND (i.fecha_inscripcion, i.id) > (:cursor_fecha_inscripcion, :cursor_id)
+                ORDER BY i.fecha_inscripcion ASC, i.id ASC
+                LIMIT :limit
+            """,
+            # Todas las inscripciones del curso para exportar en streaming (sin LIMIT)
+            "inscripciones_por_curso_export": """
+                SELECT i.id, e.nombre, e.apellido, i.fecha_inscripcion, i.estado
+                FROM lang_inscripcion i
+                JOIN estudiantes e ON i.estudiante_id = e.id
+                WHERE i.curso_id = :curso_id
+                ORDER BY i.fecha_inscripcion DESC, i.id DESC
             """,
 
             # Grupos de un curso (ej. curso de inglés nivel B1 con varios grupos)
@@ -62,6 +109,43 @@ class DomainOptimizedQueries:
             """
         }
 
+    @staticmethod
+    def get_param_types(domain_prefix: str) -> Dict[str, TypeEngine]:
+        """Tipo SQL de cada parámetro: se fija al compilar (asyncpg no infiere tipos en `:p IS NULL`)"""
+        if domain_prefix.startswith("lang_"):
+            return {
+                "nivel": String(2),
+                "estado": String(20),
+                "limit": Integer(),
+                "curso_id": Integer(),
+                "profesor_id": Integer(),
+                "cursor_nombre": String(),
+                "cursor_id": Integer(),
+                "cursor_fecha_inscripcion": DateTime(),
+            }
+        return {}
+
+    @staticmethod
+    def get_column_types(domain_prefix: str) -> Dict[str, TypeEngine]:
+        """Tipo de las columnas de fecha del resultado (SQLite las devuelve como texto)"""
+        if domain_prefix.startswith("lang_"):
+            return {"fecha_inscripcion": DateTime(), "fecha_inicio": Date()}
+        return {}
+
+    @staticmethod
+    def get_keyset_columns(domain_prefix: str) -> Dict[str, Tuple[str, ...]]:
+        """
+        Consultas paginadas por keyset y su clave de orden (columnas del resultado).
+        Cada una tiene variantes `_after` (página siguiente) y `_before` (anterior)
+        que filtran con `:cursor_<columna>`.
+        """
+        if domain_prefix.startswith("lang_"):
+            return {
+                "cursos_por_nivel": ("nombre", "id"),
+                "inscripciones_por_curso": ("fecha_inscripcion", "id"),
+            }
+        return {}
+
     @staticmethod
     def get_queries_for_domain(domain_prefix: str) -> Dict[str, str]:
         """
@@ -0,0 +1,86 @@
+# app/database/pagination.py
+"""
+Cursores opacos para paginación keyset (seek).
+
+El cursor guarda los valores de la clave de orden de la última (o primera) fila
+y la dirección; la siguiente página filtra con `(clave) > (valores)` sobre el
+índice en vez de saltar filas con OFFSET, así el costo no crece con la página.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy.types import TypeEngine
+
+NEXT = "next"
+PREV = "prev"
+
+# Lo único que puede ir en un cursor: un valor por columna de la clave de orden
+_SCALARS = (str, int, float, datetime, date)
+
+
+def _matches(value: Any, type_: TypeEngine) -> bool:
+    """El valor corresponde al tipo SQL del bind (asyncpg rechaza binds mal tipados)"""
+    try:
+        expected = type_.python_type
+    except NotImplementedError:
+        return True
+    if isinstance(value, bool):
+        return False
+    if expected is date:
+        return isinstance(value, date) and not isinstance(value, datetime)
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+class InvalidCursor(ValueError):
+    """Cursor mal formado o de otra consulta"""
+
+
+def _default(value: Any):
+    # Fechas con tipo explícito: asyncpg no acepta strings para columnas date/timestamp
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    raise TypeError(f"Tipo no soportado en cursor: {type(value).__name__}")
+
+
+def _object_hook(data: Dict[str, Any]):
+    if "$dt" in data:
+        return datetime.fromisoformat(data["$dt"])
+    if "$d" in data:
+        return date.fromisoformat(data["$d"])
+    return data
+
+
+def encode_cursor(query_name: str, direction: str, values: Sequence[Any]) -> str:
+    payload = json.dumps({"q": query_name, "d": direction, "k": list(values)},
+                         default=_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(query_name: str, token: str,
+                  key_types: Optional[Sequence[TypeEngine]] = None) -> Tuple[str, list]:
+    """
+    (dirección, valores de la clave); InvalidCursor si no corresponde a la consulta
+    o si los valores no son un escalar por columna de la clave del tipo de su bind
+    (`key_types`, ver DomainOptimizedQueries.get_param_types).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw, object_hook=_object_hook)
+        direction, values = payload["d"], payload["k"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor("Cursor inválido") from e
+    if payload.get("q") != query_name or direction not in (NEXT, PREV):
+        raise InvalidCursor("Cursor inválido para esta consulta")
+    if (not isinstance(values, list)
+            or not all(isinstance(value, _SCALARS) and not isinstance(value, bool) for value in values)):
+        raise InvalidCursor("Cursor inválido: valores de la clave mal formados")
+    if key_types is not None and (len(values) != len(key_types)
+                                  or not all(map(_matches, values, key_types))):
+        raise InvalidCursor("Cursor inválido: valores que no corresponden a la clave de orden")
+    return direction, values
@@ -1,47 +1,242 @@
 # app/database/profiling.py
-import time
+"""
+Profiler de consultas SQL agrupadas por huella (fingerprint).
+
+Cada sentencia se normaliza (literales -> ?, listas IN colapsadas, espacios) y se
+acumula por huella: conteo, total, máximo y un histograma logarítmico (estilo HDR,
+~4% de error relativo) del que salen p50/p95. La memoria está acotada: como mucho
+`max_fingerprints` huellas, se descarta la usada hace más tiempo.
+De las consultas lentas se guarda una muestra para obtener su EXPLAIN más tarde,
+fuera del evento de SQLAlchemy (ver `explain_pending`).
+"""
+import hashlib
 import logging
+import math
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
 from sqlalchemy import event
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
 
 # Configurar logging para consultas lentas
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("sql_performance")
 
-# Lista global de consultas lentas detectadas
-slow_queries = []
+# Normalización de literales para la huella
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+_TABLES = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+([A-Za-z_][\w.]*)", re.IGNORECASE)
+
+
+def normalize_statement(statement: str) -> str:
+    """SELECT ... WHERE id = 42 AND nivel = 'B1' -> SELECT ... WHERE id = ? AND nivel = ?"""
+    normalized = _STRING.sub("?", statement)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (?)", normalized)
+    return _SPACES.sub(" ", normalized).strip()
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+class LatencyHistogram:
+    """
+    Histograma logarítmico: SUB_BUCKETS cubetas por cada potencia de 2 desde 1 µs.
+    Registrar es O(1) y los percentiles tienen error relativo acotado (~1/SUB_BUCKETS).
+    """
+    __slots__ = ("_counts", "count")
+
+    SUB_BUCKETS = 16
+    _LOG_BASE = math.log(2) / SUB_BUCKETS
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+
+    def record(self, seconds: float):
+        micros = max(seconds * 1_000_000, 1.0)
+        index = int(math.log(micros) / self._LOG_BASE)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+
+    def percentile(self, pct: float) -> float:
+        """Límite superior (segundos) de la cubeta que contiene el percentil"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                return math.exp((index + 1) * self._LOG_BASE) / 1_000_000
+        return 0.0
+
+
+class QueryStats:
+    __slots__ = ("fingerprint", "statement", "tables", "count", "slow_count", "total", "max",
+                 "histogram", "last_seen", "explain_sample", "explain_plan")
+
+    def __init__(self, fp: str, statement: str, tables: Set[str]):
+        self.fingerprint = fp
+        self.statement = statement
+        self.tables = tables
+        self.count = 0
+        self.slow_count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = LatencyHistogram()
+        self.last_seen = 0.0
+        self.explain_sample: Optional[tuple] = None   # (sentencia, parámetros) pendiente de EXPLAIN
+        self.explain_plan: Optional[List[str]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "statement": self.statement,
+            "tables": sorted(self.tables),
+            "count": self.count,
+            "slow_count": self.slow_count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.histogram.percentile(50) * 1000, 3),
+            "p95_ms": round(self.histogram.percentile(95) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "explain": self.explain_plan,
+        }
+
+
+class QueryProfiler:
+    """Agregador acotado de consultas por huella, con índice por dominio (prefijo de tabla)"""
+
+    def __init__(self, slow_threshold: float = 0.1, max_fingerprints: int = 1000,
+                 explain_sample_rate: float = 0.1, max_statement_length: int = 2000):
+        self.slow_threshold = slow_threshold
+        self.max_fingerprints = max_fingerprints
+        self.explain_sample_rate = explain_sample_rate
+        self.max_statement_length = max_statement_length
+        self._lock = threading.Lock()
+        self._stats: "OrderedDict[str, QueryStats]" = OrderedDict()
+        self._by_domain: Dict[str, Set[str]] = {}
+        # sentencia cruda -> (huella, normalizada, tablas): evita normalizar con regex en cada ejecución
+        self._fingerprints: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _fingerprint(self, statement: str) -> tuple:
+        cached = self._fingerprints.get(statement)
+        if cached is not None:
+            return cached
+        normalized = normalize_statement(statement)
+        tables = {t.split(".")[-1].lower() for t in _TABLES.findall(normalized)}
+        cached = (fingerprint(normalized), normalized[:self.max_statement_length], tables)
+        self._fingerprints[statement] = cached
+        if len(self._fingerprints) > self.max_fingerprints * 4:
+            self._fingerprints.popitem(last=False)
+        return cached
+
+    def record(self, statement: str, parameters: Any, duration: float):
+        if statement.lstrip()[:7].upper() == "EXPLAIN":
+            return
+        with self._lock:
+            fp, normalized, tables = self._fingerprint(statement)
+            stats = self._stats.get(fp)
+            if stats is None:
+                stats = self._stats[fp] = QueryStats(fp, normalized, tables)
+                for table in tables:
+                    if "_" in table:
+                        self._by_domain.setdefault(table[:table.index("_") + 1], set()).add(fp)
+                if len(self._stats) > self.max_fingerprints:
+                    self._evict()
+            else:
+                self._stats.move_to_end(fp)
+
+            stats.count += 1
+            stats.total += duration
+            stats.max = max(stats.max, duration)
+            stats.histogram.record(duration)
+            stats.last_seen = time.time()
+            slow = duration > self.slow_threshold
+            if slow:
+                stats.slow_count += 1
+                if (stats.explain_plan is None and stats.explain_sample is None
+                        and random.random() < self.explain_sample_rate):
+                    stats.explain_sample = (statement, parameters)
+
+        if slow:
+            logger.warning(f"Consulta lenta ({duration:.3f}s) [{fp}]: {normalized[:100]}...")
+
+    def _evict(self):
+        fp, stats = self._stats.popitem(last=False)
+        for table in stats.tables:
+            if "_" in table:
+                self._by_domain.get(table[:table.index("_") + 1], set()).discard(fp)
+
+    def explain_pending(self, connection: Connection, limit: int = 5) -> int:
+        """Ejecuta EXPLAIN de las muestras pendientes (fuera del evento, en otra conexión)"""
+        with self._lock:
+            pending = [s for s in self._stats.values() if s.explain_sample is not None][:limit]
+        prefix = "EXPLAIN QUERY PLAN " if connection.dialect.name == "sqlite" else "EXPLAIN "
+        done = 0
+        for stats in pending:
+            statement, parameters = stats.explain_sample
+            try:
+                rows = connection.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+                stats.explain_plan = [" ".join(str(col) for col in row) for row in rows]
+                done += 1
+            except Exception as e:
+                stats.explain_plan = [f"EXPLAIN no disponible: {e}"]
+            stats.explain_sample = None
+        return done
+
+    def get(self, fp: str) -> Optional[QueryStats]:
+        return self._stats.get(fp)
+
+    def for_domain(self, domain_prefix: str) -> List[QueryStats]:
+        with self._lock:
+            return [self._stats[fp] for fp in self._by_domain.get(domain_prefix, ()) if fp in self._stats]
+
+    def top(self, limit: int = 20, by: str = "total") -> List[Dict[str, Any]]:
+        with self._lock:
+            ranked = sorted(self._stats.values(), key=lambda s: getattr(s, by), reverse=True)[:limit]
+            return [stats.to_dict() for stats in ranked]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._by_domain.clear()
+            self._fingerprints.clear()
+
+
+query_profiler = QueryProfiler()
+
 
 @event.listens_for(Engine, "before_cursor_execute")
 def receive_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
     """Marca el tiempo de inicio de la consulta."""
-    context._query_start_time = time.time()
+    context._query_start_time = time.perf_counter()
 
 @event.listens_for(Engine, "after_cursor_execute")
 def receive_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
-    """Calcula duración y registra si la consulta es lenta."""
-    total = time.time() - context._query_start_time
-    if total > 0.1:  # Log consultas que toman más de 100ms
-        query_info = {
-            "duration": total,
-            "statement": statement,
-            "parameters": parameters,
-        }
-        slow_queries.append(query_info)
-        logger.warning(f"Consulta lenta ({total:.3f}s): {statement[:100]}...")
+    """Acumula la duración en la huella de la consulta."""
+    query_profiler.record(statement, parameters, time.perf_counter() - context._query_start_time)
 
 # Función para analizar consultas específicas del dominio Academia Idiomas
-def analyze_domain_queries(domain_prefix: str = "lang_"):
+def analyze_domain_queries(domain_prefix: str = "lang_") -> List[Dict[str, Any]]:
     """
-    Analiza las consultas lentas relacionadas con el dominio Academia Idiomas.
-    Filtra por entidad principal 'curso', niveles o grupos de cursos.
+    Consultas lentas del dominio Academia Idiomas (tablas con el prefijo) que tocan
+    cursos, niveles o grupos. Usa el índice por dominio: no recorre todas las consultas.
     """
-    domain_slow_queries = []
     focus_keywords = ["curso", "nivel", "grupo"]
-
-    for q in slow_queries:
-        if domain_prefix in q["statement"].lower():
-            # Si la consulta toca cursos, niveles o grupos → la marcamos
-            if any(keyword in q["statement"].lower() for keyword in focus_keywords):
-                domain_slow_queries.append(q)
-
-    return domain_slow_queries
+    domain_slow_queries = [
+        stats for stats in query_profiler.for_domain(domain_prefix)
+        if stats.slow_count and any(keyword in table for table in stats.tables for keyword in focus_keywords)
+    ]
+    domain_slow_queries.sort(key=lambda stats: stats.histogram.percentile(95), reverse=True)
+    return [stats.to_dict() for stats in domain_slow_queries]
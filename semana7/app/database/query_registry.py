@@ -0,0 +1,104 @@
+# app/database/query_registry.py
+import threading
+from typing import Any, Dict, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.sql.selectable import TextualSelect
+
+from app.database.optimized_queries import DomainOptimizedQueries
+
+
+class CompiledQuery:
+    """Consulta del dominio compilada una vez, con sus contadores de ejecución"""
+
+    __slots__ = ("name", "statement", "params", "calls", "errors", "rows", "total_seconds", "max_seconds")
+
+    def __init__(self, name: str, statement: TextualSelect):
+        self.name = name
+        self.statement = statement
+        self.params = tuple(statement.compile().params)
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "avg_ms": round(self.total_seconds / self.calls * 1000, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+        }
+
+
+class QueryRegistry:
+    """
+    Registro de las consultas de DomainOptimizedQueries para un dominio.
+    - Cada SQL se envuelve en text() una sola vez, con bindparams tipados: el mismo objeto
+      se reutiliza en cada request, así SQLAlchemy cachea su compilación.
+    - Con asyncpg las sentencias quedan preparadas en el servidor (cache por conexión,
+      ver DB_PREPARED_CACHE_SIZE en get_db.py); otros drivers ejecutan el SQL compilado.
+    - Cuenta ejecuciones, errores, filas y tiempos por consulta.
+    """
+
+    def __init__(self, domain_prefix: str):
+        self.domain_prefix = domain_prefix
+        self._queries: Dict[str, CompiledQuery] = {}
+        self.keyset_columns = DomainOptimizedQueries.get_keyset_columns(domain_prefix)
+        # Tipo del bind `:cursor_<columna>` de cada columna de la clave (valida los cursores)
+        types = DomainOptimizedQueries.get_param_types(domain_prefix)
+        self.keyset_types = {
+            name: tuple(types[f"cursor_{column}"] for column in columns)
+            for name, columns in self.keyset_columns.items()
+        }
+        self._lock = threading.Lock()
+
+    def compile(self) -> "QueryRegistry":
+        types = DomainOptimizedQueries.get_param_types(self.domain_prefix)
+        column_types = DomainOptimizedQueries.get_column_types(self.domain_prefix)
+        queries = {}
+        for name, sql in DomainOptimizedQueries.get_queries_for_domain(self.domain_prefix).items():
+            statement = text(sql)
+            params = statement.compile().params
+            statement = statement.bindparams(
+                *(bindparam(param, type_=types[param]) for param in params if param in types)
+            ).columns(**column_types)   # las fechas vuelven como datetime con cualquier driver
+            queries[name] = CompiledQuery(name, statement)
+        self._queries = queries
+        return self
+
+    def get(self, query_name: str) -> CompiledQuery:
+        if not self._queries:
+            self.compile()
+        query = self._queries.get(query_name)
+        if query is None:
+            raise ValueError(f"Query {query_name} no encontrada para dominio {self.domain_prefix}")
+        return query
+
+    def record(self, query: CompiledQuery, seconds: float, rows: int = 0, error: bool = False):
+        with self._lock:
+            query.calls += 1
+            query.rows += rows
+            query.total_seconds += seconds
+            query.max_seconds = max(query.max_seconds, seconds)
+            if error:
+                query.errors += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: query.get_stats() for name, query in self._queries.items()}
+
+
+_registries: Dict[str, QueryRegistry] = {}
+
+
+def get_query_registry(domain_prefix: str) -> QueryRegistry:
+    """Registro único por dominio (se compila al arrancar o en el primer uso)"""
+    if domain_prefix not in _registries:
+        _registries[domain_prefix] = QueryRegistry(domain_prefix)
+    return _registries[domain_prefix]
+
+
+def find_query_registry(domain_prefix: str) -> Optional[QueryRegistry]:
+    return _registries.get(domain_prefix)
@@ -1,33 +1,82 @@
 # app/main.py
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-import redis
+
+from .cache.redis_config import close_redis_pools, async_cache_manager
+from .cache.domain_strategies import DomainSpecificCaching
+from .cache.warmer import cache_refresh_scheduler
+from .cache.metrics import cache_metrics
+from .database.get_db import async_engine
+from .database.query_registry import get_query_registry
+from monitoring.metrics import register_cache_metrics
 
 # Middlewares
 from .middleware.domain_rate_limiter import DomainRateLimiter
 from .middleware.domain_logger import DomainLogger
 from .middleware.domain_validator import DomainValidator
+from .middleware.rate_limit_stats import get_rate_limit_stats
 
 # Routers
-from .routers import optimized_domain_routes
+from .routers import optimized_domain_routes, Academia_Idiomas_optimized, middleware_monitoring
 
 # Dominio: Academia Idiomas
 DOMAIN_PREFIX = "lang_"  # Prefijo definido para este dominio
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compila una vez las consultas optimizadas del dominio (bindparams tipados)
+    get_query_registry(DOMAIN_PREFIX).compile()
+    # Escucha invalidaciones publicadas por otros workers para limpiar el cache L1
+    invalidation_listener = asyncio.create_task(async_cache_manager.listen_invalidations())
+    # Vuelca a Redis por lotes los contadores del cache (en vez de INCR por acceso)
+    metrics_flusher = asyncio.create_task(cache_metrics.run_flusher(
+        lambda: async_cache_manager.redis_client,
+        interval=float(os.getenv('CACHE_METRICS_FLUSH_INTERVAL', 10))
+    ))
+    # Resumen de rate limiting (top de clientes y contadores por categoría), también por lotes
+    rate_limit_flusher = asyncio.create_task(get_rate_limit_stats(DOMAIN_PREFIX).run_flusher(
+        lambda: async_cache_manager.redis_client,
+        interval=float(os.getenv('RATE_LIMIT_STATS_FLUSH_INTERVAL', 5))
+    ))
+    # Precarga en un solo lote las estrategias de cache del dominio
+    try:
+        await DomainSpecificCaching.implement_domain_cache(DOMAIN_PREFIX)
+    except Exception as e:
+        print(f"Error precargando cache del dominio: {e}")
+    # Refresca las estrategias antes de que expire su TTL
+    cache_refresh_scheduler.start()
+    yield
+    await cache_refresh_scheduler.stop()
+    invalidation_listener.cancel()
+    metrics_flusher.cancel()
+    rate_limit_flusher.cancel()
+    # Espera también al listener: cierra su conexión pub/sub antes de cerrar los pools
+    await asyncio.gather(invalidation_listener, metrics_flusher, rate_limit_flusher, return_exceptions=True)
+    # Libera las conexiones del pool compartido de Redis
+    await close_redis_pools()
+    # Cierra las conexiones del engine async de la base de datos
+    await async_engine.dispose()
+
 app = FastAPI(
     title=f"API Optimizada - Academia Idiomas ({DOMAIN_PREFIX.upper()})",
-    description="Microservicio optimizado para cursos, niveles y grupos en Academia de Idiomas"
+    description="Microservicio optimizado para cursos, niveles y grupos en Academia de Idiomas",
+    lifespan=lifespan
 )
 
-# Configuración de Redis (para rate limiting y caching si se requiere)
-redis_client = redis.Redis(host="localhost", port=6379, db=0)
+# Métricas del cache en el registry de Prometheus (hit ratio, bytes y latencia por prefijo/ttl_type)
+register_cache_metrics(cache_metrics, domain=DOMAIN_PREFIX.rstrip("_"))
 
 # Middleware específico del dominio (orden importa: validación → logging → rate limiting)
 app.add_middleware(DomainValidator, domain_prefix=DOMAIN_PREFIX)
 app.add_middleware(DomainLogger, domain_prefix=DOMAIN_PREFIX)
-app.add_middleware(DomainRateLimiter, domain_prefix=DOMAIN_PREFIX, redis_client=redis_client)
+app.add_middleware(DomainRateLimiter, domain_prefix=DOMAIN_PREFIX)   # usa el pool async compartido
 
 # Incluir routers optimizados del dominio
 app.include_router(optimized_domain_routes.router)
+app.include_router(Academia_Idiomas_optimized.router)
+app.include_router(middleware_monitoring.router)
 
 # Healthcheck simple
 @app.get("/health")
@@ -0,0 +1,142 @@
+# app/middleware/client_identity.py
+"""
+Identidad del cliente para el rate limiting, en orden de preferencia:
+
+1. `sub` de un JWT Bearer válido firmado con JWT_SECRET_KEY (si no está definido, se omite)
+2. API key conocida (X-API-Key), guardada como hash, nunca en claro
+3. IP real: X-Forwarded-For solo si la conexión viene de un proxy de confianza
+
+Un token inválido o una API key desconocida no dan identidad propia (se limita
+por IP), así rotar credenciales falsas no sirve para evadir el límite.
+"""
+import hashlib
+import ipaddress
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from starlette.types import Scope
+
+try:
+    from jose import JWTError, jwt
+except ImportError:  # python-jose es opcional: sin él no se identifica por JWT
+    jwt = None
+    JWTError = Exception
+
+
+class ClientIdentity(NamedTuple):
+    kind: str                 # "user", "api_key" o "ip"
+    value: str
+    tenant: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}:{self.value}"
+
+
+class IdentityResolver:
+    """Resuelve la identidad desde los headers ASGI crudos (una sola pasada)"""
+
+    def __init__(self, secret_key: Optional[str] = None, algorithm: str = "HS256",
+                 api_keys: Optional[Dict[str, str]] = None,
+                 trusted_proxies: Iterable[str] = (), tenant_claim: str = "tenant",
+                 cache_size: int = 4096):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.tenant_claim = tenant_claim
+        self.cache_size = cache_size
+        # API key -> tenant; se indexa por hash para no conservar las claves en claro
+        self._api_keys = {_digest(key): tenant for key, tenant in (api_keys or {}).items()}
+        self._trusted = [ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies]
+        # token -> (identidad o None si es inválido, vencimiento): evita decodificar en cada request
+        self._tokens: "OrderedDict[bytes, Tuple[Optional[ClientIdentity], float]]" = OrderedDict()
+
+    def resolve(self, scope: Scope) -> ClientIdentity:
+        authorization = api_key = forwarded_for = None
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                authorization = value
+            elif name == b"x-api-key":
+                api_key = value
+            elif name == b"x-forwarded-for":
+                forwarded_for = value
+
+        if authorization is not None and authorization[:7].lower() == b"bearer ":
+            identity = self._from_token(authorization[7:].strip())
+            if identity is not None:
+                return identity
+        if api_key is not None:
+            digest = _digest(api_key.decode("latin-1"))
+            if digest in self._api_keys:
+                return ClientIdentity("api_key", digest[:16], self._api_keys[digest])
+        return ClientIdentity("ip", self._client_ip(scope, forwarded_for))
+
+    def _from_token(self, token: bytes) -> Optional[ClientIdentity]:
+        if jwt is None or not self.secret_key:
+            return None
+        now = time.time()
+        cached = self._tokens.get(token)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
+        try:
+            payload = jwt.decode(token.decode("latin-1"), self.secret_key, algorithms=[self.algorithm])
+        except JWTError:
+            payload = None
+        identity, expires_at = None, now + 60   # los inválidos se recuerdan un minuto
+        if payload and payload.get("sub"):
+            tenant = payload.get(self.tenant_claim)
+            identity = ClientIdentity("user", str(payload["sub"]), str(tenant) if tenant else None)
+            expires_at = float(payload.get("exp", now + 60))
+
+        self._tokens[token] = (identity, expires_at)
+        if len(self._tokens) > self.cache_size:
+            self._tokens.popitem(last=False)
+        return identity
+
+    def _is_trusted(self, host: str) -> bool:
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self._trusted)
+
+    def _client_ip(self, scope: Scope, forwarded_for: Optional[bytes]) -> str:
+        peer = scope["client"][0] if scope.get("client") else "unknown"
+        if forwarded_for is None or not self._trusted or not self._is_trusted(peer):
+            return peer
+        # De derecha a izquierda: la primera IP que no es de un proxy propio es el cliente
+        hops = [hop.strip() for hop in forwarded_for.decode("latin-1").split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not self._is_trusted(hop):
+                return hop
+        return hops[0] if hops else peer
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def _parse_pairs(raw: str) -> Dict[str, str]:
+    """"clave:tenant,clave2:tenant2" -> dict"""
+    pairs = {}
+    for item in raw.split(","):
+        key, _, tenant = item.strip().partition(":")
+        if key:
+            pairs[key] = tenant or "default"
+    return pairs
+
+
+def build_identity_resolver() -> IdentityResolver:
+    """Configuración por entorno; sin JWT_SECRET_KEY no se identifica por JWT"""
+    secret_key = os.getenv('JWT_SECRET_KEY')
+    if not secret_key:
+        print("JWT_SECRET_KEY no definido: rate limiting sin identidad JWT (API key o IP)")
+    return IdentityResolver(
+        secret_key=secret_key,
+        algorithm=os.getenv('JWT_ALGORITHM', "HS256"),
+        api_keys=_parse_pairs(os.getenv('RATE_LIMIT_API_KEYS', "")),
+        trusted_proxies=[p.strip() for p in os.getenv('RATE_LIMIT_TRUSTED_PROXIES', "").split(",") if p.strip()],
+        tenant_claim=os.getenv('JWT_TENANT_CLAIM', "tenant"),
+    )
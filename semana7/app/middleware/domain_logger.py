@@ -1,34 +1,36 @@
 import os
 import logging
-import json
+import random
 import time
 from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Dict, Any, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Dict, Any, Optional, Tuple
+from .route_classifier import get_route_classifier
+from .log_pipeline import get_log_pipeline
 
-class DomainLogger(BaseHTTPMiddleware):
-    def __init__(self, app, domain_prefix: str):
-        super().__init__(app)
-        self.domain_prefix = domain_prefix
+class DomainLogger:
+    """Middleware ASGI puro: registra inicio y fin de las requests del dominio"""
 
-        # Asegurar carpeta de logs
-        os.makedirs("logs", exist_ok=True)
+    def __init__(self, app: ASGIApp, domain_prefix: str, info_sample_rate: Optional[float] = None):
+        self.app = app
+        self.domain_prefix = domain_prefix
+        self.path_prefix = f"/{domain_prefix.rstrip('_')}"
 
-        # Configurar logger específico para el dominio
-        self.logger = logging.getLogger(f"{domain_prefix}domain_logger")
-        self.logger.setLevel(logging.INFO)
+        # Logger del dominio sobre una cola acotada: el request solo encola,
+        # un thread escribe en lotes (JSON por línea, rotación en logs/{prefix}domain.log)
+        self.log_pipeline = get_log_pipeline(domain_prefix)
+        self.logger = self.log_pipeline.logger
 
-        # Evitar múltiples handlers
-        if not self.logger.handlers:
-            handler = logging.FileHandler(f"logs/{domain_prefix}domain.log")
-            formatter = logging.Formatter(
-                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-            )
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
+        # Fracción de requests registradas en endpoints INFO (los errores siempre se registran).
+        # Por defecto 1.0 (se registran todas); bajar LOG_INFO_SAMPLE_RATE para muestrear
+        if info_sample_rate is None:
+            info_sample_rate = float(os.getenv('LOG_INFO_SAMPLE_RATE', 1.0))
+        self.info_sample_rate = info_sample_rate
 
         # Configurar qué endpoints loggear por dominio
         self.logged_endpoints = self._get_logged_endpoints(domain_prefix)
+        self.routes = get_route_classifier(domain_prefix)
+        self.routes.register("log_level", self.logged_endpoints.items())
 
     def _get_logged_endpoints(self, domain_prefix: str) -> Dict[str, str]:
         """Define qué endpoints requieren logging específico por dominio"""
@@ -73,12 +75,12 @@ class DomainLogger(BaseHTTPMiddleware):
             "/admin": "WARNING"
         })
 
-    def _should_log_endpoint(self, path: str) -> Tuple[bool, str]:
+    def _should_log_endpoint(self, path: str, method: str = "GET") -> Tuple[bool, str]:
         """Determina si el endpoint debe ser loggeado y su nivel"""
-        for endpoint_pattern, level in self.logged_endpoints.items():
-            if endpoint_pattern in path:
-                return True, level
-        return False, "INFO"
+        level = self.routes.classify(path, method)["log_level"]
+        if level is None:
+            return False, "INFO"
+        return True, level
 
     def _extract_domain_specific_data(self, request: Request, path: str) -> Dict[str, Any]:
         """Extrae datos específicos del dominio para logging"""
@@ -100,42 +102,54 @@ class DomainLogger(BaseHTTPMiddleware):
 
         return data
 
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        path = request.url.path
-
-        if not path.startswith(f"/{self.domain_prefix.rstrip('_')}"):
-            return await call_next(request)
-
-        should_log, log_level = self._should_log_endpoint(path)
+    def _request_data(self, scope: Scope, path: str, log_level: str) -> Dict[str, Any]:
+        request_data = self._extract_domain_specific_data(Request(scope), path)
+        if log_level == "INFO":
+            request_data["sample_rate"] = self.info_sample_rate
+        return request_data
 
-        if should_log:
-            request_data = self._extract_domain_specific_data(request, path)
-            self.logger.log(
-                getattr(logging, log_level),
-                f"REQUEST_START: {json.dumps(request_data)}"
-            )
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            return await self.app(scope, receive, send)
 
-        response = await call_next(request)
+        path = scope["path"]
+        should_log, log_level = self._should_log_endpoint(path, scope["method"])
+        if not should_log:
+            return await self.app(scope, receive, send)
 
-        if should_log:
-            process_time = time.time() - start_time
-            response_data = {
-                **request_data,
-                "status_code": response.status_code,
-                "process_time": round(process_time, 3)
-            }
-
-            if response.status_code >= 500:
+        start_time = time.time()
+        # Muestreo de endpoints INFO de alto volumen: se decide antes de armar los datos,
+        # así las requests descartadas no construyen Request ni el dict
+        sampled = log_level != "INFO" or random.random() < self.info_sample_rate
+        request_data = None
+        if sampled:
+            request_data = self._request_data(scope, path, log_level)
+            self.logger.log(getattr(logging, log_level), {"event": "REQUEST_START", **request_data})
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if status_code >= 500:
                 response_level = "CRITICAL"
-            elif response.status_code >= 400:
+            elif status_code >= 400:
                 response_level = "WARNING"
             else:
                 response_level = log_level
 
-            self.logger.log(
-                getattr(logging, response_level),
-                f"REQUEST_END: {json.dumps(response_data)}"
-            )
-
-        return response
+            if sampled or status_code >= 400:
+                if request_data is None:   # error en una request no muestreada
+                    request_data = self._request_data(scope, path, log_level)
+                self.logger.log(getattr(logging, response_level), {
+                    "event": "REQUEST_END",
+                    **request_data,
+                    "status_code": status_code,
+                    "process_time": round(time.time() - start_time, 3)
+                })
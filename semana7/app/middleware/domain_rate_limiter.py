@@ -1,18 +1,72 @@
 # app/middleware/domain_rate_limiter.py
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+import itertools
+import math
 import redis
-import time
-from typing import Dict
-
-class DomainRateLimiter(BaseHTTPMiddleware):
-    def __init__(self, app, domain_prefix: str, redis_client: redis.Redis):
-        super().__init__(app)
+import redis.asyncio
+import uuid
+from typing import Dict, List, Optional, Tuple
+from ..cache.redis_config import get_async_pool
+from ..cache.circuit_breaker import CircuitBreaker, CircuitOpenError, redis_breaker
+from .rate_limit_algorithms import ALGORITHMS, DEFAULT_ALGORITHM
+from .route_classifier import get_route_classifier
+from .local_limiter import InMemoryRateLimiter, LocalQuotaReserver, build_local_quota_reserver
+from .rate_limit_stats import get_rate_limit_stats
+from .client_identity import ClientIdentity, IdentityResolver, build_identity_resolver
+
+class DomainRateLimiter:
+    """
+    Middleware ASGI puro de rate limiting por categoría de endpoint e identidad.
+    Límites jerárquicos: la cuota del usuario por categoría, luego la del tenant y
+    luego la global del dominio; la request pasa solo si los tres niveles la admiten.
+    """
+
+    def __init__(self, app: ASGIApp, domain_prefix: str, redis_client: Optional[redis.asyncio.Redis] = None,
+                 local_reserver: Optional[LocalQuotaReserver] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 identity_resolver: Optional[IdentityResolver] = None):
+        self.app = app
         self.domain_prefix = domain_prefix
-        self.redis = redis_client
+        self.path_prefix = f"/{domain_prefix.rstrip('_')}"
+        self._redis = redis_client   # por defecto, el pool async compartido
+        # Modo híbrido: cuota reservada por porciones y consumida en memoria
+        self.local_reserver = local_reserver or build_local_quota_reserver()
+        # Fail-open: si Redis falla o el circuito está abierto, se limita en memoria.
+        # Con un cliente propio, breaker propio: sus fallos no afectan al del proceso
+        if breaker is None:
+            breaker = redis_breaker if redis_client is None else CircuitBreaker(f"redis:{domain_prefix}")
+        self.breaker = breaker
+        self.fallback = InMemoryRateLimiter()
+        # Identidad: sub del JWT, API key o IP real detrás de proxies de confianza
+        self.identities = identity_resolver or build_identity_resolver()
+        # Cuotas agregadas (tenant y global): siempre por porciones, son claves muy concurridas
+        self.aggregate_reserver = build_local_quota_reserver() or LocalQuotaReserver(error_ratio=0)
 
         # Configuración específica por dominio
         self.rate_limits = self._get_domain_rate_limits(domain_prefix)
+        self.quotas = self._get_domain_quotas(domain_prefix)
+        self.routes = get_route_classifier(domain_prefix)
+        self.routes.register(
+            "rate_category", self._get_rate_limit_categories(domain_prefix), default="general"
+        )
+        # Resumen incremental (top de clientes y contadores) para el endpoint de monitoreo
+        self.stats = get_rate_limit_stats(domain_prefix)
+        self.stats.categories = {
+            category: config.get("algorithm", DEFAULT_ALGORITHM)
+            for category, config in self.rate_limits.items()
+        }
+
+        # Miembros únicos en el sorted set: id del worker + secuencia local
+        self._worker_id = uuid.uuid4().hex[:8]
+        self._sequence = itertools.count()
+        self._scripts = {}   # script Lua registrado por algoritmo
+
+    @property
+    def redis(self) -> redis.asyncio.Redis:
+        if self._redis is not None:
+            return self._redis
+        return redis.asyncio.Redis(connection_pool=get_async_pool())
 
     def _get_domain_rate_limits(self, domain_prefix: str) -> Dict[str, Dict]:
         """Configuración de límites específicos por dominio"""
@@ -20,11 +74,12 @@ class DomainRateLimiter(BaseHTTPMiddleware):
         rate_configs = {
             "lang_": {
                 # Academia Idiomas: más tráfico en niveles y grupos
-                "courses": {"requests": 120, "window": 60},    # 120 req/min cursos
-                "levels": {"requests": 200, "window": 60},     # 200 req/min niveles
-                "groups": {"requests": 180, "window": 60},     # 180 req/min grupos
-                "general": {"requests": 150, "window": 60},    # general
-                "admin": {"requests": 50, "window": 60}        # admin
+                # algorithm: sliding_window (exacto), token_bucket o gcra (estado O(1) por cliente)
+                "courses": {"requests": 120, "window": 60, "algorithm": "gcra", "burst": 20},          # 120 req/min cursos
+                "levels": {"requests": 200, "window": 60, "algorithm": "token_bucket", "burst": 40},   # 200 req/min niveles
+                "groups": {"requests": 180, "window": 60, "algorithm": "token_bucket", "burst": 30},   # 180 req/min grupos
+                "general": {"requests": 150, "window": 60, "algorithm": "gcra", "burst": 30},          # general
+                "admin": {"requests": 50, "window": 60, "algorithm": "sliding_window"}                 # admin (conteo exacto)
             },
             "vet_": { ... },   # tu config original
             "edu_": { ... },   # tu config original
@@ -42,62 +97,119 @@ class DomainRateLimiter(BaseHTTPMiddleware):
 
         return rate_configs.get(domain_prefix, default_config)
 
+    def _get_domain_quotas(self, domain_prefix: str) -> Dict[str, Dict]:
+        """Cuotas de los niveles superiores: global del dominio y por tenant (GCRA)"""
+        quota_configs = {
+            "lang_": {
+                "global": {"requests": 6000, "window": 60, "algorithm": "gcra", "burst": 600},
+                "tenants": {
+                    "default": {"requests": 1500, "window": 60, "algorithm": "gcra", "burst": 150},
+                    # Cuotas propias por tenant, p. ej. una sede con más alumnos:
+                    # "sede_centro": {"requests": 3000, "window": 60, "algorithm": "gcra", "burst": 300},
+                },
+            },
+        }
+        return quota_configs.get(domain_prefix, {"global": None, "tenants": {}})
+
+    def _get_rate_limit_categories(self, domain_prefix: str) -> List[Tuple[str, str]]:
+        """Fragmentos de ruta -> categoría de rate limit (gana el primero que coincide)"""
+        categories = {
+            "lang_": [
+                ("/cursos", "courses"),
+                ("/niveles", "levels"),
+                ("/grupos", "groups"),
+                ("/admin", "admin"),
+            ],
+            # Reutiliza tus otras configuraciones (vet_, edu_, gym_, pharma_) aquí
+        }
+        return categories.get(domain_prefix, [])
+
     def _get_rate_limit_category(self, path: str, method: str) -> str:
         """Determina la categoría de rate limit según el endpoint"""
+        return self.routes.classify(path, method)["rate_category"]
 
-        if self.domain_prefix == "lang_":
-            if "/cursos" in path:
-                return "courses"
-            elif "/niveles" in path:
-                return "levels"
-            elif "/grupos" in path:
-                return "groups"
-            elif "/admin" in path:
-                return "admin"
-
-        # Reutiliza tus otras configuraciones (vet_, edu_, gym_, pharma_) aquí
-        # ...
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        path = scope.get("path", "")
 
-        return "general"
+        # Solo aplica a requests HTTP de este dominio
+        if scope["type"] != "http" or not path.startswith(self.path_prefix):
+            return await self.app(scope, receive, send)
 
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
-        path = request.url.path
-        method = request.method
+        identity = self.identities.resolve(scope)
+        category = self._get_rate_limit_category(path, scope["method"])
 
-        # Solo aplica a este dominio
-        if not path.startswith(f"/{self.domain_prefix.rstrip('_')}"):
-            return await call_next(request)
-
-        category = self._get_rate_limit_category(path, method)
-        rate_config = self.rate_limits.get(category, self.rate_limits["general"])
-
-        if not self._check_rate_limit(client_ip, category, rate_config):
-            raise HTTPException(
+        allowed, retry_after, level, limit_config = await self._check_limits(identity, category)
+        self.stats.record(category, identity.key, allowed)
+        if not allowed:
+            response = JSONResponse(
                 status_code=429,
-                detail={
+                content={"detail": {
                     "error": "Rate limit exceeded",
                     "category": category,
-                    "limit": rate_config["requests"],
-                    "window": rate_config["window"],
+                    "level": level,
+                    "limit": limit_config["requests"],
+                    "window": limit_config["window"],
                     "domain": self.domain_prefix
-                }
+                }},
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
             )
-
-        return await call_next(request)
-
-    def _check_rate_limit(self, client_ip: str, category: str, config: Dict) -> bool:
-        current_time = int(time.time())
-        window_start = current_time - config["window"]
-
-        key = f"{self.domain_prefix}:rate_limit:{category}:{client_ip}"
-
-        requests = self.redis.zrangebyscore(key, window_start, current_time)
-        if len(requests) >= config["requests"]:
-            return False
-
-        self.redis.zadd(key, {str(current_time): current_time})
-        self.redis.expire(key, config["window"])
-        self.redis.zremrangebyscore(key, 0, window_start)
-
-        return True
+            return await response(scope, receive, send)
+
+        await self.app(scope, receive, send)
+
+    def _limit_levels(self, identity: ClientIdentity, category: str) -> List[Tuple[str, str, Dict]]:
+        """
+        (nivel, clave, config) de usuario a global. La parte entre llaves es el hash tag de
+        Redis Cluster: cada script usa una sola clave y las de una identidad van al mismo slot.
+        """
+        prefix = f"{self.domain_prefix}:rate_limit"
+        levels = [("user", f"{prefix}:{category}:{{{identity.key}}}",
+                   self.rate_limits.get(category, self.rate_limits["general"]))]
+        tenants = self.quotas.get("tenants", {})
+        if identity.tenant is not None and tenants:
+            levels.append(("tenant", f"{prefix}:tenant:{{tenant:{identity.tenant}}}",
+                           tenants.get(identity.tenant, tenants.get("default"))))
+        if self.quotas.get("global"):
+            levels.append(("global", f"{prefix}:global:{{global}}", self.quotas["global"]))
+        return [level for level in levels if level[2]]
+
+    async def _check_limits(self, identity: ClientIdentity, category: str) -> Tuple[bool, float, str, Dict]:
+        """Recorre los niveles en orden; el primero que rechaza decide (permitido, espera, nivel, config)"""
+        for level, key, config in self._limit_levels(identity, category):
+            reserver = self.local_reserver if level == "user" else self.aggregate_reserver
+            allowed, retry_after = await self._check_rate_limit(key, config, reserver)
+            if not allowed:
+                return False, retry_after, level, config
+        return True, 0.0, "", {}
+
+    async def _check_rate_limit(self, key: str, config: Dict,
+                                reserver: Optional[LocalQuotaReserver] = None) -> Tuple[bool, float]:
+        """Decide con la cuota local si alcanza; si no, un solo EVALSHA; retorna (permitido, segundos de espera)"""
+        algorithm = ALGORITHMS[config.get("algorithm", DEFAULT_ALGORITHM)]
+
+        units = 1
+        if reserver is not None and algorithm.supports_reservation:
+            decision = reserver.try_consume(key)
+            if decision is not None:
+                return decision
+            units = reserver.slice_size(config)
+
+        client = self.redis
+        script = self._scripts.get(algorithm.name)
+        if script is None:
+            script = self._scripts[algorithm.name] = client.register_script(algorithm.script)
+
+        member = f"{self._worker_id}:{next(self._sequence)}"
+        try:
+            result = await self.breaker.call(
+                script(keys=[key], args=algorithm.args(config, member, units), client=client)
+            )
+        except CircuitOpenError:
+            return self.fallback.check(key, config)
+        except Exception as e:
+            print(f"Error en rate limiting (se usa el límite en memoria): {e}")
+            return self.fallback.check(key, config)
+        granted, _, retry_after = algorithm.parse(result)
+        if units > 1:
+            reserver.store(key, granted, retry_after)
+        return granted > 0, retry_after
@@ -0,0 +1,116 @@
+# app/middleware/local_limiter.py
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class LocalQuotaReserver:
+    """
+    Pre-limitador en memoria del worker (modo híbrido del rate limiter).
+    - Reserva en Redis porciones de cuota (token_bucket/gcra) y las consume localmente,
+      así la mayoría de las requests no hacen round trip.
+    - Las porciones vencen a los `lease_seconds`; lo no usado se pierde, nunca se admite
+      de más: el error queda acotado a `error_ratio` del límite por worker (siempre hacia abajo).
+    - Si Redis niega la cuota, el rechazo se cachea hasta el tiempo de espera indicado.
+    """
+
+    def __init__(self, error_ratio: float = 0.05, lease_seconds: float = 1.0,
+                 max_clients: int = 10000):
+        self.error_ratio = error_ratio
+        self.lease_seconds = lease_seconds
+        self.max_clients = max_clients
+        # clave -> [unidades disponibles, vencimiento (monotonic), rechazado hasta]
+        self._slices: "OrderedDict[str, list]" = OrderedDict()
+
+        self.local_allowed = 0
+        self.local_denied = 0
+        self.reservations = 0
+
+    def slice_size(self, config: Dict) -> int:
+        """Unidades a reservar por llamada: error_ratio del límite, sin superar la ráfaga"""
+        size = int(config["requests"] * self.error_ratio)
+        return max(1, min(size, config.get("burst", config["requests"])))
+
+    def try_consume(self, key: str) -> Optional[Tuple[bool, float]]:
+        """Decide localmente si hay porción vigente o rechazo cacheado; None = ir a Redis"""
+        state = self._slices.get(key)
+        if state is None:
+            return None
+        now = time.monotonic()
+        available, expires_at, denied_until = state
+        if denied_until > now:
+            self.local_denied += 1
+            return False, denied_until - now
+        if available > 0 and expires_at > now:
+            state[0] -= 1
+            self._slices.move_to_end(key)
+            self.local_allowed += 1
+            return True, 0.0
+        return None
+
+    def store(self, key: str, granted: int, retry_after: float):
+        """Guarda lo concedido por Redis (una unidad ya se usó en la request actual)"""
+        self.reservations += 1
+        now = time.monotonic()
+        if granted > 0:
+            self._slices[key] = [granted - 1, now + self.lease_seconds, 0.0]
+        else:
+            self._slices[key] = [0, now, now + retry_after]
+        self._slices.move_to_end(key)
+        while len(self._slices) > self.max_clients:
+            self._slices.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        decisions = self.local_allowed + self.local_denied + self.reservations
+        return {
+            "error_ratio": self.error_ratio,
+            "lease_seconds": self.lease_seconds,
+            "clients": len(self._slices),
+            "local_allowed": self.local_allowed,
+            "local_denied": self.local_denied,
+            "redis_reservations": self.reservations,
+            "local_ratio": round(1 - self.reservations / decisions, 3) if decisions else 0.0,
+        }
+
+
+class InMemoryRateLimiter:
+    """
+    Limiter de respaldo cuando Redis no está disponible (circuito abierto).
+    Token bucket por cliente en memoria del worker: el límite pasa a ser por worker,
+    pero el servicio sigue protegido sin esperar a Redis.
+    """
+
+    def __init__(self, max_clients: int = 10000):
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()   # clave -> [tokens, última recarga]
+        self.decisions = 0
+
+    def check(self, key: str, config: Dict) -> Tuple[bool, float]:
+        capacity = config.get("burst", config["requests"])
+        rate = config["requests"] / config["window"]   # tokens por segundo
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        self.decisions += 1
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = [tokens, now]
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+def build_local_quota_reserver() -> Optional[LocalQuotaReserver]:
+    """Modo híbrido del limiter (RATE_LIMIT_LOCAL_ERROR=0 lo desactiva)"""
+    error_ratio = float(os.getenv('RATE_LIMIT_LOCAL_ERROR', 0.05))
+    if error_ratio <= 0:
+        return None
+    return LocalQuotaReserver(
+        error_ratio=error_ratio,
+        lease_seconds=float(os.getenv('RATE_LIMIT_LOCAL_LEASE', 1.0)),
+        max_clients=int(os.getenv('RATE_LIMIT_LOCAL_MAX_CLIENTS', 10000)),
+    )
@@ -0,0 +1,203 @@
+# app/middleware/log_pipeline.py
+"""
+Pipeline de logging que no bloquea el event loop.
+
+request -> DroppingQueueHandler (put_nowait en cola acotada; si está llena se
+descarta y se cuenta) -> BatchingQueueListener (thread) -> BatchRotatingFileHandler
+(formatea con orjson y escribe el lote con un solo write + flush, con rotación).
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    if orjson is not None:
+        return orjson.dumps(data, default=str).decode()
+    return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class JSONLineFormatter(logging.Formatter):
+    """Una línea JSON por registro; el mensaje puede ser un dict con los datos del evento"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if isinstance(record.msg, dict):
+            data.update(record.msg)
+        else:
+            data["message"] = record.getMessage()
+        return _dumps(data)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Encola sin bloquear; si la cola está llena descarta el registro y lo cuenta"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record   # el formateo se hace en el thread del listener
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler que escribe lotes de registros con un solo write y flush"""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self._size = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+
+    def emit_batch(self, records: List[logging.LogRecord]):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        data = "\n".join(lines) + "\n"
+        with self.lock:
+            if self.maxBytes and self._size + len(data) > self.maxBytes and self._size > 0:
+                self.doRollover()
+                self._size = 0
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(data)
+            self.stream.flush()
+            self._size += len(data)
+
+    def emit(self, record: logging.LogRecord):
+        self.emit_batch([record])
+
+
+class BatchingQueueListener:
+    """
+    Thread que vacía la cola en lotes de hasta `batch_size` registros.
+    Bajo carga los registros se acumulan mientras se escribe el lote anterior,
+    así el número de writes crece mucho más lento que el de requests.
+    """
+    _STOP = object()
+
+    def __init__(self, log_queue: queue.Queue, handler: BatchRotatingFileHandler,
+                 batch_size: int = 256):
+        self.queue = log_queue
+        self.handler = handler
+        self.batch_size = batch_size
+        self.batches = 0
+        self.written = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="domain-log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is self._STOP:
+                return
+            batch = [record]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._STOP:
+                    stop = True
+                    break
+                batch.append(record)
+            self.handler.emit_batch(batch)
+            self.batches += 1
+            self.written += len(batch)
+            if stop:
+                return
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self.queue.put(self._STOP)
+        self._thread.join(timeout=5)
+        self._thread = None
+        self.handler.close()
+
+
+class DomainLogPipeline:
+    """Logger del dominio con su cola, listener y contadores"""
+
+    def __init__(self, domain_prefix: str, log_dir: str = "logs", queue_size: int = 10000,
+                 batch_size: int = 256, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        os.makedirs(log_dir, exist_ok=True)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.queue_handler = DroppingQueueHandler(self.queue)
+
+        file_handler = BatchRotatingFileHandler(
+            os.path.join(log_dir, f"{domain_prefix}domain.log"), max_bytes, backup_count
+        )
+        file_handler.setFormatter(JSONLineFormatter())
+        self.listener = BatchingQueueListener(self.queue, file_handler, batch_size)
+
+        self.logger = logging.getLogger(f"{domain_prefix}domain_logger")
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(self.queue_handler)
+        # Sin propagar: el handler del root (basicConfig) escribiría cada registro síncrono a stderr
+        self.logger.propagate = False
+        self.listener.start()
+
+    def stop(self):
+        self.logger.removeHandler(self.queue_handler)
+        self.listener.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "dropped": self.queue_handler.dropped,
+            "written": self.listener.written,
+            "batches": self.listener.batches,
+        }
+
+
+_pipelines: Dict[str, DomainLogPipeline] = {}
+
+
+def get_log_pipeline(domain_prefix: str) -> DomainLogPipeline:
+    """Un pipeline por dominio (evita handlers y threads duplicados)"""
+    if domain_prefix not in _pipelines:
+        pipeline = DomainLogPipeline(
+            domain_prefix,
+            queue_size=int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+            batch_size=int(os.getenv('LOG_BATCH_SIZE', 256)),
+            max_bytes=int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+            backup_count=int(os.getenv('LOG_BACKUP_COUNT', 5)),
+        )
+        atexit.register(pipeline.stop)   # escribe lo pendiente al apagar
+        _pipelines[domain_prefix] = pipeline
+    return _pipelines[domain_prefix]
+
+
+def find_log_pipeline(domain_prefix: str) -> Optional[DomainLogPipeline]:
+    """Pipeline ya creado del dominio (None si el logger aún no se inicializó)"""
+    return _pipelines.get(domain_prefix)
@@ -0,0 +1,124 @@
+# app/middleware/rate_limit_algorithms.py
+"""
+Algoritmos de rate limiting ejecutados como scripts Lua (un round trip atómico).
+
+- sliding_window: log exacto de requests (sorted set, crece con el tráfico del cliente)
+- token_bucket: cubeta con capacidad de ráfaga (un hash con tokens y timestamp)
+- gcra: Generic Cell Rate Algorithm (una sola clave con el "theoretical arrival time")
+
+Todos usan el reloj de Redis y devuelven {concedidas, restante, ms de espera}.
+token_bucket y gcra aceptan reservar varias unidades de una vez (ver local_limiter.py).
+"""
+from typing import Dict, List, Tuple
+
+# KEYS[1] = sorted set del cliente; ARGV = límite, ventana (ms), id único de la request
+SLIDING_WINDOW_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, limit - count - 1, 0}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, 0, tonumber(oldest[2]) + window - now}
+"""
+
+# KEYS[1] = hash {tokens, ts}; ARGV = capacidad (ráfaga), tokens repuestos por ms, unidades pedidas
+TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local want = tonumber(ARGV[3]) or 1
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local granted = math.min(want, math.floor(tokens))
+local wait = 0
+if granted >= 1 then
+    tokens = tokens - granted
+else
+    granted = 0
+    wait = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate))
+return {granted, math.floor(tokens), wait}
+"""
+
+# KEYS[1] = TAT en ms; ARGV = intervalo de emisión (ms por request), tolerancia de ráfaga (ms), unidades pedidas
+GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local want = tonumber(ARGV[3]) or 1
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+tat = math.max(tat, now)
+local granted = math.min(want, math.floor((now + tolerance - tat) / interval))
+if granted < 1 then
+    return {0, 0, math.ceil(tat + interval - tolerance - now)}
+end
+local new_tat = tat + granted * interval
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {granted, math.floor((tolerance - (new_tat - now)) / interval), 0}
+"""
+
+
+class RateLimitAlgorithm:
+    """Script Lua de un algoritmo y cómo pasarle la configuración de la categoría"""
+    name = ""
+    script = ""
+    supports_reservation = False   # si puede conceder varias unidades en una llamada
+
+    def args(self, config: Dict, member: str, units: int = 1) -> List:
+        raise NotImplementedError
+
+    @staticmethod
+    def parse(result) -> Tuple[int, int, float]:
+        """(unidades concedidas, requests restantes, segundos de espera)"""
+        granted, remaining, wait_ms = result
+        return int(granted), int(remaining), int(wait_ms) / 1000
+
+
+class SlidingWindowLog(RateLimitAlgorithm):
+    """Exacto, pero guarda una entrada por request dentro de la ventana"""
+    name = "sliding_window"
+    script = SLIDING_WINDOW_LUA
+
+    def args(self, config: Dict, member: str, units: int = 1) -> List:
+        return [config["requests"], config["window"] * 1000, member]
+
+
+class TokenBucket(RateLimitAlgorithm):
+    """Repone requests/window tokens de forma continua; `burst` es la capacidad"""
+    name = "token_bucket"
+    script = TOKEN_BUCKET_LUA
+    supports_reservation = True
+
+    def args(self, config: Dict, member: str, units: int = 1) -> List:
+        capacity = config.get("burst", config["requests"])
+        return [capacity, config["requests"] / (config["window"] * 1000), units]
+
+
+class GCRA(RateLimitAlgorithm):
+    """Espacia las requests cada window/requests; permite ráfagas de hasta `burst`"""
+    name = "gcra"
+    script = GCRA_LUA
+    supports_reservation = True
+
+    def args(self, config: Dict, member: str, units: int = 1) -> List:
+        interval = config["window"] * 1000 / config["requests"]
+        return [interval, interval * config.get("burst", config["requests"]), units]
+
+
+ALGORITHMS: Dict[str, RateLimitAlgorithm] = {
+    algorithm.name: algorithm for algorithm in (SlidingWindowLog(), TokenBucket(), GCRA())
+}
+DEFAULT_ALGORITHM = SlidingWindowLog.name
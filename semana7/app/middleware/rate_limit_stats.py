@@ -0,0 +1,124 @@
+# app/middleware/rate_limit_stats.py
+import asyncio
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+
+class RateLimitStats:
+    """
+    Resumen del rate limiting mantenido de forma incremental (sin KEYS ni ZCARD por clave).
+    Cada decisión solo suma en memoria; un flush periódico vuelca en un pipeline:
+    - top de clientes por categoría: sorted set con requests por cliente (recortado a max_tracked)
+    - contadores por categoría: hash con allowed/denied
+    Ambos por ventana de `bucket_seconds`, así el resumen refleja el tráfico reciente.
+    """
+
+    def __init__(self, domain_prefix: str, bucket_seconds: int = 300, max_tracked: int = 1000):
+        self.domain_prefix = domain_prefix
+        self.bucket_seconds = bucket_seconds
+        self.max_tracked = max_tracked
+        self.categories: Dict[str, str] = {}   # categoría -> algoritmo (lo registra el limiter)
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Counter] = {}
+        self._counters: Counter = Counter()
+
+    def record(self, category: str, client_id: str, allowed: bool):
+        with self._lock:
+            self._clients.setdefault(category, Counter())[client_id] += 1
+            self._counters[(category, "allowed" if allowed else "denied")] += 1
+
+    def _bucket(self) -> int:
+        return int(time.time() // self.bucket_seconds)
+
+    def top_key(self, category: str, bucket: int) -> str:
+        return f"{self.domain_prefix}:rate_limit_stats:{bucket}:top:{category}"
+
+    def counters_key(self, bucket: int) -> str:
+        return f"{self.domain_prefix}:rate_limit_stats:{bucket}:counters"
+
+    def _drain(self) -> Tuple[Dict[str, Counter], Counter]:
+        with self._lock:
+            clients, counters = self._clients, self._counters
+            self._clients, self._counters = {}, Counter()
+        return clients, counters
+
+    async def flush(self, redis_client) -> int:
+        """Vuelca lo acumulado en un solo pipeline; si falla se conserva para el siguiente"""
+        clients, counters = self._drain()
+        if not counters:
+            return 0
+        bucket = self._bucket()
+        ttl = self.bucket_seconds * 2
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for category, per_client in clients.items():
+                    top_key = self.top_key(category, bucket)
+                    for client_id, count in per_client.items():
+                        pipe.zincrby(top_key, count, client_id)
+                    # Solo se conservan los max_tracked clientes con más requests
+                    pipe.zremrangebyrank(top_key, 0, -(self.max_tracked + 1))
+                    pipe.expire(top_key, ttl)
+                counters_key = self.counters_key(bucket)
+                for (category, outcome), count in counters.items():
+                    pipe.hincrby(counters_key, f"{category}:{outcome}", count)
+                pipe.expire(counters_key, ttl)
+                await pipe.execute()
+            return sum(counters.values())
+        except Exception as e:
+            print(f"Error enviando resumen de rate limiting a Redis: {e}")
+            with self._lock:
+                for category, per_client in clients.items():
+                    self._clients.setdefault(category, Counter()).update(per_client)
+                self._counters.update(counters)
+            return 0
+
+    async def run_flusher(self, client_factory, interval: float = 5.0):
+        """Tarea de fondo: flush periódico y uno final al cancelarse"""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.flush(client_factory())
+        except asyncio.CancelledError:
+            await self.flush(client_factory())
+            raise
+
+    async def read_summary(self, redis_client, top_n: int = 10) -> Dict[str, Any]:
+        """Top-N por categoría y contadores de la ventana actual, en un solo pipeline"""
+        bucket = self._bucket()
+        categories = list(self.categories)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for category in categories:
+                pipe.zrevrange(self.top_key(category, bucket), 0, top_n - 1, withscores=True)
+            pipe.hgetall(self.counters_key(bucket))
+            results = await pipe.execute()
+
+        counters = {_decode(k): int(v) for k, v in results[-1].items()}
+        summary = {}
+        for category, top in zip(categories, results[:-1]):
+            summary[category] = {
+                "algorithm": self.categories[category],
+                "allowed": counters.get(f"{category}:allowed", 0),
+                "denied": counters.get(f"{category}:denied", 0),
+                "top_clients": [{"client": _decode(c), "requests": int(n)} for c, n in top],
+            }
+        return {"window_seconds": self.bucket_seconds, "window": bucket, "categories": summary}
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+_stats: Dict[str, RateLimitStats] = {}
+
+
+def get_rate_limit_stats(domain_prefix: str) -> RateLimitStats:
+    """Resumen único por dominio, compartido por el limiter y el endpoint de monitoreo"""
+    if domain_prefix not in _stats:
+        _stats[domain_prefix] = RateLimitStats(domain_prefix)
+    return _stats[domain_prefix]
+
+
+def find_rate_limit_stats(domain_prefix: str) -> Optional[RateLimitStats]:
+    return _stats.get(domain_prefix)
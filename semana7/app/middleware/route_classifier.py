@@ -0,0 +1,98 @@
+# app/middleware/route_classifier.py
+import re
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+# Segmentos variables de la ruta (ids numéricos o UUID) -> plantilla /cursos/{id}
+_ID_SEGMENT = re.compile(r"/(?:\d+|[0-9a-fA-F]{8}-[0-9a-fA-F-]{27,36})(?=/|$)")
+_END = object()   # marca de fin de patrón en el trie
+
+
+class RouteClassifier:
+    """
+    Clasificador de rutas compartido por los middlewares del dominio.
+    Cada middleware registra una dimensión (categoría de rate limit, nivel de log,
+    reglas de validación) como lista ordenada de (fragmento de ruta, valor): gana el
+    primer fragmento contenido en la ruta, igual que los `in path` anteriores.
+    Todos los fragmentos van en un único trie que se recorre una vez por ruta, y el
+    resultado se cachea por plantilla de ruta + método.
+    """
+
+    def __init__(self, max_templates: int = 4096):
+        self.max_templates = max_templates
+        self._dimensions: Dict[str, Tuple[List[Tuple[str, Optional[str], Any]], Any]] = {}
+        self._trie: Dict = {}
+        self._cache: Dict[Tuple[str, str], Mapping[str, Any]] = {}
+
+    def register(self, dimension: str, patterns: Iterable[Tuple[str, Any]], default: Any = None):
+        """
+        Registra una dimensión. Un fragmento puede limitarse a un método: "POST /cursos".
+        Se llama al construir los middlewares; reinicia el trie y el cache.
+        """
+        entries = []
+        for pattern, value in patterns:
+            method, _, fragment = pattern.rpartition(" ")
+            entries.append((fragment, method.upper() or None, value))
+        self._dimensions[dimension] = (entries, default)
+        self._build()
+
+    def _build(self):
+        self._trie = {}
+        for dimension, (entries, _) in self._dimensions.items():
+            for priority, (fragment, method, value) in enumerate(entries):
+                node = self._trie
+                for ch in fragment:
+                    node = node.setdefault(ch, {})
+                node.setdefault(_END, []).append((dimension, priority, method, value))
+        self._cache.clear()
+
+    @staticmethod
+    def route_template(path: str) -> str:
+        return _ID_SEGMENT.sub("/{id}", path)
+
+    def _scan(self, path: str) -> List[Tuple[str, int, Optional[str], Any]]:
+        """Todos los fragmentos registrados que aparecen en la ruta (una pasada por el trie)"""
+        found = []
+        trie = self._trie
+        for start in range(len(path)):
+            node = trie
+            for index in range(start, len(path)):
+                node = node.get(path[index])
+                if node is None:
+                    break
+                if _END in node:
+                    found.extend(node[_END])
+        return found
+
+    def classify(self, path: str, method: str = "GET") -> Mapping[str, Any]:
+        """Valor de cada dimensión para la ruta (mapping de solo lectura, cacheado)"""
+        key = (self.route_template(path), method.upper())
+        info = self._cache.get(key)
+        if info is not None:
+            return info
+
+        best: Dict[str, Tuple[int, Any]] = {}
+        for dimension, priority, pattern_method, value in self._scan(key[0]):
+            if pattern_method is not None and pattern_method != key[1]:
+                continue
+            if dimension not in best or priority < best[dimension][0]:
+                best[dimension] = (priority, value)
+        info = MappingProxyType({
+            dimension: best[dimension][1] if dimension in best else default
+            for dimension, (_, default) in self._dimensions.items()
+        })
+
+        if len(self._cache) >= self.max_templates:
+            self._cache.clear()   # rutas con segmentos no normalizados: evita crecer sin límite
+        self._cache[key] = info
+        return info
+
+
+_classifiers: Dict[str, RouteClassifier] = {}
+
+
+def get_route_classifier(domain_prefix: str) -> RouteClassifier:
+    """Clasificador único por dominio, compartido por validador, logger y rate limiter"""
+    if domain_prefix not in _classifiers:
+        _classifiers[domain_prefix] = RouteClassifier()
+    return _classifiers[domain_prefix]
@@ -0,0 +1,106 @@
+# app/middleware/validation_engine.py
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from fastapi.responses import JSONResponse
+from starlette.responses import Response
+from starlette.types import Scope
+
+from .route_classifier import RouteClassifier
+
+
+class ValidationEngine:
+    """
+    Decisiones del validador precalculadas al construir el middleware:
+    - headers requeridos como bytes en minúscula, comparados contra los headers ASGI crudos
+    - horario de atención como tabla de 24 horas; hora y día se leen una vez por minuto
+    - reglas por ruta desde el clasificador compartido (cacheado por plantilla)
+    - respuestas de error ya serializadas
+    """
+
+    def __init__(self, domain_prefix: str, validators: Dict[str, Any], routes: RouteClassifier):
+        self.routes = routes
+        self.required_headers: Tuple[bytes, ...] = tuple(
+            header.lower().encode("latin-1") for header in validators.get("required_headers", [])
+        )
+        start_hour, end_hour = validators.get("business_hours", (0, 24))
+        self._open_hours = tuple(self._in_hours(hour, start_hour, end_hour) for hour in range(24))
+        self._always_open = all(self._open_hours)
+        # Reglas propias de cada dominio
+        self.check_weekend = domain_prefix == "edu_"
+        self.check_prescription = domain_prefix == "pharma_"
+
+        self._minute = -1
+        self._is_open = True
+        self._is_weekend = False
+
+        self.hours_error = JSONResponse(status_code=403, content={"detail": {
+            "error": "Fuera de horario de atención",
+            "allowed_hours": validators.get("business_hours", (0, 24))
+        }})
+        self.headers_error = JSONResponse(status_code=400, content={"detail": {
+            "error": "Headers requeridos faltantes",
+            "required_headers": validators.get("required_headers", [])
+        }})
+        self.weekend_error = JSONResponse(status_code=422, content={"detail": {
+            "error": "Reservas no disponibles en fin de semana"
+        }})
+        self.prescription_error = JSONResponse(status_code=422, content={"detail": {
+            "error": "Medicamento controlado requiere prescripción"
+        }})
+
+    @staticmethod
+    def _in_hours(hour: int, start_hour: int, end_hour: int) -> bool:
+        # Manejo de rangos que cruzan medianoche
+        if start_hour <= end_hour:
+            return start_hour <= hour <= end_hour
+        return hour >= start_hour or hour <= end_hour
+
+    def _refresh_clock(self):
+        """Hora y día de la semana cacheados por minuto (datetime.now() una vez por minuto)"""
+        minute = int(time.time() // 60)
+        if minute != self._minute:
+            now = datetime.now()
+            self._is_open = self._open_hours[now.hour]
+            self._is_weekend = now.weekday() >= 5
+            self._minute = minute
+
+    def is_open(self) -> bool:
+        if self._always_open:
+            return True
+        self._refresh_clock()
+        return self._is_open
+
+    def is_weekend(self) -> bool:
+        self._refresh_clock()
+        return self._is_weekend
+
+    @staticmethod
+    def _has_headers(headers: Sequence[Tuple[bytes, bytes]], required: Sequence[bytes]) -> bool:
+        """Los nombres de header ASGI ya vienen en minúscula: se comparan sin copiar nada"""
+        for wanted in required:
+            for name, _ in headers:
+                if name == wanted:
+                    break
+            else:
+                return False
+        return True
+
+    def check(self, scope: Scope) -> Optional[Response]:
+        """Respuesta de error precalculada o None si la request es válida"""
+        route = self.routes.classify(scope["path"], scope["method"])
+        if not route["emergency"] and not self.is_open():
+            return self.hours_error
+
+        headers = scope.get("headers", ())
+        if self.required_headers and not self._has_headers(headers, self.required_headers):
+            return self.headers_error
+
+        if self.check_weekend and route["weekend_restricted"] and self.is_weekend():
+            return self.weekend_error
+        if (self.check_prescription and route["prescription_required"]
+                and not self._has_headers(headers, (b"x-prescription-id",))):
+            return self.prescription_error
+        # TODO: implementar control de capacidad para gym_
+        return None
@@ -31,7 +31,7 @@ class ServicioDominio:
 tu_servicio_dominio = ServicioDominio()
 
 @router.get("/grupos/frecuentes")
-@cache_result(ttl_type='frequent_data', key_prefix='grupos_frecuentes')
+@cache_result(ttl_type='frequent_data', key_prefix='grupos_frecuentes', tags=['grupos'])
 async def get_grupos_frecuentes():
     try:
         return await tu_servicio_dominio.get_grupos_frecuentes()
@@ -39,7 +39,7 @@ async def get_grupos_frecuentes():
         raise HTTPException(status_code=500, detail=f"Error al obtener grupos de cursos: {str(e)}")
 
 @router.get("/niveles")
-@cache_result(ttl_type='stable_data', key_prefix='niveles')
+@cache_result(ttl_type='stable_data', key_prefix='niveles', tags=['config'])
 async def get_niveles_curso():
     try:
         return await tu_servicio_dominio.get_niveles()
@@ -47,7 +47,7 @@ async def get_niveles_curso():
         raise HTTPException(status_code=500, detail=f"Error al obtener niveles de curso: {str(e)}")
 
 @router.get("/catalogo")
-@cache_result(ttl_type='reference_data', key_prefix='catalogo_cursos')
+@cache_result(ttl_type='reference_data', key_prefix='catalogo_cursos', tags=['catalogo'])
 async def get_catalogo_cursos():
     try:
         return await tu_servicio_dominio.get_catalogo_cursos()
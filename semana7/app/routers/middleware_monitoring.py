@@ -1,6 +1,17 @@
 # app/routers/middleware_monitoring.py
-from fastapi import APIRouter
-import redis
+import asyncio
+import os
+from fastapi import APIRouter, Query
+from typing import Optional
+from ..cache.redis_config import async_cache_manager
+from ..cache.warmer import cache_refresh_scheduler
+from ..cache.metrics import cache_metrics
+from ..cache.circuit_breaker import CircuitBreaker, CircuitOpenError, redis_breaker
+from ..middleware.log_pipeline import find_log_pipeline
+from ..middleware.rate_limit_stats import find_rate_limit_stats
+from ..database.query_registry import find_query_registry
+from ..database.get_db import async_engine
+from ..database.profiling import analyze_domain_queries, query_profiler
 
 # Prefijo del dominio: Academia Idiomas
 DOMAIN_PREFIX = "lang_"
@@ -10,39 +21,159 @@ router = APIRouter(
     tags=["Middleware Monitoring"]
 )
 
+# Lecturas de monitoreo con breaker y timeout propios: un volcado lento (SCAN + pipeline)
+# no debe contar como fallo del breaker compartido ni degradar cache y rate limiter
+monitoring_breaker = CircuitBreaker(
+    "redis-monitoring", failure_threshold=3, recovery_timeout=10.0,
+    call_timeout=float(os.getenv('REDIS_MONITORING_TIMEOUT', 2.0)),
+)
+
+async def _monitoring_read(awaitable):
+    """Falla al instante si el circuito compartido está abierto (sin consumir sondas ni registrar nada)"""
+    state = redis_breaker.get_state()
+    if state["state"] == CircuitBreaker.OPEN and state["retry_in"]:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise CircuitOpenError(redis_breaker.name)
+    return await monitoring_breaker.call(awaitable)
+
+def _redis_degraded(error: Exception, **empty):
+    """Respuesta sin esperar a Redis: circuito abierto o llamada fallida/lenta"""
+    if not isinstance(error, CircuitOpenError):
+        print(f"Error leyendo rate limits de Redis: {type(error).__name__}: {error}")
+    return {"domain": DOMAIN_PREFIX, "degraded": True,
+            "redis_circuit_breaker": redis_breaker.get_state(),
+            "monitoring_circuit_breaker": monitoring_breaker.get_state(), **empty}
+
+async def _read_rate_limit_keys(redis_client, cursor: int, pattern: str, count: int):
+    """SCAN de una página y estado de cada clave en un pipeline"""
+    next_cursor, keys = await redis_client.scan(cursor=cursor, match=pattern, count=count)
+
+    stats = find_rate_limit_stats(DOMAIN_PREFIX)
+    algorithms = stats.categories if stats is not None else {}
+    entries = []
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for key in keys:
+            key_str = key.decode() if isinstance(key, bytes) else key
+            # {prefix}:rate_limit:{categoría|tenant|global}:{hash tag de la identidad}
+            _, _, key_category, client_id = key_str.split(":", 3)
+            client_id = client_id.strip("{}")
+            # tenant y global no son categorías: son cuotas agregadas con GCRA
+            algorithm = algorithms.get(key_category, "gcra")
+            # Estado según el algoritmo: requests en la ventana, tokens o TAT de GCRA
+            if algorithm == "token_bucket":
+                pipe.hget(key, "tokens")
+            elif algorithm == "gcra":
+                pipe.get(key)
+            else:
+                pipe.zcard(key)
+            entries.append({"category": key_category, "client": client_id, "algorithm": algorithm})
+        values = await pipe.execute() if entries else []
+    return next_cursor, entries, values
+
 @router.get("/rate-limits")
-async def get_rate_limit_stats():
-    """Obtiene estadísticas de rate limiting específicas del dominio Academia Idiomas"""
-    redis_client = redis.Redis(host="localhost", port=6379, db=0)
-
-    # Claves de rate limiting para este dominio
-    keys = redis_client.keys(f"{DOMAIN_PREFIX}:rate_limit:*")
-
-    stats = {}
-    for key in keys:
-        key_str = key.decode() if isinstance(key, bytes) else key
-        parts = key_str.split(":")
-        if len(parts) >= 4:
-            category = parts[2]
-            client_ip = parts[3]
-            count = redis_client.zcard(key)
-
-            if category not in stats:
-                stats[category] = {}
-            stats[category][client_ip] = count
+async def get_rate_limit_stats(top: int = Query(10, ge=1, le=100)):
+    """Top de clientes y contadores por categoría (resumen incremental, un solo pipeline)"""
+    stats = find_rate_limit_stats(DOMAIN_PREFIX)
+    if stats is None:
+        return {"domain": DOMAIN_PREFIX, "rate_limit_stats": {}}
+    try:
+        summary = await _monitoring_read(stats.read_summary(async_cache_manager.redis_client, top_n=top))
+    except Exception as e:
+        return _redis_degraded(e, rate_limit_stats={})
+    return {
+        "domain": DOMAIN_PREFIX,
+        "window_seconds": summary["window_seconds"],
+        "rate_limit_stats": summary["categories"]
+    }
+
+@router.get("/rate-limits/keys")
+async def dump_rate_limit_keys(
+    cursor: int = Query(0, ge=0),
+    count: int = Query(200, ge=1, le=1000),
+    category: Optional[str] = None
+):
+    """
+    Volcado completo del estado por cliente, paginado con SCAN (no bloquea Redis como KEYS).
+    Repetir con el `next_cursor` devuelto hasta que sea 0.
+    """
+    pattern = f"{DOMAIN_PREFIX}:rate_limit:{category or '*'}:*"
+    try:
+        next_cursor, entries, values = await _monitoring_read(
+            _read_rate_limit_keys(async_cache_manager.redis_client, cursor, pattern, count)
+        )
+    except Exception as e:
+        return _redis_degraded(e, next_cursor=cursor, keys=[])
 
+    for entry, value in zip(entries, values):
+        entry["state"] = value.decode() if isinstance(value, bytes) else value
     return {
         "domain": DOMAIN_PREFIX,
-        "rate_limit_stats": stats
+        "next_cursor": int(next_cursor),
+        "keys": entries
     }
 
 @router.get("/middleware-health")
 async def check_middleware_health():
     """Verifica el estado del middleware del dominio Academia Idiomas"""
+    breaker = redis_breaker.get_state()
+    degraded = breaker["state"] != CircuitBreaker.CLOSED
+    log_pipeline = find_log_pipeline(DOMAIN_PREFIX)
     return {
         "domain": DOMAIN_PREFIX,
-        "rate_limiter": "active",
+        # Con el circuito abierto: rate limit en memoria por worker y cache en bypass
+        "rate_limiter": "in_memory_fallback" if degraded else "active",
+        "cache": "bypass" if degraded else "active",
         "logger": "active",
         "validator": "active",
-        "status": "healthy ✅"
+        "redis_circuit_breaker": breaker,
+        # Cola de logs: registros descartados por cola llena y lotes escritos
+        "log_pipeline": log_pipeline.get_stats() if log_pipeline is not None else None,
+        "status": "degraded ⚠️" if degraded else "healthy ✅"
+    }
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Estado del cache L1, coalescencia de misses y métricas por prefijo/ttl_type"""
+    local_cache = async_cache_manager.local_cache
+    return {
+        "domain": DOMAIN_PREFIX,
+        "l1": local_cache.get_stats() if local_cache is not None else None,
+        "single_flight": async_cache_manager.single_flight.get_stats(),
+        "metrics": cache_metrics.get_summary()
+    }
+
+@router.get("/cache-warmer")
+async def get_cache_warmer_state():
+    """Estado del scheduler que refresca el cache antes de que expire"""
+    return {
+        "domain": DOMAIN_PREFIX,
+        "warmer": cache_refresh_scheduler.get_state()
+    }
+
+@router.get("/query-stats")
+async def get_query_stats():
+    """Ejecuciones, errores, filas y tiempos por consulta compilada del dominio"""
+    registry = find_query_registry(DOMAIN_PREFIX)
+    return {
+        "domain": DOMAIN_PREFIX,
+        "queries": registry.get_stats() if registry is not None else {}
+    }
+
+@router.get("/slow-queries")
+async def get_slow_queries(limit: int = Query(20, ge=1, le=200), explain: bool = False):
+    """Consultas agrupadas por huella (p50/p95/max) y las lentas del dominio; explain=true obtiene los planes muestreados"""
+    explained = 0
+    if explain:
+        try:
+            async with async_engine.connect() as connection:
+                explained = await connection.run_sync(query_profiler.explain_pending)
+        except Exception as e:
+            print(f"Error obteniendo planes EXPLAIN: {e}")
+    return {
+        "domain": DOMAIN_PREFIX,
+        "slow_threshold_ms": query_profiler.slow_threshold * 1000,
+        "explained": explained,
+        "top": query_profiler.top(limit),
+        "domain_slow_queries": analyze_domain_queries(DOMAIN_PREFIX)
     }
@@ -1,49 +1,79 @@
 # app/routers/optimized_domain_routes.py
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Callable, Optional
 from app.services.optimized_domain_service import OptimizedDomainService
-from app.database.get_db import get_db
+from app.services.result_streaming import MEDIA_TYPES, encode_rows
+from app.database.get_db import AsyncSessionLocal, get_async_db
+from app.database.pagination import InvalidCursor
 
 router = APIRouter(prefix="/lang/optimized", tags=["Optimized Domain - Academia Idiomas"])
 
+async def get_domain_service(db: AsyncSession = Depends(get_async_db)) -> OptimizedDomainService:
+    """Servicio por request sobre el registro de consultas ya compilado"""
+    return OptimizedDomainService(db, "lang_")
+
 @router.get("/cursos/nivel/{nivel}")
 async def cursos_por_nivel(
     nivel: str,
     estado: Optional[str] = None,
-    limit: int = 10,
-    offset: int = 0,
-    db: Session = Depends(get_db)
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    service: OptimizedDomainService = Depends(get_domain_service)
 ):
-    """Cursos filtrados por nivel (A1, A2, B1, B2, C1, C2)"""
-    service = OptimizedDomainService(db, "lang_")
-    return await service.get_cursos_por_nivel(nivel, estado, limit, offset)
+    """Cursos filtrados por nivel (A1, A2, B1, B2, C1, C2); paginar con next_cursor/prev_cursor"""
+    try:
+        return await service.get_cursos_por_nivel(nivel, estado, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/cursos/{curso_id}/inscripciones")
 async def inscripciones_por_curso(
     curso_id: int,
-    limit: int = 20,
-    offset: int = 0,
-    db: Session = Depends(get_db)
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = None,
+    service: OptimizedDomainService = Depends(get_domain_service)
 ):
-    """Inscripciones activas de un curso específico"""
-    service = OptimizedDomainService(db, "lang_")
-    return await service.get_inscripciones_por_curso(curso_id, limit, offset)
+    """Inscripciones activas de un curso específico; paginar con next_cursor/prev_cursor"""
+    try:
+        return await service.get_inscripciones_por_curso(curso_id, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/cursos/{curso_id}/grupos")
-async def grupos_por_curso(curso_id: int, db: Session = Depends(get_db)):
+async def grupos_por_curso(curso_id: int, service: OptimizedDomainService = Depends(get_domain_service)):
     """Grupos asignados a un curso específico"""
-    service = OptimizedDomainService(db, "lang_")
     return await service.get_grupos_por_curso(curso_id)
 
 @router.get("/cursos/proximos")
-async def proximos_cursos(db: Session = Depends(get_db)):
+async def proximos_cursos(service: OptimizedDomainService = Depends(get_domain_service)):
     """Próximos cursos que inician en la Academia"""
-    service = OptimizedDomainService(db, "lang_")
     return await service.get_proximos_cursos()
 
 @router.get("/profesores/{profesor_id}/cursos")
-async def cursos_por_profesor(profesor_id: int, db: Session = Depends(get_db)):
+async def cursos_por_profesor(profesor_id: int, service: OptimizedDomainService = Depends(get_domain_service)):
     """Cursos dictados por un profesor"""
-    service = OptimizedDomainService(db, "lang_")
     return await service.get_cursos_por_profesor(profesor_id)
+
+async def _export(stream: Callable[[OptimizedDomainService], AsyncIterator], fmt: str) -> AsyncIterator[bytes]:
+    """Sesión propia del generador: debe seguir abierta mientras se envía la respuesta"""
+    async with AsyncSessionLocal() as db:
+        async for chunk in encode_rows(stream(OptimizedDomainService(db, "lang_")), fmt):
+            yield chunk
+
+@router.get("/cursos/{curso_id}/inscripciones/export")
+async def exportar_inscripciones(curso_id: int, formato: str = Query("ndjson", alias="format", pattern="^(json|ndjson)$")):
+    """Todas las inscripciones del curso en streaming (JSON o NDJSON), con memoria constante"""
+    return StreamingResponse(
+        _export(lambda service: service.stream_inscripciones_por_curso(curso_id), formato),
+        media_type=MEDIA_TYPES[formato]
+    )
+
+@router.get("/profesores/{profesor_id}/cursos/export")
+async def exportar_cursos_por_profesor(profesor_id: int, formato: str = Query("ndjson", alias="format", pattern="^(json|ndjson)$")):
+    """Cursos del profesor con total de inscritos, en streaming"""
+    return StreamingResponse(
+        _export(lambda service: service.stream_cursos_por_profesor(profesor_id), formato),
+        media_type=MEDIA_TYPES[formato]
+    )
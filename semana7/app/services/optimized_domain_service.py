@@ -1,39 +1,105 @@
 # app/services/optimized_domain_service.py
+import time
+from sqlalchemy.engine import RowMapping
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.database.optimized_queries import DomainOptimizedQueries
-from typing import List, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.database.pagination import NEXT, PREV, decode_cursor, encode_cursor
+from app.database.query_registry import get_query_registry
+from typing import AsyncIterator, List, Dict, Any, Optional, Union
 
 class OptimizedDomainService:
-    def __init__(self, db: Session, domain_prefix: str = "lang_"):
+    def __init__(self, db: Union[AsyncSession, Session], domain_prefix: str = "lang_"):
         self.db = db
         self.domain_prefix = domain_prefix
-        self.queries = DomainOptimizedQueries.get_queries_for_domain(domain_prefix)
+        # Consultas compiladas una vez por dominio (no se rearman por request)
+        self.registry = get_query_registry(domain_prefix)
+        self.keyset_columns = self.registry.keyset_columns
 
     async def execute_optimized_query(self, query_name: str, params: Dict[str, Any]) -> List[Dict]:
         """Ejecuta consulta optimizada específica del dominio"""
-        if query_name not in self.queries:
-            raise ValueError(f"Query {query_name} no encontrada para dominio {self.domain_prefix}")
+        query = self.registry.get(query_name)
+        start = time.perf_counter()
+        try:
+            if isinstance(self.db, AsyncSession):
+                result = await self.db.execute(query.statement, params)
+                rows = [dict(row) for row in result.mappings()]
+            else:
+                # Session síncrona: se ejecuta en el threadpool para no bloquear el event loop
+                def run() -> List[Dict]:
+                    return [dict(row) for row in self.db.execute(query.statement, params).mappings()]
+                rows = await run_in_threadpool(run)
+        except Exception:
+            self.registry.record(query, time.perf_counter() - start, error=True)
+            raise
+        self.registry.record(query, time.perf_counter() - start, len(rows))
+        return rows
 
-        query = self.queries[query_name]
-        result = self.db.execute(text(query), params)
-        return [dict(row) for row in result]
+    async def stream_optimized_query(self, query_name: str, params: Dict[str, Any],
+                                     chunk_rows: int = 500) -> AsyncIterator[RowMapping]:
+        """
+        Filas como mappings desde un cursor del servidor, sin cargar el resultado completo.
+        Requiere AsyncSession; el driver entrega las filas de a `chunk_rows`.
+        """
+        if not isinstance(self.db, AsyncSession):
+            raise TypeError("El modo streaming requiere AsyncSession")
+        query = self.registry.get(query_name)
+        start = time.perf_counter()
+        rows = 0
+        try:
+            result = await self.db.stream(query.statement, params, execution_options={"yield_per": chunk_rows})
+            async for row in result.mappings():
+                rows += 1
+                yield row
+        except Exception:
+            self.registry.record(query, time.perf_counter() - start, rows, error=True)
+            raise
+        self.registry.record(query, time.perf_counter() - start, rows)
+
+    async def execute_keyset_page(self, query_name: str, params: Dict[str, Any], limit: int,
+                                  cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Página por keyset: filtra desde la clave de orden del cursor en vez de OFFSET.
+        Pide limit + 1 filas para saber si hay más. InvalidCursor si el cursor no es válido.
+        """
+        columns = self.keyset_columns[query_name]
+        direction, variant = NEXT, query_name
+        params = {**params, "limit": limit + 1}
+        if cursor:
+            direction, values = decode_cursor(query_name, cursor, self.registry.keyset_types[query_name])
+            variant = f"{query_name}_after" if direction == NEXT else f"{query_name}_before"
+            params.update({f"cursor_{column}": value for column, value in zip(columns, values)})
+
+        rows = await self.execute_optimized_query(variant, params)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == PREV:
+            rows.reverse()   # la variante _before recorre el índice al revés
+
+        def cursor_for(row: Dict, to: str) -> str:
+            return encode_cursor(query_name, to, [row[column] for column in columns])
+
+        more_after = has_more if direction == NEXT else bool(cursor)
+        more_before = bool(cursor) if direction == NEXT else has_more
+        return {
+            "items": rows,
+            "next_cursor": cursor_for(rows[-1], NEXT) if rows and more_after else None,
+            "prev_cursor": cursor_for(rows[0], PREV) if rows and more_before else None,
+        }
 
     # 📌 Métodos específicos para Academia de Idiomas
-    async def get_cursos_por_nivel(self, nivel: str, estado: str = None, limit: int = 10, offset: int = 0) -> List[Dict]:
-        return await self.execute_optimized_query("cursos_por_nivel", {
+    async def get_cursos_por_nivel(self, nivel: str, estado: str = None, limit: int = 10,
+                                   cursor: Optional[str] = None) -> Dict[str, Any]:
+        return await self.execute_keyset_page("cursos_por_nivel", {
             "nivel": nivel,
-            "estado": estado,
-            "limit": limit,
-            "offset": offset
-        })
+            "estado": estado
+        }, limit, cursor)
 
-    async def get_inscripciones_por_curso(self, curso_id: int, limit: int = 20, offset: int = 0) -> List[Dict]:
-        return await self.execute_optimized_query("inscripciones_por_curso", {
-            "curso_id": curso_id,
-            "limit": limit,
-            "offset": offset
-        })
+    async def get_inscripciones_por_curso(self, curso_id: int, limit: int = 20,
+                                          cursor: Optional[str] = None) -> Dict[str, Any]:
+        return await self.execute_keyset_page("inscripciones_por_curso", {
+            "curso_id": curso_id
+        }, limit, cursor)
 
     async def get_grupos_por_curso(self, curso_id: int) -> List[Dict]:
         return await self.execute_optimized_query("grupos_por_curso", {
@@ -47,3 +113,14 @@ class OptimizedDomainService:
         return await self.execute_optimized_query("cursos_por_profesor", {
             "profesor_id": profesor_id
         })
+
+    # 📌 Exportaciones en streaming (resultados grandes)
+    def stream_inscripciones_por_curso(self, curso_id: int) -> AsyncIterator[RowMapping]:
+        return self.stream_optimized_query("inscripciones_por_curso_export", {
+            "curso_id": curso_id
+        })
+
+    def stream_cursos_por_profesor(self, profesor_id: int) -> AsyncIterator[RowMapping]:
+        return self.stream_optimized_query("cursos_por_profesor", {
+            "profesor_id": profesor_id
+        })
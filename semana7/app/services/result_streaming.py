@@ -0,0 +1,68 @@
+# app/services/result_streaming.py
+"""
+Codificación por lotes de resultados grandes para StreamingResponse.
+
+Las filas llegan una a una desde el cursor del servidor y se codifican en
+trozos de `chunk_rows` filas: en memoria solo hay un lote a la vez, no la
+lista completa de filas ni el JSON entero.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, List, Mapping
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+MEDIA_TYPES = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+async def _batches(rows: AsyncIterator[Mapping], chunk_rows: int) -> AsyncIterator[List[dict]]:
+    batch: List[dict] = []
+    async for row in rows:
+        batch.append(dict(row))
+        if len(batch) >= chunk_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def encode_ndjson(rows: AsyncIterator[Mapping], chunk_rows: int = 500) -> AsyncIterator[bytes]:
+    """Una línea JSON por fila"""
+    async for batch in _batches(rows, chunk_rows):
+        yield b"\n".join(_dumps(row) for row in batch) + b"\n"
+
+
+async def encode_json_array(rows: AsyncIterator[Mapping], chunk_rows: int = 500) -> AsyncIterator[bytes]:
+    """Un arreglo JSON válido emitido por partes: cada lote se codifica con una sola llamada"""
+    yield b"["
+    first = True
+    async for batch in _batches(rows, chunk_rows):
+        encoded = _dumps(batch)[1:-1]   # sin los corchetes del lote
+        yield encoded if first else b"," + encoded
+        first = False
+    yield b"]"
+
+
+def encode_rows(rows: AsyncIterator[Mapping], fmt: str = "ndjson", chunk_rows: int = 500) -> AsyncIterator[bytes]:
+    if fmt == "json":
+        return encode_json_array(rows, chunk_rows)
+    return encode_ndjson(rows, chunk_rows)
@@ -1,6 +1,7 @@
 # monitoring/metrics.py
 from prometheus_fastapi_instrumentator import Instrumentator
-from prometheus_client import Counter, Histogram, Gauge
+from prometheus_client import Counter, Histogram, Gauge, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
 import psutil
 import time
 from functools import wraps
@@ -126,3 +127,56 @@ def monitor_performance(metrics: APIMetrics, method: str = "GET"):
                 raise
         return wrapper
     return decorator
+
+
+class CacheMetricsCollector:
+    """
+    Exporta los contadores en memoria del cache (app/cache/metrics.py) al registry.
+    Se leen solo al hacer scrape: no agrega costo a cada acceso al cache.
+    """
+
+    def __init__(self, cache_metrics, domain: str = "lang"):
+        self.cache_metrics = cache_metrics
+        self.domain = domain
+
+    def collect(self):
+        from app.cache.metrics import LATENCY_BUCKETS, OUTCOMES
+
+        labels = ['prefix', 'ttl_type']
+        requests = CounterMetricFamily(
+            f'{self.domain}_cache_requests', 'Lecturas de cache por resultado', labels=labels + ['outcome']
+        )
+        sets = CounterMetricFamily(f'{self.domain}_cache_sets', 'Escrituras en cache', labels=labels)
+        nbytes = CounterMetricFamily(
+            f'{self.domain}_cache_bytes', 'Bytes leídos/escritos en Redis', labels=labels + ['direction']
+        )
+        hit_ratio = GaugeMetricFamily(f'{self.domain}_cache_hit_ratio', 'Hit ratio del cache', labels=labels)
+        latency = HistogramMetricFamily(
+            f'{self.domain}_cache_get_duration_seconds', 'Latencia de lectura del cache', labels=labels
+        )
+
+        for (prefix, ttl_type), series in self.cache_metrics.snapshot().items():
+            for outcome in OUTCOMES:
+                requests.add_metric([prefix, ttl_type, outcome], series[outcome])
+            sets.add_metric([prefix, ttl_type], series["sets"])
+            nbytes.add_metric([prefix, ttl_type, "read"], series["bytes_read"])
+            nbytes.add_metric([prefix, ttl_type, "written"], series["bytes_written"])
+
+            reads = sum(series[outcome] for outcome in OUTCOMES)
+            hits = reads - series["miss"]
+            hit_ratio.add_metric([prefix, ttl_type], hits / reads if reads else 0.0)
+
+            cumulative, buckets = 0, []
+            for bound, count in zip((*LATENCY_BUCKETS, float("inf")), series["latency_buckets"]):
+                cumulative += count
+                buckets.append(("+Inf" if bound == float("inf") else str(bound), cumulative))
+            latency.add_metric([prefix, ttl_type], buckets, series["latency_sum"])
+
+        yield from (requests, sets, nbytes, hit_ratio, latency)
+
+
+def register_cache_metrics(cache_metrics, domain: str = "lang", registry=REGISTRY):
+    """Registra el collector del cache (una vez por proceso)"""
+    collector = CacheMetricsCollector(cache_metrics, domain)
+    registry.register(collector)
+    return collector
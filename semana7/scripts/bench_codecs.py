@@ -0,0 +1,75 @@
+# scripts/bench_codecs.py
+"""
+Micro-benchmark de los codecs del cache sobre payloads del dominio.
+
+Compara encode/decode (µs por operación) y tamaño en bytes para cada codec
+disponible, con y sin compresión. Uso:
+
+    python scripts/bench_codecs.py --items 2000 --repeat 200
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.cache.serialization import CODECS, COMPRESSION_IDS, CacheSerializer  # noqa: E402
+
+
+def build_payloads(items: int):
+    """Payloads representativos: catálogo grande, grupos frecuentes y usuarios con fechas"""
+    base = datetime(2025, 9, 1, 8, 0)
+    return {
+        "catalogo_cursos": [
+            {"id": i, "curso": f"Inglés {nivel}", "duracion": "3 meses",
+             "descripcion": f"Curso de inglés nivel {nivel} - grupo {i}"}
+            for i, nivel in zip(range(items), ["A1", "A2", "B1", "B2", "C1", "C2"] * items)
+        ],
+        "grupos_frecuentes": [
+            {"id": 1, "nombre": "Inglés A1", "descripcion": "Curso para principiantes de inglés"},
+            {"id": 2, "nombre": "Inglés A2", "descripcion": "Curso para nivel intermedio bajo"},
+            {"id": 3, "nombre": "Inglés B1", "descripcion": "Curso para nivel intermedio alto"},
+        ],
+        "usuarios_db": [
+            {"id": i, "username": f"estudiante{i}", "activo": True,
+             "fecha_creacion": base + timedelta(minutes=i), "ultima_conexion": None}
+            for i in range(items)
+        ],
+    }
+
+
+def time_per_op(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de codecs del cache")
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    compressions = ["none", "zlib"] + (["lz4"] if "lz4" in COMPRESSION_IDS else [])
+    payloads = build_payloads(args.items)
+
+    print(f"{'payload':<18} {'codec':<8} {'compr':<6} {'bytes':>9} {'encode µs':>11} {'decode µs':>11}")
+    print("=" * 68)
+    for name, value in payloads.items():
+        for codec in sorted(CODECS):
+            for compression in compressions:
+                serializer = CacheSerializer(codec=codec, compression=compression, compress_threshold=1024)
+                if serializer.compression != compression:
+                    continue  # compresión no instalada en este entorno
+                encoded = serializer.dumps(value)
+                encode_us = time_per_op(lambda: serializer.dumps(value), args.repeat)
+                decode_us = time_per_op(lambda: CacheSerializer.loads(encoded), args.repeat)
+                print(f"{name:<18} {codec:<8} {compression:<6} {len(encoded):>9} "
+                      f"{encode_us:>11.1f} {decode_us:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# scripts/bench_lang_routes.py
+"""
+Benchmark de latencia para las rutas /lang/* bajo concurrencia.
+
+Lanza N clientes concurrentes (500 por defecto) contra un servidor en ejecución
+y reporta p50/p95/p99 por ruta. Uso:
+
+    uvicorn app.main:app --workers 4 --port 8000
+    python scripts/bench_lang_routes.py --url http://localhost:8000 --clients 500
+
+Nota: el rate limiter del dominio limita por IP; para medir el cache sin 429
+sube los límites o ejecuta el benchmark desde varias IPs.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+
+DEFAULT_ROUTES = ["/lang/niveles", "/lang/catalogo", "/lang/grupos/frecuentes"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano (valores en segundos)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_client(client: httpx.AsyncClient, route: str, requests: int,
+                     latencies: List[float], statuses: Counter):
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            response = await client.get(route)
+            statuses[response.status_code] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def bench_route(base_url: str, route: str, clients: int, requests: int) -> Dict:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            run_client(client, route, requests, latencies, statuses)
+            for _ in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "route": route,
+        "requests": sum(statuses.values()),
+        "rps": round(sum(statuses.values()) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "statuses": dict(statuses),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark p99 de rutas /lang/*")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20, help="requests por cliente")
+    parser.add_argument("--routes", nargs="*", default=DEFAULT_ROUTES)
+    args = parser.parse_args()
+
+    print(f"Benchmark {args.url} - {args.clients} clientes x {args.requests} requests")
+    print("=" * 60)
+    for route in args.routes:
+        result = await bench_route(args.url, route, args.clients, args.requests)
+        print(
+            f"{result['route']:<28} rps={result['rps']:<9} "
+            f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+            f"status={result['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
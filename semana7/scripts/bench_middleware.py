@@ -0,0 +1,101 @@
+# scripts/bench_middleware.py
+"""
+Requests/segundo con los tres middlewares del dominio apilados.
+
+Compara el stack ASGI puro actual contra el mismo stack envuelto en capas
+BaseHTTPMiddleware (una por middleware, como estaban antes): la diferencia
+es el costo de las tareas y memory streams extra por request. Se ejecuta en
+proceso con httpx.ASGITransport, sin red. Uso:
+
+    python scripts/bench_middleware.py --requests 5000 --concurrency 50
+    python scripts/bench_middleware.py --redis   # rate limiter contra Redis real
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.middleware.domain_logger import DomainLogger  # noqa: E402
+from app.middleware.domain_rate_limiter import DomainRateLimiter  # noqa: E402
+from app.middleware.domain_validator import DomainValidator  # noqa: E402
+
+DOMAIN_PREFIX = "lang_"
+
+
+class AllowAllRedis:
+    """Sustituto del script de Redis para medir solo el costo de los middlewares"""
+
+    def register_script(self, script):
+        async def run(keys, args, client=None):
+            return [1, 1000, 0]
+        return run
+
+
+class PassthroughHTTPMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def build_app(legacy: bool, use_redis: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/lang/cursos/{curso_id}")
+    async def get_curso(curso_id: int):
+        return {"id": curso_id, "nombre": "Inglés A1"}
+
+    redis_client = None if use_redis else AllowAllRedis()
+    # Mismo orden que app/main.py: validación → logging → rate limiting
+    stack = [
+        (DomainValidator, {"domain_prefix": DOMAIN_PREFIX}),
+        (DomainLogger, {"domain_prefix": DOMAIN_PREFIX}),
+        (DomainRateLimiter, {"domain_prefix": DOMAIN_PREFIX, "redis_client": redis_client}),
+    ]
+    for middleware, kwargs in stack:
+        app.add_middleware(middleware, **kwargs)
+        if legacy:
+            app.add_middleware(PassthroughHTTPMiddleware)
+    return app
+
+
+async def run(app: FastAPI, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app, client=("10.0.0.1", 1234))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = iter(range(total))
+
+        async def worker():
+            for i in queue:
+                response = await client.get(f"/lang/cursos/{i % 50}")
+                response.raise_for_status()
+
+        await client.get("/lang/cursos/1")   # calentamiento
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de middlewares ASGI vs BaseHTTPMiddleware")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--redis", action="store_true", help="usar Redis real en el rate limiter")
+    args = parser.parse_args()
+    os.environ.setdefault("RATE_LIMIT_LOCAL_ERROR", "0")
+
+    print(f"{args.requests} requests, concurrencia {args.concurrency}")
+    results = {}
+    for name, legacy in (("BaseHTTPMiddleware", True), ("ASGI puro", False)):
+        results[name] = asyncio.run(run(build_app(legacy, args.redis), args.requests, args.concurrency))
+        print(f"{name:<20} {results[name]:>10.0f} req/s")
+    speedup = results["ASGI puro"] / results["BaseHTTPMiddleware"]
+    print(f"Mejora: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
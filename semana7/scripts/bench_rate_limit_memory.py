@@ -0,0 +1,70 @@
+# scripts/bench_rate_limit_memory.py
+"""
+Memoria en Redis del estado del rate limiter por algoritmo.
+
+Simula N clientes distintos que hacen M requests cada uno contra una
+categoría y mide el aumento de used_memory. Requiere un Redis local
+(se usa la db indicada y se limpia al terminar). Uso:
+
+    python scripts/bench_rate_limit_memory.py --clients 100000 --requests 20 --db 15
+"""
+import argparse
+import os
+import sys
+
+import redis
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.middleware.rate_limit_algorithms import ALGORITHMS  # noqa: E402
+
+CONFIG = {"requests": 120, "window": 60, "burst": 20}
+
+
+def used_memory(client: redis.Redis) -> int:
+    return client.info("memory")["used_memory"]
+
+
+def run(client: redis.Redis, algorithm_name: str, clients: int, requests: int, batch: int) -> int:
+    algorithm = ALGORITHMS[algorithm_name]
+    config = {**CONFIG, "algorithm": algorithm_name}
+    script = client.register_script(algorithm.script)
+    client.flushdb()
+    before = used_memory(client)
+
+    for start in range(0, clients, batch):
+        pipe = client.pipeline(transaction=False)
+        for client_id in range(start, min(start + batch, clients)):
+            key = f"lang_:rate_limit:courses:10.0.{client_id // 256}.{client_id % 256}"
+            for n in range(requests):
+                script(keys=[key], args=algorithm.args(config, f"bench:{client_id}:{n}"), client=pipe)
+        pipe.execute()
+
+    used = used_memory(client) - before
+    client.flushdb()
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria del rate limiter por algoritmo")
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=20, help="requests por cliente dentro de la ventana")
+    parser.add_argument("--batch", type=int, default=500, help="clientes por pipeline")
+    parser.add_argument("--db", type=int, default=15)
+    args = parser.parse_args()
+
+    client = redis.Redis(host=os.getenv("REDIS_HOST", "localhost"),
+                         port=int(os.getenv("REDIS_PORT", 6379)), db=args.db)
+
+    print(f"{args.clients} clientes x {args.requests} requests (límite {CONFIG['requests']}/{CONFIG['window']}s)")
+    print(f"{'algoritmo':<16} {'MB totales':>12} {'bytes/cliente':>15} {'MB por 100k':>13}")
+    print("=" * 60)
+    for name in ALGORITHMS:
+        used = run(client, name, args.clients, args.requests, args.batch)
+        per_client = used / args.clients
+        print(f"{name:<16} {used / 1024 / 1024:>12.1f} {per_client:>15.0f} "
+              f"{per_client * 100_000 / 1024 / 1024:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,3 +6,15 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 semana7_dir = os.path.abspath(os.path.join(current_dir, '..'))
 if semana7_dir not in sys.path:
     sys.path.insert(0, semana7_dir)
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def reset_redis_breaker():
+    """El breaker de Redis es global: un test sin Redis real no debe abrirlo para los siguientes"""
+    from app.cache.circuit_breaker import redis_breaker
+
+    redis_breaker.reset()
+    yield
+    redis_breaker.reset()
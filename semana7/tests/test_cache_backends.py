@@ -0,0 +1,507 @@
+# tests/test_cache_backends.py
+import asyncio
+import fnmatch
+import json
+import time
+import pytest
+from app.cache import cache_decorators
+from app.cache.cache_decorators import cache_result
+from datetime import datetime
+from app.cache.local_cache import LocalLRUCache
+from app.cache.serialization import CODECS, CacheSerializer
+from app.cache.redis_config import (
+    AsyncDomainCacheConfig, DomainCacheConfig, get_sync_pool, REDIS_POOL_SETTINGS
+)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeAsyncRedis:
+    """Redis mínimo en memoria para probar el backend async sin servidor"""
+
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+        self.published = []
+        self.get_calls = 0
+        self.keys_calls = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        self.get_calls += 1
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False, **kwargs):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        self.ttls[key] = ex
+        return True
+
+    async def mget(self, keys):
+        self.mget_calls = getattr(self, "mget_calls", 0) + 1
+        return [self.store.get(k) for k in keys]
+
+    async def exists(self, key):
+        return int(key in self.store)
+
+    async def eval(self, script, numkeys, key, token):
+        if self.store.get(key) == token:
+            del self.store[key]
+            return 1
+        return 0
+
+    async def keys(self, pattern):
+        self.keys_calls += 1
+        return [k for k in self.store if fnmatch.fnmatch(k, pattern)]
+
+    async def scan(self, cursor=0, match=None, count=None):
+        self.scan_calls = getattr(self, "scan_calls", 0) + 1
+        return 0, [k for k in self.store if fnmatch.fnmatch(k, match)]
+
+    async def sadd(self, key, *members):
+        self.store.setdefault(key, set()).update(members)
+        return len(members)
+
+    async def sscan(self, key, cursor=0, count=None):
+        return 0, list(self.store.get(key, ()))
+
+    async def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return True
+
+    async def unlink(self, *keys):
+        return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+        return len(keys)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 1
+
+    async def hincrby(self, key, field, amount):
+        self.hincr_calls = getattr(self, "hincr_calls", 0) + 1
+        hash_ = self.store.setdefault(key, {})
+        hash_[field] = hash_.get(field, 0) + amount
+        return hash_[field]
+
+    async def hincrbyfloat(self, key, field, amount):
+        return await self.hincrby(key, field, amount)
+
+    async def hgetall(self, key):
+        return dict(self.store.get(key, {}))
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeAsyncRedis()
+
+
+@pytest.fixture
+def async_cache(fake_redis):
+    return AsyncDomainCacheConfig("lang_", redis_client=fake_redis)
+
+
+class TestAsyncDomainCache:
+
+    @pytest.mark.asyncio
+    async def test_set_get_roundtrip(self, async_cache, fake_redis):
+        """El backend async guarda y recupera con el TTL del tipo de dato"""
+        data = {"id": 1, "nombre": "Inglés A1"}
+        assert await async_cache.set_cache("curso:1", data, ttl_type="reference_data")
+        assert await async_cache.get_cache("curso:1") == data
+        # TTL lógico de reference_data + ventana stale-while-revalidate
+        assert fake_redis.ttls["lang_:data:curso:1"] == 86400 + 3600
+
+    @pytest.mark.asyncio
+    async def test_invalidate_pattern(self, async_cache):
+        """La invalidación por patrón elimina solo las claves coincidentes"""
+        await async_cache.set_cache("curso:1", {"id": 1})
+        await async_cache.set_cache("nivel:A1", {"id": "A1"})
+        await async_cache.invalidate_cache("curso:*")
+        assert await async_cache.get_cache("curso:1") is None
+        assert await async_cache.get_cache("nivel:A1") == {"id": "A1"}
+
+    def test_sync_facade_shares_pool(self):
+        """La fachada síncrona reutiliza un único pool configurable"""
+        first = DomainCacheConfig("lang_")
+        second = DomainCacheConfig("lang_")
+        assert first.redis_client.connection_pool is get_sync_pool()
+        assert second.redis_client.connection_pool is first.redis_client.connection_pool
+        assert get_sync_pool().max_connections == REDIS_POOL_SETTINGS["max_connections"]
+
+
+class TestLocalCache:
+
+    def test_lru_eviction_respects_bound(self):
+        """El L1 nunca supera max_entries y expulsa la entrada menos usada"""
+        l1 = LocalLRUCache(max_entries=2)
+        l1.set("a", 1, "reference_data")
+        l1.set("b", 2, "reference_data")
+        l1.get("a")
+        l1.set("c", 3, "reference_data")
+        assert l1.get("b") is None
+        assert l1.get("a") == 1 and l1.get("c") == 3
+        assert l1.evictions == 1
+
+    def test_ttl_type_without_l1(self):
+        """Los tipos con TTL L1 = 0 no se guardan en memoria"""
+        l1 = LocalLRUCache()
+        l1.set("temp", {"x": 1}, "temp_data")
+        assert l1.get("temp") is None
+
+    @pytest.mark.asyncio
+    async def test_l1_hit_skips_redis(self, fake_redis):
+        """Un hit en L1 no hace round trip a Redis"""
+        cache = AsyncDomainCacheConfig("lang_", redis_client=fake_redis, local_cache=LocalLRUCache())
+        await cache.set_cache("niveles", ["A1", "A2"], ttl_type="reference_data")
+        for _ in range(5):
+            assert await cache.get_cache("niveles", ttl_type="reference_data") == ["A1", "A2"]
+        assert fake_redis.get_calls == 0
+
+    @pytest.mark.asyncio
+    async def test_invalidation_evicts_and_publishes(self, fake_redis):
+        """Invalidar limpia el L1 local y avisa a los demás workers por pub/sub"""
+        cache = AsyncDomainCacheConfig("lang_", redis_client=fake_redis, local_cache=LocalLRUCache())
+        await cache.set_cache("curso:1", {"id": 1}, ttl_type="reference_data")
+        await cache.invalidate_cache("curso:*")
+        assert cache.local_cache.get("lang_:data:curso:1") is None
+        assert fake_redis.published == [("lang_:cache:invalidate", json.dumps({"pattern": "lang_:data:curso:*"}))]
+
+
+class TestAsyncCacheResult:
+
+    @pytest.mark.asyncio
+    async def test_async_endpoint_caches_awaited_value(self, monkeypatch, async_cache, fake_redis):
+        """Las funciones async se esperan y se cachea el resultado, no la corrutina"""
+        monkeypatch.setattr(cache_decorators, "async_cache_manager", async_cache)
+        calls = []
+
+        @cache_result(ttl_type="reference_data", key_prefix="catalogo_cursos")
+        async def get_catalogo():
+            calls.append(1)
+            return [{"id": 1, "curso": "Inglés A1"}]
+
+        assert await get_catalogo() == [{"id": 1, "curso": "Inglés A1"}]
+        assert await get_catalogo() == [{"id": 1, "curso": "Inglés A1"}]
+        assert len(calls) == 1
+        assert len(fake_redis.store) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_computation(self, monkeypatch, async_cache):
+        """Los llamadores concurrentes comparten un único cálculo en curso"""
+        monkeypatch.setattr(cache_decorators, "async_cache_manager", async_cache)
+        calls = []
+
+        @cache_result(ttl_type="frequent_data", key_prefix="grupos_frecuentes")
+        async def get_grupos():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return [{"id": 1}]
+
+        results = await asyncio.gather(*(get_grupos() for _ in range(20)))
+        assert all(r == [{"id": 1}] for r in results)
+        assert len(calls) == 1
+        assert async_cache.single_flight.stats["local_coalesced"] == 19
+
+
+class TestSingleFlight:
+
+    @pytest.mark.asyncio
+    async def test_waits_for_remote_leader(self, async_cache, fake_redis):
+        """Si otro worker tiene el lock, se espera su valor en vez de recalcular"""
+        async_cache.single_flight.poll_interval = 0.01
+        fake_redis.store["lang_:lock:catalogo"] = "otro-worker"
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            return ["recalculado"]
+
+        async def leader_publishes():
+            await asyncio.sleep(0.03)
+            await async_cache.set_cache("catalogo", ["del lider"], "reference_data")
+
+        result, _ = await asyncio.gather(
+            async_cache.get_or_set("catalogo", loader, "reference_data"),
+            leader_publishes(),
+        )
+        assert result == ["del lider"]
+        assert calls == []
+        assert async_cache.single_flight.stats["remote_coalesced"] == 1
+        assert async_cache.single_flight.stats["remote_reused"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lock_released_after_compute(self, async_cache, fake_redis):
+        """El líder libera su lock al terminar"""
+        async def loader():
+            return {"niveles": ["A1"]}
+
+        assert await async_cache.get_or_set("niveles", loader, "reference_data") == {"niveles": ["A1"]}
+        assert "lang_:lock:niveles" not in fake_redis.store
+
+
+class TestStaleWhileRevalidate:
+
+    def _store_entry(self, fake_redis, key, value, expires_at, delta=0.0):
+        fake_redis.store[f"lang_:data:{key}"] = json.dumps({"__v": value, "__exp": expires_at, "__d": delta})
+
+    @pytest.mark.asyncio
+    async def test_serves_stale_and_refreshes(self, async_cache, fake_redis):
+        """Un valor vencido dentro de la ventana stale se sirve y se refresca en segundo plano"""
+        self._store_entry(fake_redis, "grupos", ["viejo"], time.time() - 1)
+
+        async def loader():
+            return ["nuevo"]
+
+        assert await async_cache.get_or_set("grupos", loader, "frequent_data") == ["viejo"]
+        await asyncio.sleep(0.01)
+        assert await async_cache.get_cache("grupos") == ["nuevo"]
+        assert async_cache.single_flight.stats["stale_served"] == 1
+        assert async_cache.single_flight.stats["background_refreshes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_disabled_for_temp_data(self, async_cache, fake_redis):
+        """Sin ventana stale el valor vencido se trata como miss y se recalcula en línea"""
+        self._store_entry(fake_redis, "tmp", ["viejo"], time.time() - 1)
+
+        async def loader():
+            return ["nuevo"]
+
+        assert await async_cache.get_or_set("tmp", loader, "temp_data") == ["nuevo"]
+
+    def test_xfetch_refreshes_early_near_expiry(self, async_cache):
+        """XFetch casi siempre adelanta el recálculo de una clave cara a punto de expirar"""
+        from app.cache.redis_config import CacheEntry
+        near = CacheEntry(["x"], time.time() + 0.01, delta=5.0)
+        far = CacheEntry(["x"], time.time() + 3600, delta=0.001)
+        assert sum(async_cache.should_refresh_early(near, "frequent_data") for _ in range(100)) > 90
+        assert not any(async_cache.should_refresh_early(far, "frequent_data") for _ in range(100))
+        assert not async_cache.should_refresh_early(near, "reference_data")
+
+
+class TestTagInvalidation:
+
+    @pytest.mark.asyncio
+    async def test_invalidate_tags_only_deletes_members(self, async_cache, fake_redis):
+        """Invalidar un tag borra solo sus claves, sin recorrer el keyspace con KEYS"""
+        await async_cache.set_cache("curso:1", {"id": 1}, "reference_data", tags=["curso:1", "catalogo"])
+        await async_cache.set_cache("curso:2", {"id": 2}, "reference_data", tags=["curso:2"])
+
+        deleted = await async_cache.invalidate_tags("curso:1")
+
+        assert deleted == 1
+        assert await async_cache.get_cache("curso:1") is None
+        assert await async_cache.get_cache("curso:2") == {"id": 2}
+        assert "lang_:tag:curso:1" not in fake_redis.store
+        assert fake_redis.keys_calls == 0
+
+    @pytest.mark.asyncio
+    async def test_tags_evict_local_entries(self, fake_redis):
+        """Los tags también expulsan del L1 y se publican a los demás workers"""
+        cache = AsyncDomainCacheConfig("lang_", redis_client=fake_redis, local_cache=LocalLRUCache())
+        await cache.set_cache("catalogo", ["A1"], "reference_data", tags=["catalogo"])
+        await cache.invalidate_tags("catalogo")
+        assert cache.local_cache.get("lang_:data:catalogo") is None
+        assert fake_redis.published[-1] == ("lang_:cache:invalidate", json.dumps({"tags": ["catalogo"]}))
+
+    def test_remote_tag_message_evicts_l1(self):
+        """Un mensaje de tags recibido por pub/sub limpia el L1 de este worker"""
+        cache = AsyncDomainCacheConfig("lang_", local_cache=LocalLRUCache())
+        cache.local_cache.set("lang_:data:grupos", [1], "reference_data", tags=["grupos"])
+        cache._handle_invalidation_message(json.dumps({"tags": ["grupos"]}))
+        assert cache.local_cache.get("lang_:data:grupos") is None
+
+    @pytest.mark.asyncio
+    async def test_tag_message_evicts_entries_read_through_from_redis(self, fake_redis):
+        """El worker B sube al L1 lo que escribió A; el mensaje de tags de A debe expulsarlo"""
+        worker_a = AsyncDomainCacheConfig("lang_", redis_client=fake_redis, local_cache=LocalLRUCache())
+        worker_b = AsyncDomainCacheConfig("lang_", redis_client=fake_redis, local_cache=LocalLRUCache())
+        await worker_a.set_cache("catalogo", ["A1"], "reference_data", tags=["catalogo"])
+        await worker_a.set_many({"niveles": ["B1"]}, "reference_data", tags=["config"])
+        assert await worker_b.get_cache("catalogo", "reference_data") == ["A1"]
+        assert await worker_b.get_many(["niveles"], "reference_data") == {"niveles": ["B1"]}
+        assert worker_b.local_cache.get("lang_:data:catalogo") == ["A1"]
+
+        await worker_a.invalidate_tags("catalogo", "config")
+        worker_b._handle_invalidation_message(fake_redis.published[-1][1])
+
+        assert worker_b.local_cache.get("lang_:data:catalogo") is None
+        assert worker_b.local_cache.get("lang_:data:niveles") is None
+
+    @pytest.mark.asyncio
+    async def test_hooks_also_clear_untagged_legacy_keys(self, fake_redis, monkeypatch):
+        """Claves de antes de los tags (sin tag set) también se invalidan, por SCAN"""
+        from app.cache import invalidation
+
+        cache = AsyncDomainCacheConfig("lang_", redis_client=fake_redis)
+        monkeypatch.setattr(invalidation, "async_cache_manager", cache)
+        await cache.set_cache("catalogo_cursos:listado", ["A1"], "reference_data")   # sin tags
+        await cache.set_cache("curso_7:detalle", {"id": 7}, "reference_data")
+        await cache.set_cache("curso_8:detalle", {"id": 8}, "reference_data")
+
+        await invalidation.AcademiaCacheInvalidation.on_curso_update("7")
+
+        assert await cache.get_cache("catalogo_cursos:listado") is None
+        assert await cache.get_cache("curso_7:detalle") is None
+        assert await cache.get_cache("curso_8:detalle") == {"id": 8}
+
+
+class TestSerialization:
+
+    @pytest.mark.parametrize("codec", sorted(CODECS))
+    def test_roundtrip_with_datetime(self, codec):
+        """Todos los codecs aceptan fechas (ej. created_at de ProductService)"""
+        serializer = CacheSerializer(codec=codec)
+        value = {"id": 1, "nombre": "Inglés A1", "created_at": datetime(2025, 9, 1, 8, 30)}
+        decoded = CacheSerializer.loads(serializer.dumps(value))
+        assert decoded["id"] == 1 and decoded["nombre"] == "Inglés A1"
+        assert decoded["created_at"] in (value["created_at"], value["created_at"].isoformat())
+
+    def test_compresses_above_threshold(self):
+        """Los payloads grandes se comprimen y se marcan en la cabecera"""
+        serializer = CacheSerializer(codec="json", compression="zlib", compress_threshold=256)
+        catalogo = [{"id": i, "curso": "Inglés B1", "duracion": "3 meses"} for i in range(200)]
+        small, large = serializer.dumps([1]), serializer.dumps(catalogo)
+        assert small[0] & 0b111 == 0
+        assert large[0] & 0b111 == 1
+        assert len(large) < len(json.dumps(catalogo))
+        assert CacheSerializer.loads(large) == catalogo
+
+    def test_reads_legacy_plain_json(self):
+        """Los valores guardados antes de la cabecera se siguen leyendo"""
+        assert CacheSerializer.loads(b'{"id": 1}') == {"id": 1}
+        assert CacheSerializer.loads('["A1", "A2"]') == ["A1", "A2"]
+
+
+class TestBulkOperations:
+
+    @pytest.mark.asyncio
+    async def test_set_get_delete_many(self, async_cache, fake_redis):
+        """set_many/get_many/delete_many hacen un round trip por operación"""
+        await async_cache.set_many({"nivel:A1": {"id": "A1"}, "nivel:A2": {"id": "A2"}}, "reference_data")
+        found = await async_cache.get_many(["nivel:A1", "nivel:A2", "nivel:Z9"])
+        assert found == {"nivel:A1": {"id": "A1"}, "nivel:A2": {"id": "A2"}}
+        assert fake_redis.mget_calls == 1
+        assert fake_redis.get_calls == 0
+
+        assert await async_cache.delete_many(["nivel:A1", "nivel:A2"]) == 2
+        assert await async_cache.get_many(["nivel:A1"]) == {}
+
+    @pytest.mark.asyncio
+    async def test_warm_up_loads_all_strategies_in_one_batch(self, monkeypatch, async_cache, fake_redis):
+        """La precarga consulta todas las claves juntas y escribe solo las faltantes"""
+        from app.cache import domain_strategies
+        monkeypatch.setattr(domain_strategies, "async_cache_manager", async_cache)
+
+        first = await domain_strategies.DomainSpecificCaching.warm_up("lang_")
+        second = await domain_strategies.DomainSpecificCaching.warm_up("lang_")
+
+        assert first == {"strategies": 3, "cached": 0, "loaded": 3}
+        assert second == {"strategies": 3, "cached": 3, "loaded": 0}
+        assert fake_redis.mget_calls == 2
+        assert fake_redis.get_calls == 0
+
+
+class TestCacheRefreshScheduler:
+
+    @pytest.mark.asyncio
+    async def test_refreshes_missing_keys_and_backs_off_on_failure(self, async_cache, fake_redis):
+        """Refresca lo que falta y aplica backoff cuando la fuente falla"""
+        from app.cache.domain_strategies import CacheStrategy
+        from app.cache.warmer import CacheRefreshScheduler
+
+        async def ok_loader():
+            return ["A1", "A2"]
+
+        async def failing_loader():
+            raise RuntimeError("fuente caída")
+
+        scheduler = CacheRefreshScheduler(async_cache, [
+            CacheStrategy("niveles", "reference_data", ok_loader),
+            CacheStrategy("reporte", "stable_data", failing_loader),
+        ], tick=0.01)
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        state = scheduler.get_state()
+        await scheduler.stop()
+
+        assert await async_cache.get_cache("niveles") == ["A1", "A2"]
+        assert state["strategies"]["niveles"]["refreshes"] == 1
+        # el siguiente refresco exitoso queda cerca del 80% del TTL, no inmediato
+        assert state["strategies"]["niveles"]["next_run_in"] > 86400 * 0.7
+        assert state["strategies"]["reporte"]["failures"] >= 1
+        assert "fuente caída" in state["strategies"]["reporte"]["last_error"]
+
+
+class TestCacheMetrics:
+
+    @pytest.mark.asyncio
+    async def test_accesses_are_counted_in_memory_and_flushed_in_one_batch(self, fake_redis):
+        """Los accesos no tocan Redis para métricas; el flush agrega por prefijo y ttl_type"""
+        from app.cache.metrics import CacheMetrics
+
+        metrics = CacheMetrics("lang_")
+        cache = AsyncDomainCacheConfig("lang_", redis_client=fake_redis,
+                                       local_cache=LocalLRUCache(), metrics=metrics)
+        await cache.set_cache("catalogo:cursos", [{"id": 1}], ttl_type="reference_data")
+        await cache.get_cache("catalogo:cursos", ttl_type="reference_data")   # L1
+        await cache.get_cache("catalogo:cursos", ttl_type="reference_data", use_local=False)
+        await cache.get_cache("grupos:inexistente", ttl_type="frequent_data")
+        assert getattr(fake_redis, "hincr_calls", 0) == 0
+
+        summary = {(row["prefix"], row["ttl_type"]): row for row in metrics.get_summary()}
+        catalogo = summary[("catalogo", "reference_data")]
+        assert (catalogo["hit_local"], catalogo["hit_redis"], catalogo["miss"]) == (1, 1, 0)
+        assert catalogo["bytes_written"] > 0 and catalogo["bytes_read"] > 0
+        assert summary[("grupos", "frequent_data")]["hit_ratio"] == 0.0
+
+        assert await metrics.flush(fake_redis) == 2
+        flushed = (await metrics.get_custom_metrics(fake_redis))["series"]
+        assert flushed["catalogo|reference_data"]["hit_local"] == 1
+        assert flushed["grupos|frequent_data"]["miss"] == 1
+        # lo ya enviado no se vuelve a enviar
+        assert await metrics.flush(fake_redis) == 0
+
+    def test_prometheus_collector_exports_snapshot(self):
+        """El collector expone contadores e histograma sin registrar nada por acceso"""
+        from prometheus_client import CollectorRegistry
+        from app.cache.metrics import CacheMetrics
+        from monitoring.metrics import register_cache_metrics
+
+        metrics = CacheMetrics("lang_")
+        metrics.record_get("lang_:niveles:A1", "reference_data", "hit_redis", 120, 0.002)
+        metrics.record_get("lang_:niveles:A2", "reference_data", "miss", 0, 0.001)
+        registry = CollectorRegistry()
+        register_cache_metrics(metrics, registry=registry)
+
+        labels = {"prefix": "niveles", "ttl_type": "reference_data"}
+        assert registry.get_sample_value("lang_cache_hit_ratio", labels) == 0.5
+        assert registry.get_sample_value("lang_cache_get_duration_seconds_count", labels) == 2
+        assert registry.get_sample_value(
+            "lang_cache_requests_total", {**labels, "outcome": "hit_redis"}
+        ) == 1
@@ -0,0 +1,300 @@
+# tests/test_domain_queries.py
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from app.database.get_db import to_async_url  # noqa: E402
+from app.services.optimized_domain_service import OptimizedDomainService  # noqa: E402
+
+SCHEMA = [
+    "CREATE TABLE profesores (id INTEGER PRIMARY KEY, nombre VARCHAR(100))",
+    "CREATE TABLE lang_curso (id INTEGER PRIMARY KEY, nombre VARCHAR(100), nivel VARCHAR(2), "
+    "estado VARCHAR(20), duracion INTEGER, profesor_id INTEGER)",
+    "CREATE TABLE estudiantes (id INTEGER PRIMARY KEY, nombre VARCHAR(100), apellido VARCHAR(100))",
+    "CREATE TABLE lang_inscripcion (id INTEGER PRIMARY KEY, curso_id INTEGER, estudiante_id INTEGER, "
+    "grupo_id INTEGER, fecha_inscripcion TIMESTAMP, estado VARCHAR(20))",
+]
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'lang.db'}"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO profesores VALUES (1, 'Ana')"))
+        conn.execute(
+            text("INSERT INTO lang_curso VALUES (:id, :nombre, :nivel, 'activo', 40, 1)"),
+            [{"id": i, "nombre": f"Curso {i:02d}", "nivel": "B1" if i % 2 else "A1"} for i in range(1, 11)]
+        )
+        conn.execute(text("INSERT INTO estudiantes VALUES (1, 'Luis', 'Gómez')"))
+        # Dos inscripciones por día (el id desempata); fechas en el formato que guarda SQLAlchemy
+        conn.execute(
+            text("INSERT INTO lang_inscripcion VALUES (:id, 1, 1, NULL, :fecha, 'activa')"),
+            [{"id": i, "fecha": f"2025-03-0{(i + 1) // 2} 09:00:00.000000"} for i in range(1, 7)]
+        )
+    engine.dispose()
+    return url
+
+
+class TestAsyncDomainService:
+
+    @pytest.mark.asyncio
+    async def test_async_session_returns_row_mappings(self, db_url):
+        """AsyncSession (aiosqlite) devuelve dicts; antes dict(row) fallaba con Row de SQLAlchemy 2"""
+        assert to_async_url(db_url).startswith("sqlite+aiosqlite://")
+        engine = create_async_engine(to_async_url(db_url))
+        async with async_sessionmaker(engine)() as db:
+            page = await OptimizedDomainService(db, "lang_").get_cursos_por_nivel("B1", limit=3)
+        rows = page["items"]
+        await engine.dispose()
+
+        assert [row["nombre"] for row in rows] == ["Curso 01", "Curso 03", "Curso 05"]
+        assert rows[0]["profesor"] == "Ana"
+
+    @pytest.mark.asyncio
+    async def test_sync_session_still_supported_off_the_event_loop(self, db_url):
+        engine = create_engine(db_url, connect_args={"check_same_thread": False})
+        with sessionmaker(bind=engine)() as db:
+            rows = (await OptimizedDomainService(db, "lang_").get_cursos_por_nivel("A1", limit=2))["items"]
+        engine.dispose()
+
+        assert [row["id"] for row in rows] == [2, 4]
+
+    def test_async_url_uses_asyncpg_for_postgres(self):
+        assert to_async_url("postgresql://u:p@db/academia") == "postgresql+asyncpg://u:p@db/academia"
+        assert to_async_url("postgresql+psycopg2://u:p@db/academia") == "postgresql+asyncpg://u:p@db/academia"
+
+
+class TestKeysetPagination:
+
+    @pytest.mark.asyncio
+    async def test_next_and_prev_cursors_walk_the_pages(self, db_url):
+        """(nombre, id) como clave: página 1 -> 2 -> 3 y de vuelta, sin OFFSET"""
+        engine = create_async_engine(to_async_url(db_url))
+        async with async_sessionmaker(engine)() as db:
+            service = OptimizedDomainService(db, "lang_")
+            first = await service.get_cursos_por_nivel("B1", limit=2)
+            second = await service.get_cursos_por_nivel("B1", limit=2, cursor=first["next_cursor"])
+            third = await service.get_cursos_por_nivel("B1", limit=2, cursor=second["next_cursor"])
+            back = await service.get_cursos_por_nivel("B1", limit=2, cursor=second["prev_cursor"])
+        await engine.dispose()
+
+        assert [r["id"] for r in first["items"]] == [1, 3] and first["prev_cursor"] is None
+        assert [r["id"] for r in second["items"]] == [5, 7]
+        assert [r["id"] for r in third["items"]] == [9] and third["next_cursor"] is None
+        assert back["items"] == first["items"] and back["prev_cursor"] is None
+
+    @pytest.mark.asyncio
+    async def test_descending_dates_with_id_tiebreak(self, db_url):
+        """(fecha_inscripcion DESC, id DESC): el cursor lleva la fecha como datetime"""
+        engine = create_async_engine(to_async_url(db_url))
+        async with async_sessionmaker(engine)() as db:
+            service = OptimizedDomainService(db, "lang_")
+            pages, cursor = [], None
+            while True:
+                page = await service.get_inscripciones_por_curso(1, limit=4, cursor=cursor)
+                pages.append([row["id"] for row in page["items"]])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+        await engine.dispose()
+
+        assert pages == [[6, 5, 4, 3], [2, 1]]
+
+    def test_cursor_is_opaque_typed_and_bound_to_its_query(self):
+        from datetime import datetime
+        from app.database.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+        fecha = datetime(2025, 3, 1, 9, 30)
+        token = encode_cursor("inscripciones_por_curso", "next", [fecha, 42])
+        assert decode_cursor("inscripciones_por_curso", token) == ("next", [fecha, 42])
+        with pytest.raises(InvalidCursor):
+            decode_cursor("cursos_por_nivel", token)
+        with pytest.raises(InvalidCursor):
+            decode_cursor("cursos_por_nivel", "no-es-un-cursor")
+
+    @pytest.mark.asyncio
+    async def test_cursor_with_malformed_key_values_is_rejected(self, db_url):
+        """Cursor bien codificado pero con valores que no encajan en la clave: InvalidCursor, no 500"""
+        import base64
+        import json
+        from app.database.pagination import InvalidCursor
+
+        engine = create_async_engine(to_async_url(db_url))
+        async with async_sessionmaker(engine)() as db:
+            service = OptimizedDomainService(db, "lang_")
+            for values in (["x"], 5, [[1], 2], ["Curso 01", 1, 2], [{"a": 1}, 1], [True, 1]):
+                payload = json.dumps({"q": "cursos_por_nivel", "d": "next", "k": values})
+                token = base64.urlsafe_b64encode(payload.encode()).decode()
+                with pytest.raises(InvalidCursor):
+                    await service.get_cursos_por_nivel("B1", limit=2, cursor=token)
+        await engine.dispose()
+
+    def test_wrong_typed_cursor_values_return_400(self, db_url):
+        """Cada valor se valida contra el tipo de su bind: fecha como texto o id no entero -> 400"""
+        import base64
+        import json
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.routers import optimized_domain_routes
+
+        engine = create_async_engine(to_async_url(db_url))
+
+        async def service_override():
+            async with async_sessionmaker(engine)() as db:
+                yield OptimizedDomainService(db, "lang_")
+
+        app = FastAPI()
+        app.include_router(optimized_domain_routes.router)
+        app.dependency_overrides[optimized_domain_routes.get_domain_service] = service_override
+        client = TestClient(app)
+
+        def token(query_name, values):
+            payload = json.dumps({"q": query_name, "d": "next", "k": values})
+            return base64.urlsafe_b64encode(payload.encode()).decode()
+
+        response = client.get("/lang/optimized/cursos/1/inscripciones",
+                              params={"cursor": token("inscripciones_por_curso", ["2025-03-01", 3])})
+        assert response.status_code == 400
+        for values in ([1, "x"], ["Curso 01", "3"], ["Curso 01", 3.5]):
+            response = client.get("/lang/optimized/cursos/nivel/B1",
+                                  params={"cursor": token("cursos_por_nivel", values)})
+            assert response.status_code == 400, values
+        # Un cursor bien tipado sigue funcionando
+        first = client.get("/lang/optimized/cursos/nivel/B1", params={"limit": 2}).json()
+        second = client.get("/lang/optimized/cursos/nivel/B1", params={"limit": 2, "cursor": first["next_cursor"]})
+        assert second.status_code == 200 and [r["id"] for r in second.json()["items"]] == [5, 7]
+
+
+class TestQueryRegistry:
+
+    def test_queries_are_compiled_once_with_typed_params(self):
+        from app.database.query_registry import QueryRegistry
+
+        registry = QueryRegistry("lang_").compile()
+        query = registry.get("inscripciones_por_curso_after")
+
+        assert query is registry.get("inscripciones_por_curso_after")
+        assert set(query.params) == {"curso_id", "cursor_fecha_inscripcion", "cursor_id", "limit"}
+        types = {name: type(bind.type).__name__ for name, bind in query.statement.compile().binds.items()}
+        assert types["cursor_fecha_inscripcion"] == "DateTime" and types["limit"] == "Integer"
+        with pytest.raises(ValueError):
+            registry.get("no_existe")
+
+    @pytest.mark.asyncio
+    async def test_execution_counters_per_query(self, db_url):
+        from app.database.query_registry import get_query_registry
+
+        registry = get_query_registry("lang_")
+        before = registry.get("cursos_por_nivel").get_stats()["calls"]
+        engine = create_async_engine(to_async_url(db_url))
+        async with async_sessionmaker(engine)() as db:
+            service = OptimizedDomainService(db, "lang_")
+            await service.get_cursos_por_nivel("B1", limit=2)
+            await service.get_cursos_por_nivel("A1", limit=10)
+            with pytest.raises(Exception):
+                await service.get_grupos_por_curso(1)   # lang_grupo no existe en esta base
+        await engine.dispose()
+
+        stats = registry.get_stats()
+        assert stats["cursos_por_nivel"]["calls"] == before + 2
+        assert stats["grupos_por_curso"]["errors"] >= 1
+
+
+class TestStreamingExport:
+
+    @pytest.mark.asyncio
+    async def test_rows_are_encoded_in_chunks_as_a_valid_json_array(self, db_url):
+        import json
+        from app.services.result_streaming import encode_json_array
+
+        engine = create_async_engine(to_async_url(db_url))
+        async with async_sessionmaker(engine)() as db:
+            service = OptimizedDomainService(db, "lang_")
+            chunks = [chunk async for chunk in encode_json_array(service.stream_inscripciones_por_curso(1), chunk_rows=4)]
+        await engine.dispose()
+
+        # "[" + 2 lotes (4 + 2 filas) + "]"
+        assert len(chunks) == 4
+        rows = json.loads(b"".join(chunks))
+        assert [row["id"] for row in rows] == [6, 5, 4, 3, 2, 1]
+        assert rows[0]["fecha_inscripcion"] == "2025-03-03T09:00:00"
+
+    def test_export_route_streams_ndjson_and_json(self, db_url, monkeypatch):
+        import json
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.routers import optimized_domain_routes
+
+        engine = create_async_engine(to_async_url(db_url))
+        monkeypatch.setattr(optimized_domain_routes, "AsyncSessionLocal", async_sessionmaker(engine))
+        app = FastAPI()
+        app.include_router(optimized_domain_routes.router)
+        client = TestClient(app)
+
+        response = client.get("/lang/optimized/cursos/1/inscripciones/export")
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = response.text.splitlines()
+        assert len(lines) == 6 and json.loads(lines[0])["nombre"] == "Luis"
+
+        response = client.get("/lang/optimized/profesores/1/cursos/export", params={"format": "json"})
+        assert len(response.json()) == 10
+        assert client.get("/lang/optimized/profesores/1/cursos/export", params={"format": "csv"}).status_code == 422
+
+
+class TestQueryProfiler:
+
+    def test_literals_are_normalized_into_one_fingerprint(self):
+        from app.database.profiling import QueryProfiler
+
+        profiler = QueryProfiler(slow_threshold=10)
+        for curso_id, ids in ((1, "1, 2"), (2, "3, 4, 5")):
+            profiler.record(f"SELECT * FROM lang_grupo WHERE curso_id = {curso_id} "
+                            f"AND id IN ({ids}) AND nombre = 'B{curso_id}'", None, 0.002)
+        profiler.record("SELECT * FROM lang_grupo WHERE curso_id = ?  AND id IN (?) AND nombre = ?", (3,), 0.004)
+
+        (stats,) = profiler.top()
+        assert stats["count"] == 3
+        assert stats["statement"] == "SELECT * FROM lang_grupo WHERE curso_id = ? AND id IN (?) AND nombre = ?"
+        assert stats["max_ms"] == 4.0
+
+    def test_histogram_percentiles_and_bounded_fingerprints(self):
+        from app.database.profiling import LatencyHistogram, QueryProfiler
+
+        histogram = LatencyHistogram()
+        for ms in range(1, 101):
+            histogram.record(ms / 1000)
+        assert histogram.percentile(50) == pytest.approx(0.050, rel=0.05)
+        assert histogram.percentile(95) == pytest.approx(0.095, rel=0.05)
+
+        profiler = QueryProfiler(max_fingerprints=3)
+        for table in ("lang_a", "lang_b", "lang_c", "lang_d"):
+            profiler.record(f"SELECT 1 FROM {table}", None, 0.001)
+        assert len(profiler.top()) == 3
+        assert {s.statement for s in profiler.for_domain("lang_")} == {
+            "SELECT ? FROM lang_b", "SELECT ? FROM lang_c", "SELECT ? FROM lang_d"
+        }
+
+    @pytest.mark.asyncio
+    async def test_domain_lookup_and_sampled_explain(self, db_url, monkeypatch):
+        from app.database.profiling import analyze_domain_queries, query_profiler
+
+        query_profiler.reset()
+        monkeypatch.setattr(query_profiler, "slow_threshold", 0.0)   # todo cuenta como lento
+        monkeypatch.setattr(query_profiler, "explain_sample_rate", 1.0)
+        engine = create_async_engine(to_async_url(db_url))
+        async with async_sessionmaker(engine)() as db:
+            await OptimizedDomainService(db, "lang_").get_cursos_por_nivel("B1", limit=2)
+        async with engine.connect() as connection:
+            assert await connection.run_sync(query_profiler.explain_pending) == 1
+        await engine.dispose()
+
+        (cursos,) = analyze_domain_queries("lang_")
+        assert cursos["tables"] == ["lang_curso", "profesores"]
+        assert cursos["count"] == 1 and cursos["explain"]
+        assert analyze_domain_queries("vet_") == []
@@ -0,0 +1,151 @@
+# tests/test_middleware_asgi.py
+import logging
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.middleware.domain_logger import DomainLogger
+from app.middleware.domain_validator import DomainValidator
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.get("/lang/cursos/stream")
+    def stream():
+        return StreamingResponse((f"{i}\n".encode() for i in range(3)), media_type="text/plain")
+
+    return app
+
+
+class TestPureASGIMiddleware:
+
+    def test_validator_rejects_missing_headers_without_reaching_route(self):
+        """El validador responde 400 directamente (sin HTTPException dentro del middleware)"""
+        validator = DomainValidator(build_app(), domain_prefix="lang_")
+        validator.validators["required_headers"] = ["X-Academia-ID"]
+        validator.reload_rules()
+        client = TestClient(validator)
+
+        response = client.get("/lang/cursos/stream")
+        assert response.status_code == 400
+        assert response.json()["detail"]["required_headers"] == ["X-Academia-ID"]
+        assert client.get("/lang/cursos/stream", headers={"X-Academia-ID": "1"}).status_code == 200
+
+    def test_logger_passes_streaming_responses_and_logs_status(self, caplog):
+        """El logger no bufferiza el cuerpo y registra el status real de la respuesta"""
+        middleware = DomainLogger(build_app(), domain_prefix="lang_", info_sample_rate=1.0)
+        client = TestClient(middleware)
+        # El logger no propaga al root: caplog se engancha directo
+        middleware.logger.addHandler(caplog.handler)
+        try:
+            response = client.get("/lang/cursos/stream")
+        finally:
+            middleware.logger.removeHandler(caplog.handler)
+
+        assert response.text == "0\n1\n2\n"
+        end = [r.msg for r in caplog.records if isinstance(r.msg, dict) and r.msg["event"] == "REQUEST_END"]
+        assert len(end) == 1 and end[0]["status_code"] == 200
+        assert middleware.logger.propagate is False
+
+    def test_info_requests_are_all_logged_unless_sampling_is_configured(self, monkeypatch):
+        monkeypatch.delenv("LOG_INFO_SAMPLE_RATE", raising=False)
+        assert DomainLogger(build_app(), domain_prefix="lang_").info_sample_rate == 1.0
+        monkeypatch.setenv("LOG_INFO_SAMPLE_RATE", "0.1")
+        assert DomainLogger(build_app(), domain_prefix="lang_").info_sample_rate == 0.1
+
+    def test_unsampled_requests_skip_request_data(self, monkeypatch):
+        """Con muestreo 0 no se arma Request ni el dict; los errores sí se registran"""
+        middleware = DomainLogger(build_app(), domain_prefix="lang_", info_sample_rate=0.0)
+        built = []
+        original = middleware._request_data
+        monkeypatch.setattr(middleware, "_request_data", lambda *args: built.append(1) or original(*args))
+        client = TestClient(middleware)
+
+        client.get("/lang/cursos/stream")
+        assert built == []
+        client.get("/lang/cursos/no-existe")
+        assert built == [1]
+
+
+class TestValidationEngine:
+
+    def test_clock_is_read_once_per_minute_and_rules_use_raw_headers(self, monkeypatch):
+        """Horario fuera de rango -> 403 salvo emergencias; datetime.now() una vez por minuto"""
+        from datetime import datetime
+        from app.middleware import validation_engine
+
+        calls = []
+
+        class FixedClock:
+            @staticmethod
+            def now():
+                calls.append(1)
+                return datetime(2025, 1, 4, 23, 30)   # sábado, 23:30
+
+        monkeypatch.setattr(validation_engine, "datetime", FixedClock)
+        validator = DomainValidator(build_app(), domain_prefix="pharma_")
+        engine = validator.engine
+        scope = {"type": "http", "path": "/pharma/emergency/controlled", "method": "GET",
+                 "headers": [(b"x-pharmacy-license", b"1")]}
+
+        assert engine.check(scope) is engine.prescription_error
+        assert engine.check({**scope, "headers": scope["headers"] + [(b"x-prescription-id", b"9")]}) is None
+        assert engine.check({**scope, "path": "/pharma/productos"}) is engine.hours_error
+        assert engine.check({**scope, "path": "/pharma/emergency", "headers": []}) is engine.headers_error
+        assert len(calls) == 1
+
+
+class TestRouteClassifier:
+
+    def test_first_matching_fragment_wins_per_dimension(self):
+        from app.middleware.route_classifier import RouteClassifier
+
+        routes = RouteClassifier()
+        routes.register("rate_category", [("/cursos", "courses"), ("/admin", "admin")], default="general")
+        routes.register("log_level", [("/admin", "CRITICAL"), ("POST /cursos", "WARNING")])
+
+        info = routes.classify("/lang/admin/cursos/15", "GET")
+        assert info["rate_category"] == "courses"
+        assert info["log_level"] == "CRITICAL"
+        assert routes.classify("/lang/cursos", "POST")["log_level"] == "WARNING"
+        assert routes.classify("/lang/cursos", "GET")["log_level"] is None
+        assert routes.classify("/lang/health")["rate_category"] == "general"
+
+    def test_result_is_cached_per_route_template(self):
+        from app.middleware.route_classifier import RouteClassifier
+
+        routes = RouteClassifier()
+        routes.register("rate_category", [("/cursos", "courses")], default="general")
+        first = routes.classify("/lang/cursos/1/inscripciones")
+        assert routes.classify("/lang/cursos/982/inscripciones") is first
+        assert RouteClassifier.route_template("/lang/cursos/982") == "/lang/cursos/{id}"
+
+
+class TestLogPipeline:
+
+    def test_batches_json_lines_and_counts_drops(self, tmp_path):
+        """El request solo encola; con la cola llena se descarta y se cuenta"""
+        import json
+        import queue
+        from app.middleware.log_pipeline import (
+            BatchingQueueListener, BatchRotatingFileHandler, DroppingQueueHandler, JSONLineFormatter
+        )
+
+        log_queue = queue.Queue(maxsize=5)
+        queue_handler = DroppingQueueHandler(log_queue)
+        logger = logging.getLogger("test_log_pipeline")
+        logger.addHandler(queue_handler)
+        for i in range(8):
+            logger.warning({"event": "REQUEST_START", "n": i})
+        logger.removeHandler(queue_handler)
+        assert queue_handler.dropped == 3
+
+        file_handler = BatchRotatingFileHandler(str(tmp_path / "lang_domain.log"), 1024 * 1024, 1)
+        file_handler.setFormatter(JSONLineFormatter())
+        listener = BatchingQueueListener(log_queue, file_handler)
+        listener.start()
+        listener.stop()
+
+        lines = (tmp_path / "lang_domain.log").read_text().splitlines()
+        assert [json.loads(line)["n"] for line in lines] == [0, 1, 2, 3, 4]
+        assert listener.batches == 1